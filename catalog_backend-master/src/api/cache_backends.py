@@ -0,0 +1,239 @@
+import pickle
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Local tiers and counters per cache name, shared by the threads of a process
+# like those of `LocMemCache`.
+_locals = {}
+_stats = {}
+_evictions = {}
+_lock = Lock()
+
+
+class LocalLRU(object):
+    """
+    Pickled values by key with expiry, evicting the least recently used beyond
+    `max_size` bytes. Entries carry a group (any label) reported on eviction.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Return the pickled value of `key`, or `None` when it is missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expiry, pickled, group = entry
+            if expiry is not None and expiry <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return pickled
+
+    def set(self, key, pickled, timeout, group=None):
+        """Store `pickled` for `timeout` seconds (`None` for ever), return the groups of the evicted entries."""
+        if len(pickled) > self.max_size:
+            self.delete(key)
+            return []
+        expiry = None if timeout is None else time.monotonic() + timeout
+        evicted = []
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (expiry, pickled, group)
+            self.size += len(pickled)
+            while self.size > self.max_size:
+                oldest = next(iter(self._data))
+                evicted.append(self._data[oldest][2])
+                self._pop(oldest)
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[1])
+        return True
+
+
+class TwoTierCache(BaseCache):
+    """
+    A bounded in-process LRU (per worker) in front of the cache of another
+    alias shared by all workers, e.g. Redis. Reads try the local tier first
+    and fill it from the shared one, writes go to both.
+
+    OPTIONS:
+        SHARED: alias of the shared cache in `CACHES`.
+        LOCAL_MAX_SIZE: size of the local tier in bytes of pickled values.
+        LOCAL_TIMEOUT: longest time in seconds a value is kept locally, the
+            `TIMEOUT` of the cache (and per call timeouts) apply to both tiers.
+        LOCAL_KEY_PREFIXES: only keys starting with one of these prefixes use
+            the local tier, others (values that must be current in all
+            workers, like change versions) are read from the shared tier only.
+
+    Local evictions are also counted by key group, the key up to its second
+    colon (e.g. `page:services-list` of the API page keys).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 300)
+        self._local_key_prefixes = tuple(options.get('LOCAL_KEY_PREFIXES', ()))
+        with _lock:
+            self._local = _locals.setdefault(name, LocalLRU(options.get('LOCAL_MAX_SIZE', 32 * 1024 * 1024)))
+            self._stats = _stats.setdefault(name, dict.fromkeys(
+                ('local_hits', 'local_misses', 'local_evictions', 'shared_hits', 'shared_misses'), 0))
+            self._evictions = _evictions.setdefault(name, Counter())
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        """Hit, miss and eviction counters of both tiers in this process, and the size of the local one."""
+        with _lock:
+            stats = dict(self._stats)
+            evictions = dict(self._evictions)
+        return {
+            'local': {'hits': stats['local_hits'], 'misses': stats['local_misses'],
+                      'evictions': stats['local_evictions'], 'evictions_by_group': evictions,
+                      'entries': len(self._local), 'size': self._local.size},
+            'shared': {'hits': stats['shared_hits'], 'misses': stats['shared_misses']},
+        }
+
+    def _count(self, **counts):
+        with _lock:
+            for name, count in counts.items():
+                self._stats[name] += count
+
+    def _is_local(self, key):
+        return not self._local_key_prefixes or key.startswith(self._local_key_prefixes)
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _timeout(self, timeout):
+        # The `TIMEOUT` of this cache, not the one of the shared alias.
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _set_local(self, key, value, timeout, version):
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            return
+        timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        evicted = self._local.set(self._local_key(key, version), pickled, timeout, ':'.join(key.split(':', 2)[:2]))
+        if evicted:
+            self._count(local_evictions=len(evicted))
+            with _lock:
+                self._evictions.update(evicted)
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            pickled = self._local.get(self._local_key(key, version))
+            if pickled is not None:
+                self._count(local_hits=1)
+                return pickle.loads(pickled)
+            self._count(local_misses=1)
+
+        missing = object()
+        value = self.shared.get(key, missing, version=version)
+        if value is missing:
+            self._count(shared_misses=1)
+            return default
+        self._count(shared_hits=1)
+        if self._is_local(key):
+            self._set_local(key, value, self._local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            pickled = self._local.get(self._local_key(key, version)) if self._is_local(key) else None
+            if pickled is None:
+                remote.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        local_count = sum(1 for key in keys if self._is_local(key))
+        self._count(local_hits=len(found), local_misses=local_count - len(found))
+
+        if remote:
+            values = self.shared.get_many(remote, version=version)
+            self._count(shared_hits=len(values), shared_misses=len(remote) - len(values))
+            for key, value in values.items():
+                if self._is_local(key):
+                    self._set_local(key, value, self._local_timeout, version)
+            found.update(values)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, self._timeout(timeout), version=version)
+        if self._is_local(key):
+            self._set_local(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, self._timeout(timeout), version=version)
+        for key, value in data.items():
+            if self._is_local(key) and key not in failed:
+                self._set_local(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, self._timeout(timeout), version=version)
+        if added and self._is_local(key):
+            self._set_local(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(self._local_key(key, version))
+        return self.shared.touch(key, self._timeout(timeout), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self._local_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self._is_local(key) and self._local.get(self._local_key(key, version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        local = self._local.delete(self._local_key(key, version))
+        return self.shared.delete(key, version=version) or local
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local.delete(self._local_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        """Clear the shared tier, and the local tier of this process (other workers expire theirs)."""
+        self._local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,317 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, QueryDict
+from django.urls import resolve
+from django.utils.cache import patch_response_headers, patch_vary_headers
+from rest_framework.settings import api_settings
+
+from api.compression import CACHED, compress_response, negotiate
+from api.timing import get_timings
+from apps.blog.models import BlogPost
+from apps.services.models import Service, ServiceTag, ServiceCategory, Country, ServiceFeature, Certificate, \
+    CertificateOrganisation, ServiceScreenshot, ServiceRating, ServiceMention, ServiceRatingReview
+from apps.services.versions import bump_versions, get_versions
+
+# The review aggregates of the ratings are updated without signals of their own.
+SERVICE_MODELS = (Service, ServiceTag, ServiceCategory, Country, ServiceFeature, Certificate, CertificateOrganisation,
+                  ServiceScreenshot, ServiceRating, ServiceRatingReview, ServiceMention, Service.tags.through,
+                  Service.categories.through, Service.countries.through, Service.features.through,
+                  Service.certificates.through)
+
+# Cached resources, with the models whose changes show in their responses.
+# A change of any of them (see `apps.services.versions`) moves the resource
+# to a new cache namespace, the pages of other resources stay cached.
+RESOURCES = {
+    'services': SERVICE_MODELS,
+    # `?category=` reads the CategoryTag rows, rebuilt on changes of both relations.
+    'tags': (ServiceTag, Service, Service.tags.through, Service.categories.through),
+    'categories': (ServiceCategory, Service, Service.categories.through),
+    'reviews': (ServiceRatingReview, ServiceRating),
+    # `?expand=service` embeds catalog services.
+    'blog': (BlogPost,) + SERVICE_MODELS,
+}
+
+
+def get_resource_versions(request, resource):
+    """The change versions of the models of `resource`, read once per request."""
+    cached = request.__dict__.setdefault('_resource_versions', {})
+    if resource not in cached:
+        cached[resource] = get_versions(RESOURCES[resource])
+    return cached[resource]
+
+
+def versions_digest(versions):
+    digest = hashlib.md5(usedforsecurity=False)
+    for model, (timestamp, token) in sorted(versions.items(), key=lambda item: item[0]._meta.label_lower):
+        digest.update(f'{model._meta.label_lower}:{token};'.encode())
+    return digest.hexdigest()
+
+
+def get_namespace(request, resource):
+    """Cache key prefix of the current version of `resource`."""
+    return f'{resource}.{versions_digest(get_resource_versions(request, resource))}'
+
+
+def invalidate(*resources):
+    """Move `resources` (all when none are given) to new namespaces."""
+    bump_versions({model for resource in resources or RESOURCES for model in RESOURCES[resource]})
+
+
+# How long a rebuild may hold the lock of a page, and how long concurrent
+# requests wait for it before building the page themselves.
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 5
+WAIT_INTERVAL = 0.05
+
+
+def get_view(request):
+    context = getattr(request, 'parser_context', None) or {}
+    return context.get('view')
+
+
+def get_endpoint(request, resource):
+    """`<basename>-<action>` of the viewset handling `request`, e.g. `services-list`."""
+    view = get_view(request)
+    if getattr(view, 'basename', None) and getattr(view, 'action', None):
+        return f'{view.basename}-{view.action}'
+    return resource
+
+
+def get_query_params(view):
+    """
+    Return `{name: multiple}` of the query parameters `view` reads: its
+    filterset filters, the parameters of its filter backends and paginator,
+    its `known_query_params` and the format suffix. `multiple` tells whether
+    all values of the parameter are read, or only the last one.
+    """
+    params = {api_settings.URL_FORMAT_OVERRIDE: False}
+    for name in getattr(view, 'known_query_params', ()):
+        params[name] = False
+    for backend in getattr(view, 'filter_backends', ()):
+        for attr in ('search_param', 'ordering_param'):
+            if getattr(backend, attr, None):
+                params[getattr(backend, attr)] = False
+    filterset_class = getattr(view, 'filterset_class', None)
+    if filterset_class is not None:
+        for name, filter_ in filterset_class.base_filters.items():
+            params[name] = getattr(filter_.field_class.widget, 'allow_multiple_selected', False)
+    paginator = getattr(view, 'paginator', None)
+    for attr in dir(paginator):
+        if attr.endswith('_query_param') and getattr(paginator, attr):
+            params[getattr(paginator, attr)] = False
+    params.pop(None, None)
+    return params
+
+
+def canonical_query(request):
+    """
+    The query string of `request` with only the parameters its view reads
+    (no `utm_*`, `fbclid` and the like), sorted by name, the last value of
+    single valued ones and the sorted distinct values of multiple valued
+    ones, so that equivalent URLs share a cached page.
+    """
+    view = get_view(request)
+    query = request.GET
+    if view is None:
+        return query.urlencode()
+    known = get_query_params(view)
+    canonical = QueryDict(mutable=True)
+    for name in sorted(query):
+        if name not in known:
+            continue
+        if known[name]:
+            canonical.setlist(name, sorted(set(query.getlist(name))))
+        else:
+            canonical[name] = query[name]
+    return canonical.urlencode()
+
+
+def canonicalize(request):
+    """Rewrite the query string of `request` to `canonical_query`, for the view and the links it builds."""
+    query = canonical_query(request)
+    request = getattr(request, '_request', request)
+    if query != request.META.get('QUERY_STRING', ''):
+        request.META['QUERY_STRING'] = query
+        request.GET = QueryDict(query)
+
+
+def page_key(request, resource):
+    """
+    Cache key of the page of `request`: the endpoint, the namespace of
+    `resource`, the absolute URL (with the canonical query string) and the
+    negotiated `Content-Encoding`.
+    """
+    url = hashlib.md5(request.build_absolute_uri().encode(), usedforsecurity=False).hexdigest()
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', '')) or 'identity'
+    return f'page:{get_endpoint(request, resource)}:{get_namespace(request, resource)}:{url}:{encoding}'
+
+
+# Page cache counters by endpoint in this process, see `cache_stats`.
+_stats = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+# Page cache status of a request in its `api.timing.Timings`, by counter.
+CACHE_STATUS = {'hits': 'hit', 'stale_hits': 'stale', 'misses': 'miss'}
+
+
+def count(request, resource, event):
+    if getattr(getattr(request, '_request', request), 'warming_cache', False):
+        # Not a visitor's, see `api.warmup`.
+        return
+    with _stats_lock:
+        _stats[get_endpoint(request, resource)][event] += 1
+    timings = get_timings(request)
+    if timings is not None:
+        timings.cache = CACHE_STATUS[event]
+
+
+def cache_stats():
+    """
+    `{endpoint: {'hits', 'stale_hits', 'misses', 'evictions'}}` of the page
+    cache in this process. Evictions are those of the local tier of
+    `api.cache_backends.TwoTierCache`.
+    """
+    with _stats_lock:
+        stats = {endpoint: dict(counts) for endpoint, counts in _stats.items()}
+    evictions = cache.stats()['local']['evictions_by_group'] if hasattr(cache, 'stats') else {}
+    for group, evicted in evictions.items():
+        if group.startswith('page:'):
+            stats.setdefault(group[len('page:'):], {})['evictions'] = evicted
+    return {endpoint: {event: counts.get(event, 0) for event in ('hits', 'stale_hits', 'misses', 'evictions')}
+            for endpoint, counts in sorted(stats.items())}
+
+
+def acquire(key):
+    return cache.add(f'lock:{key}', True, LOCK_TIMEOUT)
+
+
+def release(key):
+    cache.delete(f'lock:{key}')
+
+
+def is_locked(key):
+    return cache.get(f'lock:{key}') is not None
+
+
+def store(key, response, timeout, hard_timeout):
+    # The validators are set per request, see `api.conditional`.
+    headers = [(header, value) for header, value in response.items() if header not in ('ETag', 'Last-Modified')]
+    now = time.time()
+    cache.set(key, (now + timeout, now + hard_timeout, response.status_code, headers, response.content), hard_timeout)
+
+
+def restore(entry):
+    fresh_until, expires, status, headers, content = entry
+    response = HttpResponse(content, status=status)
+    for header, value in headers:
+        response.headers[header] = value
+    return response
+
+
+def refresh(request):
+    """
+    Build the page of `request` again outside of its request-response cycle,
+    with a copy of the request through the whole view, which stores it.
+    """
+    request = copy.copy(request)
+    request.META = {name: value for name, value in request.META.items()
+                    if name not in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')}
+    request.refreshing_cache = True
+    match = resolve(request.path_info, getattr(request, 'urlconf', None))
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+
+
+def refresh_in_background(request, key):
+    def run():
+        try:
+            refresh(request)
+        finally:
+            release(key)
+            connections.close_all()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def cache_response(timeout, resource, hard_timeout=None):
+    """
+    Cache the compressed JSON pages of a view in the namespace of `resource`
+    (see `RESOURCES`), like `cache_page`, against stampedes:
+
+    - a page is fresh for `timeout` seconds, then served stale while a single
+      background rebuild refreshes it, up to `hard_timeout` seconds (by
+      default `settings.API_CACHE_HARD_TIMEOUT`) after it was built;
+    - when a page is missing, one request (per key, across workers, with a
+      lock in the shared cache) builds it and the others wait for it.
+
+    Pages are keyed by the canonical query string (see `canonical_query`),
+    which is also the one the view sees.
+    """
+    hard_timeout = max(hard_timeout or settings.API_CACHE_HARD_TIMEOUT, timeout)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            renderer = getattr(request, 'accepted_renderer', None)
+            if request.method != 'GET' or getattr(renderer, 'format', 'json') != 'json':
+                # The browsable API pages are per user.
+                return view_func(request, *args, **kwargs)
+
+            canonicalize(request)
+            key = page_key(request, resource)
+            locked = False
+            if not getattr(request, 'refreshing_cache', False):
+                entry = cache.get(key)
+                if entry is not None and entry[1] <= time.time():
+                    # Kept longer by a tier with its own timeout.
+                    entry = None
+                if entry is not None:
+                    stale = entry[0] <= time.time()
+                    count(request, resource, 'stale_hits' if stale else 'hits')
+                    if stale and acquire(key):
+                        refresh_in_background(getattr(request, '_request', request), key)
+                    return restore(entry)
+
+                count(request, resource, 'misses')
+                locked = acquire(key)
+                if not locked:
+                    deadline = time.monotonic() + WAIT_TIMEOUT
+                    while time.monotonic() < deadline and is_locked(key):
+                        time.sleep(WAIT_INTERVAL)
+                        entry = cache.get(key)
+                        if entry is not None:
+                            return restore(entry)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                if locked:
+                    release(key)
+                raise
+            patch_vary_headers(response, ('Accept-Encoding',))
+
+            def update(response):
+                try:
+                    compress_response(request, response, CACHED)
+                    if response.status_code == 200 and not response.streaming:
+                        patch_response_headers(response, timeout)
+                        store(key, response, timeout, hard_timeout)
+                finally:
+                    if locked:
+                        release(key)
+                return response
+
+            if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+                response.add_post_render_callback(update)
+                return response
+            return update(response)
+        return wrapper
+    return decorator
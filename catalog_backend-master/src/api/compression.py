@@ -0,0 +1,107 @@
+import gzip
+import zlib
+
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Only JSON is compressed, HTML pages with CSRF tokens are left alone (BREACH).
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson')
+MIN_LENGTH = 200
+
+# Responses compressed per request favour speed, cached ones are compressed
+# once per cache fill and can afford a better ratio.
+FAST, CACHED = 'fast', 'cached'
+LEVELS = {
+    FAST: {'gzip': 6, 'br': 5},
+    CACHED: {'gzip': 9, 'br': 9},
+}
+
+
+def negotiate(accept_encoding):
+    """Return `'br'`, `'gzip'` or `None` for an `Accept-Encoding` header, preferring brotli."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().lower().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip()] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    for coding in ('br', 'gzip'):
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(content, encoding, level=FAST):
+    if encoding == 'br':
+        return brotli.compress(content, quality=LEVELS[level]['br'])
+    return gzip.compress(content, compresslevel=LEVELS[level]['gzip'], mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=LEVELS[FAST]['br'])
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(LEVELS[FAST]['gzip'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def compress_response(request, response, level=FAST):
+    """Compress a JSON `response` in place with the encoding negotiated for `request`."""
+    if response.has_header('Content-Encoding') or not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+        return response
+    if not response.streaming and len(response.content) < MIN_LENGTH:
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = compress_stream(response.streaming_content, encoding)
+        del response.headers['Content-Length']
+    else:
+        content = compress(response.content, encoding, level)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response.headers['Content-Length'] = str(len(content))
+
+    # See django.middleware.gzip.GZipMiddleware
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class CompressionMiddleware(object):
+    """Brotli or gzip compression of JSON responses, negotiated from `Accept-Encoding`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compress_response(request, self.get_response(request))
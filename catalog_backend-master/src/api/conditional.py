@@ -0,0 +1,47 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from api.caching import get_resource_versions, versions_digest
+from apps.services.versions import get_last_updated
+
+
+def get_validators(versions):
+    """
+    Return `(etag, last_modified)` of the current state of the models of
+    `versions` (as returned by `get_versions`): their change versions, and
+    the greatest `updated_at` of those that have one. Nothing is serialized:
+    unless the models changed since the last request it is two cache reads.
+    """
+    updated = [value for value in get_last_updated(versions).values() if value is not None]
+
+    digest = hashlib.md5(versions_digest(versions).encode(), usedforsecurity=False)
+    for value in updated:
+        digest.update(value.isoformat().encode())
+
+    last_modified = max(
+        [datetime.fromtimestamp(timestamp, timezone.utc) for timestamp, token in versions.values()] + updated
+    )
+    # Weak, the body differs per `Accept-Encoding` and is only semantically the same.
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def conditional_get(resource):
+    """
+    Method decorator answering conditional GETs (`If-None-Match`,
+    `If-Modified-Since`) of a viewset action with 304 Not Modified while the
+    models of `resource` (see `api.caching.RESOURCES`) are unchanged, before
+    any work of the view. Full responses get the `ETag` and `Last-Modified`
+    headers.
+    """
+    def validators(request):
+        if getattr(request, '_conditional_validators', None) is None:
+            request._conditional_validators = get_validators(get_resource_versions(request, resource))
+        return request._conditional_validators
+
+    return method_decorator(condition(
+        etag_func=lambda request, *args, **kwargs: validators(request)[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(request)[1],
+    ))
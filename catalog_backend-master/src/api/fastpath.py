@@ -0,0 +1,240 @@
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import FileSystemStorage
+from django.db.models.manager import BaseManager
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+# Field classes whose `to_representation` is a plain type conversion, as a
+# template of `v`. Matched exactly, subclasses may override the conversion.
+CONVERSIONS = {
+    fields.IntegerField: 'int(v)',
+    fields.FloatField: 'float(v)',
+    fields.CharField: 'str(v)',
+    fields.URLField: 'str(v)',
+    fields.EmailField: 'str(v)',
+    fields.SlugField: 'str(v)',
+    fields.ReadOnlyField: 'v',
+}
+
+
+def _model_field(serializer, name):
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _prefetch_cache_name(model_field):
+    """Key of `_prefetched_objects_cache` used by the related manager of a to-many relation."""
+    if model_field.many_to_many:
+        return model_field.name if model_field.concrete else model_field.field.related_query_name()
+    # `cache_name` replaces `get_cache_name()` as of Django 5.1.
+    cache_name = getattr(model_field, 'cache_name', None)
+    return cache_name if cache_name is not None else model_field.get_cache_name()
+
+
+def _storage_url(storage):
+    """`storage.url`, joining without `urljoin` for the plain relative paths of `FileSystemStorage`."""
+    if storage.__class__ is not FileSystemStorage:
+        return storage.url
+
+    def url(name):
+        base_url = storage.base_url
+        path = filepath_to_uri(name).lstrip('/')
+        if base_url is None or not base_url.endswith('/') or ':' in path or '?' in path or '#' in path \
+                or any(segment in ('', '.', '..') for segment in path.split('/')):
+            return storage.url(name)
+        return base_url + path
+    return url
+
+
+def _file_converter(field, model_field):
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+    storage_url = _storage_url(model_field.storage) if model_field is not None else None
+
+    def convert(value, context):
+        if not value:
+            return None
+        if not use_url:
+            return value.name
+        if storage_url is not None:
+            url = storage_url(value.name)
+        else:
+            try:
+                url = value.url
+            except AttributeError:
+                return None
+        request = context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def _datetime_converter(field):
+    to_representation = field.to_representation
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601 or hasattr(field, 'timezone') \
+            or not settings.USE_TZ:
+        return lambda value, context: to_representation(value)
+
+    def convert(value, context):
+        # The aware values stored with `USE_TZ`, see `DateTimeField.enforce_timezone`.
+        if not isinstance(value, datetime) or value.tzinfo is None:
+            return to_representation(value)
+        value = value.astimezone(timezone.get_current_timezone()).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _fallback_getter(field):
+    def getter(instance):
+        attribute = field.get_attribute(instance)
+        return attribute.pk if isinstance(attribute, PKOnlyObject) and attribute.pk is None else attribute
+    return getter
+
+
+def _compile_field(serializer, field):
+    """
+    Return `(getter, converter)` specs for `field`: the getter is `('attr', name)`,
+    `('prefetched', cache_name, name)` or `('call', function)`, the converter
+    `('expr', template)`, `('call', function)` or `('many', function)`.
+    """
+    source_attrs = field.source_attrs
+    model_field = _model_field(serializer, source_attrs[0]) if len(source_attrs) == 1 else None
+    if model_field is not None and model_field.one_to_one and not model_field.concrete:
+        # Reverse one-to-one raises `DoesNotExist`, which `get_attribute` turns into `None`.
+        model_field = None
+
+    if model_field is not None and isinstance(field, relations.PrimaryKeyRelatedField) \
+            and field.use_pk_only_optimization() and model_field.concrete and model_field.many_to_one:
+        # Read the `<name>_id` column, as `PKOnlyObject` does.
+        return ('attr', model_field.attname), ('expr', 'v')
+
+    if model_field is None:
+        getter = ('call', _fallback_getter(field))
+    elif model_field.many_to_many or model_field.one_to_many:
+        getter = ('prefetched', _prefetch_cache_name(model_field), source_attrs[0])
+    else:
+        getter = ('attr', source_attrs[0])
+
+    if isinstance(field, serializers.ListSerializer):
+        return getter, ('many', _compile(field.child))
+    if isinstance(field, serializers.BaseSerializer):
+        return getter, ('call', _compile(field))
+    if type(field) in (fields.ImageField, fields.FileField):
+        return getter, ('call', _file_converter(field, model_field))
+    if type(field) is fields.DateTimeField:
+        return getter, ('call', _datetime_converter(field))
+    if type(field) in CONVERSIONS and model_field is not None:
+        return getter, ('expr', CONVERSIONS[type(field)])
+
+    to_representation = field.to_representation
+    return getter, ('call', lambda value, context: to_representation(value))
+
+
+def _compile(serializer):
+    """Generate `to_representation(instance, context)` with one straight-line block per field."""
+    namespace = {'SkipField': SkipField, 'BaseManager': BaseManager}
+    body = ['    ret = {}']
+    for i, field in enumerate(serializer._readable_fields):
+        (get_kind, *get_args), (convert_kind, convert_arg) = _compile_field(serializer, field)
+        key = repr(field.field_name)
+        indent = '    '
+
+        if get_kind == 'attr':
+            body.append(f'    v = instance.{get_args[0]}')
+        elif get_kind == 'prefetched':
+            cache_name, attr = get_args
+            body.append('    cache = instance.__dict__.get("_prefetched_objects_cache")')
+            body.append(f'    v = cache[{cache_name!r}] if cache is not None and {cache_name!r} in cache '
+                        f'else instance.{attr}.all()')
+        else:
+            namespace[f'get_{i}'] = get_args[0]
+            body += ['    try:', f'        v = get_{i}(instance)', '    except SkipField:', '        pass',
+                     '    else:']
+            indent = '        '
+
+        if convert_kind == 'expr':
+            value = convert_arg
+        elif convert_kind == 'many':
+            namespace[f'convert_{i}'] = convert_arg
+            body.append(f'{indent}if isinstance(v, BaseManager):')
+            body.append(f'{indent}    v = v.all()')
+            value = f'[convert_{i}(item, context) for item in v]'
+        else:
+            namespace[f'convert_{i}'] = convert_arg
+            value = f'convert_{i}(v, context)'
+        body.append(f'{indent}ret[{key}] = None if v is None else {value}')
+    body.append('    return ret')
+
+    source = 'def to_representation(instance, context):\n' + '\n'.join(body) + '\n'
+    exec(compile(source, f'<compiled {type(serializer).__name__}>', 'exec'), namespace)
+    return namespace['to_representation']
+
+
+@lru_cache(maxsize=256)
+def _compile_shape(serializer_class, fields, expand):
+    # Compiled from a serializer of its own, so that the function keeps no request.
+    return _compile(serializer_class(context={'fields': fields, 'expand': expand}))
+
+
+def compile_serializer(serializer):
+    """
+    Compile the read-only representation of `serializer` (an instance, bound
+    to its context) into a function `(instance, context) -> dict` producing
+    the same output as `serializer.to_representation()` without the per-field
+    DRF machinery. Instances should be prefetched (see `api.prefetch`).
+
+    Functions are cached by serializer class and the `fields` and `expand`
+    of the context (see `api.sparse`), which are all that shape the output.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    fields = serializer.context.get('fields')
+    return _compile_shape(type(serializer), None if fields is None else tuple(fields),
+                          tuple(serializer.context.get('expand') or ()))
+
+
+class CompiledSerializer(object):
+    """Read-only stand-in for a bound serializer exposing the compiled `.data`."""
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    @property
+    def data(self):
+        serializer = self.serializer
+        to_representation = compile_serializer(serializer)
+        if isinstance(serializer, serializers.ListSerializer):
+            instances = serializer.instance
+            if isinstance(instances, BaseManager):
+                instances = instances.all()
+            return ReturnList([to_representation(instance, serializer.context) for instance in instances],
+                              serializer=serializer)
+        return ReturnDict(to_representation(serializer.instance, serializer.context), serializer=serializer)
+
+
+class CompiledSerializerMixin(object):
+    """
+    Viewset mixin serializing the read-only `compiled_actions` with
+    `CompiledSerializer`. Other actions, and serializers without instance,
+    keep the regular DRF serializer.
+    """
+    compiled_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action in self.compiled_actions and serializer.instance is not None and 'data' not in kwargs:
+            return CompiledSerializer(serializer)
+        return serializer
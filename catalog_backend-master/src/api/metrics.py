@@ -0,0 +1,246 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+# Name: (type, help) of the metrics, see `Registry`.
+METRICS = {
+    'api_requests_total': ('counter', 'API requests by router basename, action, method and status.'),
+    'api_request_duration_seconds': ('histogram', 'Duration of API requests, rendering included.'),
+    'api_db_queries_total': ('counter', 'Database queries of API requests.'),
+    'api_db_duration_seconds_total': ('counter', 'Database time of API requests.'),
+    'api_page_cache_total': ('counter', 'Page cache lookups of API requests by result (hit, stale or miss).'),
+    'db_connections_opened_total': ('counter', 'Database connections opened, by alias.'),
+}
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Workers write their values to `settings.METRICS_DIR` at most this often.
+FLUSH_INTERVAL = 5
+
+# Values of the exited workers of the server, see `retire`.
+EXITED_FILE = 'exited.json'
+
+
+class Registry(object):
+    """
+    Counters and histograms of this process, by name and labels (a tuple of
+    `(name, value)` pairs). With `settings.METRICS_DIR` every serving process
+    (see `start`) writes its values to a file of its own there, and `collect`
+    adds up the files of all workers and of the exited ones, so that gunicorn
+    workers share totals. Other processes (management commands, shells) keep
+    their values to themselves.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.serving = False
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = defaultdict(float)
+        # Per bucket counts (the last one is `+Inf`), then the sum.
+        self.histograms = {}
+        self.next_flush = 0
+
+    def check_fork(self):
+        if os.getpid() != self.pid:
+            # Values of the parent process are in its own file.
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.check_fork()
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        index = bisect.bisect_left(BUCKETS, value)
+        with self.lock:
+            self.check_fork()
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[name, labels] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            self.check_fork()
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, values] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self):
+        """Write the values of this process to its file in `settings.METRICS_DIR`, when serving."""
+        if not (self.serving and settings.METRICS_DIR):
+            return
+        write(get_path(self.pid), self.snapshot())
+
+    def maybe_flush(self):
+        now = time.monotonic()
+        if self.serving and settings.METRICS_DIR and now >= self.next_flush:
+            self.next_flush = now + FLUSH_INTERVAL
+            self.flush()
+
+    def collect(self):
+        """`(counters, histograms)` of all processes, as dicts by `(name, labels)`."""
+        snapshots = [self.snapshot()]
+        if settings.METRICS_DIR:
+            self.flush()
+            own = get_path(self.pid)
+            snapshots += [snapshot for path, snapshot in read_all() if path != own]
+        return merge(snapshots)
+
+
+registry = Registry()
+
+
+def get_path(pid):
+    # A pid is not reused before the worker is retired, see `retire`.
+    return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+
+def write(path, snapshot):
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot, file, separators=(',', ':'))
+    os.replace(temporary, path)
+
+
+def read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        # Removed, or replaced while read.
+        return None
+
+
+def read_all():
+    """`(path, snapshot)` of the files in `settings.METRICS_DIR`."""
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        snapshot = read(path)
+        if snapshot is not None:
+            yield path, snapshot
+
+
+def merge(snapshots):
+    """`(counters, histograms)` adding up `snapshots`, as dicts by `(name, labels)`."""
+    counters, histograms = defaultdict(float), {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, values in snapshot['histograms']:
+            key = name, tuple(map(tuple, labels))
+            if key in histograms:
+                values = [a + b for a, b in zip(histograms[key], values)]
+            histograms[key] = list(values)
+    return counters, histograms
+
+
+def clear():
+    """Remove the files of all processes from `settings.METRICS_DIR`, as a new server starts."""
+    if not settings.METRICS_DIR:
+        return
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+
+
+def start():
+    """Record the metrics of this process for the server, called as a worker starts."""
+    registry.check_fork()
+    registry.serving = True
+    connection_created.connect(connection_opened, dispatch_uid='api.metrics')
+
+
+def stop():
+    """Write the last values of this process, called as a worker exits."""
+    registry.flush()
+
+
+def retire(pid):
+    """
+    Add the values of the exited worker `pid` to those of the exited workers
+    and remove its file, called by the server. Keeps totals from decreasing,
+    and the number of files to that of the workers.
+    """
+    if not settings.METRICS_DIR:
+        return
+    path = get_path(pid)
+    snapshot = read(path)
+    if snapshot is None:
+        return
+    exited_path = os.path.join(settings.METRICS_DIR, EXITED_FILE)
+    exited = read(exited_path)
+    counters, histograms = merge([exited, snapshot] if exited else [snapshot])
+    write(exited_path, {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, values] for (name, labels), values in histograms.items()],
+    })
+    os.remove(path)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels) + '}'
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render():
+    """The metrics of all processes in the Prometheus text format."""
+    counters, histograms = registry.collect()
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{format_labels(labels)} {format_number(value)}')
+        else:
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), values[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {format_number(values[-1])}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def record_request(timings, method, status, seconds):
+    """Count a request of a viewset with `api.timing.TimingMixin`, labeled by its router basename."""
+    basename = (('basename', timings.basename),)
+    registry.inc('api_requests_total', basename + (('action', timings.action or ''), ('method', method),
+                                                   ('status', str(status))))
+    registry.observe('api_request_duration_seconds', basename, seconds)
+    registry.inc('api_db_queries_total', basename, timings.queries)
+    registry.inc('api_db_duration_seconds_total', basename, timings.db / 1000)
+    if timings.cache:
+        registry.inc('api_page_cache_total', basename + (('result', timings.cache),))
+    registry.maybe_flush()
+
+
+def connection_opened(sender, connection, **kwargs):
+    registry.inc('db_connections_opened_total', (('alias', connection.alias),))
@@ -1,36 +1,162 @@
+import base64
+import json
+
 import six
 from django.core.paginator import InvalidPage
+from django.db.models import Q
 from rest_framework import pagination
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination over the unique `ordering` of the view (`cursor_ordering`).
+    Pages continue from the last row seen with a `WHERE (a, b) < (x, y)` style
+    filter, so there is no `COUNT(*)` and no `OFFSET` and deep pages cost the
+    same as the first one. Cursors are opaque url-safe strings.
+    """
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({"p": position, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+            position, reverse = data["p"], bool(data["r"])
+            if len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            position.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return position
+
+    def after(self, queryset, ordering, position):
+        """Rows strictly after `position` in `ordering`, as an OR of column prefixes."""
+        opts = queryset.model._meta
+        values = []
+        for field, value in zip(ordering, position):
+            try:
+                values.append(opts.get_field(field.lstrip("-")).to_python(value))
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            prefix = {ordering[j].lstrip("-"): values[j] for j in range(i)}
+            condition |= Q(**prefix, **{f"{name}__{lookup}": values[i]})
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = self.after(queryset, ordering, position)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next, has_previous = (position is not None, has_more) if reverse else (has_more, position is not None)
+        self.next_cursor = self.encode_cursor(self.get_position(rows[-1]), False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(self.get_position(rows[0]), True) if rows and has_previous else None
+        return rows
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "links": {"next": self.get_link(self.next_cursor), "previous": self.get_link(self.previous_cursor)},
+                "per_page": self.page_size,
+                "results": data,
+            }
+        )
 
 
 class Pagination(pagination.PageNumberPagination):
     page_size_query_param = "page_size"
+    cursor_query_param = KeysetPagination.cursor_query_param
+    keyset = None
+    # Upper bound of `page_size`, larger lists are only served streamed.
+    max_page_size = 100
+    invalid_page_size_message = "Enter a positive number, or -1 (or 0) for all results."
+    unstreamed_page_size_message = "All results (-1) are not available for this list."
+    unordered_cursor_message = "Cursor pagination is not available for this ordering, e.g. by search relevance."
 
     def get_page_size(self, request):
         if self.page_size_query_param:
             try:
                 page_size = int(request.query_params[self.page_size_query_param])
-                return page_size
             except (KeyError, ValueError):
                 pass
+            else:
+                if page_size in (0, -1):
+                    # `0` is the former spelling of all results, streamed like `-1`.
+                    return -1
+                if page_size < 1:
+                    raise ValidationError({self.page_size_query_param: [self.invalid_page_size_message]})
+                return min(page_size, self.max_page_size)
         # Fallback to default page size if not set
         if hasattr(self, 'page_size') and self.page_size is not None:
             return self.page_size
         return 25  # Default fallback page size
 
+    def is_streaming(self, request):
+        """`page_size=-1` asks for all results, streamed by `api.streaming.StreamingListMixin`."""
+        return self.get_page_size(request) == -1
+
     def paginate_queryset(self, queryset, request, view=None):
         """
         Paginate a queryset if required, either returning a
         page object, or `None` if pagination is not configured for this view.
         """
         page_size = self.get_page_size(request)
-
-        if not page_size:
-            return None
         if page_size == -1:
-            page_size = queryset.count() or 1
+            # Served by `api.streaming.StreamingListMixin`, which does not paginate.
+            raise ValidationError({self.page_size_query_param: [self.unstreamed_page_size_message]})
+
+        ordering = getattr(view, "cursor_ordering", None)
+        wants_cursor = self.cursor_query_param in request.query_params
+        if wants_cursor and ordering is None and hasattr(view, "cursor_ordering"):
+            # The view has no keyset order for this request, keyset pages would reorder the results.
+            raise ValidationError({self.cursor_query_param: [self.unordered_cursor_message]})
+        if ordering and wants_cursor:
+            # Opt-in keyset mode, e.g. `?cursor=` for the first page.
+            self.keyset = KeysetPagination(ordering, page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
 
         paginator = self.django_paginator_class(queryset, page_size)
         page_number = request.query_params.get(self.page_query_param, 1)
@@ -50,6 +176,8 @@ class Pagination(pagination.PageNumberPagination):
         return list(self.page)
 
     def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
         return Response(
             {
                 "links": {"next": self.get_next_link(), "previous": self.get_previous_link()},
@@ -59,4 +187,4 @@ class Pagination(pagination.PageNumberPagination):
                 "page": self.page.number,
                 "results": data,
             }
-        )
\ No newline at end of file
+        )
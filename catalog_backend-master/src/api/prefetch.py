@@ -0,0 +1,125 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.fields.related import ForeignObjectRel
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, RelatedField
+
+
+def _get_relation(model, attr):
+    """
+    Return the relation field behind the attribute `attr` of `model`, or `None`
+    if `attr` is a plain column, a property or anything else.
+    Reverse relations are matched by their accessor name (i.e. `related_name`).
+    """
+    for field in model._meta.get_fields():
+        if isinstance(field, ForeignObjectRel):
+            if field.get_accessor_name() == attr:
+                return field
+        elif field.name == attr and field.is_relation:
+            return field
+    return None
+
+
+def _is_single(relation):
+    """`True` for relations that can be joined with `select_related`."""
+    return relation.many_to_one or relation.one_to_one
+
+
+def _walk(serializer, model, prefix, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        attr = field.source_attrs[0]
+        relation = _get_relation(model, attr)
+        if relation is None:
+            continue
+        lookup = prefix + attr
+        related_model = relation.related_model
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+        elif isinstance(field, ManyRelatedField):
+            child = field.child_relation
+        else:
+            child = field
+
+        if isinstance(child, serializers.BaseSerializer):
+            if _is_single(relation):
+                select.append(lookup)
+                _walk(child, related_model, lookup + '__', select, prefetch)
+            else:
+                prefetch.append(Prefetch(lookup, queryset=plan_queryset(related_model._default_manager.all(), child)))
+        elif isinstance(child, RelatedField):
+            if _is_single(relation):
+                # Primary keys are read from the local `<name>_id` column.
+                if not isinstance(child, PrimaryKeyRelatedField):
+                    select.append(lookup)
+            else:
+                prefetch.append(lookup)
+
+
+def get_plan(serializer, model):
+    """
+    Inspect the field tree of `serializer` and return a tuple of
+    `(select_related, prefetch_related)` lookups needed to serialize
+    instances of `model` without extra queries.
+    """
+    select, prefetch = [], []
+    _walk(serializer, model, '', select, prefetch)
+    return select, prefetch
+
+
+def plan_queryset(queryset, serializer):
+    """
+    Apply the `select_related`/`Prefetch` lookups required by `serializer`
+    (a serializer class or instance) to `queryset`.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    select, prefetch = get_plan(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def get_only_fields(serializer, model):
+    """
+    Return the columns of `model` read by the top level fields of `serializer`
+    (a serializer instance), for `QuerySet.only()`. Related rows are loaded by
+    the plan of `get_plan`. Returns `None` when a field reads anything other
+    than a model field (a property, a method, the whole object).
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    columns = [model._meta.pk.name]
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return None
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not model_field.is_relation or (model_field.concrete and _is_single(model_field)):
+            columns.append(model_field.name)
+    return columns
+
+
+class PrefetchPlannerMixin(object):
+    """
+    Derives `select_related`/`prefetch_related` for the current action from
+    the serializer returned by `get_serializer()`, so nested serializers
+    never cause N+1 queries.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return plan_queryset(queryset, self.get_serializer())
@@ -0,0 +1,114 @@
+import json
+import re
+import uuid
+
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # `ORJSONRenderer` renders with `json` then
+    orjson = None
+
+
+class RawJSON(object):
+    """
+    A pre-rendered JSON document. `JSONRenderer` embeds its text verbatim
+    instead of encoding it again.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def substitute(text, marker, fragments):
+    """Replace the `"marker:i"` strings of `text`, in order of appearance, with `fragments`."""
+    parts = re.split(f'"{marker}:\\d+"', text)
+    output = [parts[0]]
+    for fragment, part in zip(fragments, parts[1:]):
+        output += (fragment, part)
+    return ''.join(output)
+
+
+class FragmentEncoder(json.JSONEncoder):
+    """
+    Replaces `RawJSON` values with a unique marker string and collects their
+    text in `fragments`, so the markers can be substituted after encoding.
+    """
+
+    def __init__(self, *args, encoder_class, marker, fragments, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fallback = encoder_class(*args, **kwargs)
+        self.marker = marker
+        self.fragments = fragments
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            self.fragments.append(obj.text)
+            return f'{self.marker}:{len(self.fragments) - 1}'
+        return self.fallback.default(obj)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """`JSONRenderer` that also accepts `RawJSON` fragments anywhere in `data`."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if indent is None:
+            separators = renderers.SHORT_SEPARATORS if self.compact else renderers.LONG_SEPARATORS
+        else:
+            separators = renderers.INDENT_SEPARATORS
+
+        marker = uuid.uuid4().hex
+        fragments = []
+        ret = json.dumps(
+            data, cls=FragmentEncoder, encoder_class=self.encoder_class, marker=marker, fragments=fragments,
+            indent=indent, ensure_ascii=self.ensure_ascii, allow_nan=not self.strict, separators=separators
+        )
+        if fragments:
+            ret = substitute(ret, marker, fragments)
+
+        # See rest_framework.renderers.JSONRenderer.render
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` encoding compact output with orjson. Indented output (the
+    browsable API), and everything orjson does not know natively, go through
+    the regular encoder so the output is the same.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if orjson is None or not self.compact or self.ensure_ascii or \
+                self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        fallback = self.encoder_class()
+        marker = uuid.uuid4().hex
+        fragments = []
+
+        def default(obj):
+            if isinstance(obj, RawJSON):
+                fragments.append(obj.text)
+                return f'{marker}:{len(fragments) - 1}'
+            return fallback.default(obj)
+
+        ret = orjson.dumps(data, default=default,
+                           option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        # See rest_framework.renderers.JSONRenderer.render. `RawJSON` fragments
+        # are rendered documents, escaped already.
+        ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        if fragments:
+            ret = substitute(ret.decode(), marker, fragments).encode()
+        return ret
@@ -0,0 +1,104 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from api.prefetch import get_only_fields
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    """Split a comma separated `?fields=`/`?expand=` value, dropping blanks and duplicates."""
+    names = []
+    for name in value.split(','):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class SparseFieldsSerializerMixin(object):
+    """
+    Serializer mixin restricting the top level output to `context['fields']`
+    and adding the `Meta.expandable_fields` named in `context['expand']`.
+    `expandable_fields` maps a field name to `(serializer_class, kwargs)`.
+    Nested serializers are not affected.
+    """
+
+    @classmethod
+    def get_expandable_fields(cls):
+        return getattr(cls.Meta, 'expandable_fields', {})
+
+    def is_top_level(self):
+        root = self.root
+        return self is root or (self.parent is root and isinstance(root, serializers.ListSerializer))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_top_level():
+            return fields
+
+        expandable = self.get_expandable_fields()
+        expand = [name for name in self.context.get('expand') or () if name in expandable]
+        for name in expand:
+            serializer_class, kwargs = expandable[name]
+            fields[name] = serializer_class(**kwargs)
+
+        selected = self.context.get('fields')
+        if selected is not None:
+            fields = {name: field for name, field in fields.items() if name in selected or name in expand}
+        return fields
+
+
+class SparseFieldsMixin(object):
+    """
+    Viewset mixin for `?fields=a,b` (sparse fieldsets) and `?expand=c`
+    (opt-in fields) on serializers using `SparseFieldsSerializerMixin`. The
+    shape is passed to the serializer through its context, so the prefetch
+    plan follows it, and sparse requests only load the columns they render.
+    """
+    known_query_params = (FIELDS_PARAM, EXPAND_PARAM)
+
+    def get_requested_shape(self):
+        """Return `(fields, expand)` of the request, `fields` being `None` when not restricted."""
+        if hasattr(self, '_requested_shape'):
+            return self._requested_shape
+
+        params = self.request.query_params if self.request is not None else {}
+        fields = parse_names(params[FIELDS_PARAM]) if params.get(FIELDS_PARAM) else None
+        expand = parse_names(params.get(EXPAND_PARAM, ''))
+
+        serializer_class = self.get_serializer_class()
+        expandable = serializer_class.get_expandable_fields() \
+            if issubclass(serializer_class, SparseFieldsSerializerMixin) else {}
+        errors = {}
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            errors[EXPAND_PARAM] = [f"Unknown fields: {', '.join(unknown)}"]
+        if fields is not None:
+            available = set(serializer_class().fields) | set(expandable)
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                errors[FIELDS_PARAM] = [f"Unknown fields: {', '.join(unknown)}"]
+        if errors:
+            raise ValidationError(errors)
+
+        self._requested_shape = (fields, expand)
+        return self._requested_shape
+
+    def is_sparse(self):
+        fields, expand = self.get_requested_shape()
+        return fields is not None or bool(expand)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_requested_shape()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.get_requested_shape()[0] is not None:
+            columns = get_only_fields(self.get_serializer(), queryset.model)
+            if columns is not None:
+                queryset = queryset.only(*columns)
+        return queryset
@@ -0,0 +1,59 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from api.renderers import ORJSONRenderer
+
+
+class StreamingListMixin(object):
+    """
+    Serves `page_size=-1` ("all results") as a `StreamingHttpResponse`. The
+    queryset is read with `iterator()` in chunks of `stream_chunk_size` (with
+    the prefetches applied per chunk) and every chunk is serialized and sent
+    before the next one is read, so memory stays flat whatever the catalog size.
+    The body has the same shape as a single page of `api.pagination.Pagination`.
+    """
+    stream_chunk_size = 500
+
+    def wants_stream(self, request):
+        return self.paginator is not None and getattr(self.paginator, 'is_streaming', lambda r: False)(request)
+
+    def serialize_chunk(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def stream(self, queryset, serialize=None):
+        serialize = serialize or self.serialize_chunk
+        count = queryset.count()
+        renderer = ORJSONRenderer()
+
+        def render(data):
+            return renderer.render(data, renderer_context={'indent': None})
+
+        def content():
+            head = render({
+                "links": {"next": None, "previous": None},
+                "count": count,
+                "total_pages": 1,
+                "per_page": count or 1,
+                "page": 1,
+            })
+            yield head[:-1] + b',"results":['
+
+            rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+            separator = b''
+            while True:
+                chunk = list(islice(rows, self.stream_chunk_size))
+                if not chunk:
+                    break
+                body = render(serialize(chunk))[1:-1]
+                if body:
+                    yield separator + body
+                    separator = b','
+            yield b']}'
+
+        return StreamingHttpResponse(content(), content_type='application/json')
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_stream(request):
+            return self.stream(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,183 @@
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.response import Response
+
+from api import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Timings(object):
+    """Where the time of a request went, in milliseconds, see `TimingMiddleware`."""
+    __slots__ = ('start', 'basename', 'action', 'queries', 'db', 'serialize', 'render', 'cache')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # Router basename and action of the view, see `TimingMixin`.
+        self.basename = self.action = None
+        self.queries = 0
+        self.db = self.serialize = self.render = 0.0
+        # `hit`, `stale` or `miss` of the page cache, see `api.caching.cache_response`.
+        self.cache = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # A `connection.execute_wrapper`.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += (time.perf_counter() - start) * 1000
+            self.queries += 1
+
+    @property
+    def endpoint(self):
+        return f'{self.basename}-{self.action}' if self.action else self.basename
+
+    def as_dict(self):
+        return {
+            'endpoint': self.endpoint,
+            'queries': self.queries,
+            'db_ms': round(self.db, 1),
+            'serialize_ms': round(self.serialize, 1),
+            'render_ms': round(self.render, 1),
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 1),
+            'cache': self.cache,
+        }
+
+    def server_timing(self, record):
+        entries = [f'db;dur={record["db_ms"]};desc="{self.queries} queries"',
+                   f'serialize;dur={record["serialize_ms"]}', f'render;dur={record["render_ms"]}']
+        if self.cache:
+            entries.append(f'cache;desc="{self.cache}"')
+        entries.append(f'total;dur={record["total_ms"]}')
+        return ', '.join(entries)
+
+
+def get_timings(request):
+    """The `Timings` of `request` (a Django or DRF request), `None` when not recorded."""
+    return getattr(getattr(request, '_request', request), 'timings', None)
+
+
+@contextmanager
+def timed(request, name):
+    """Add the time spent in the block to the `name` timing of `request`."""
+    timings = get_timings(request)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, getattr(timings, name) + (time.perf_counter() - start) * 1000)
+
+
+class TimedSerializer(object):
+    """Stand-in for a bound serializer timing its `.data` as serialization."""
+
+    def __init__(self, serializer, timings):
+        self.serializer = serializer
+        self.timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+    @property
+    def data(self):
+        start = time.perf_counter()
+        try:
+            return self.serializer.data
+        finally:
+            self.timings.serialize += (time.perf_counter() - start) * 1000
+
+
+class TimedRenderer(object):
+    """Stand-in for a renderer timing its `render`."""
+
+    def __init__(self, renderer, timings):
+        self.renderer = renderer
+        self.timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self.renderer, name)
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.renderer.render(*args, **kwargs)
+        finally:
+            self.timings.render += (time.perf_counter() - start) * 1000
+
+
+class TimingMixin(object):
+    """
+    Viewset mixin recording the endpoint, serialization and rendering time
+    of its requests for `TimingMiddleware`. Streamed content is produced
+    after the response is returned and not timed.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Set before the handler runs, so that failed requests have an endpoint too.
+        request = super().initialize_request(request, *args, **kwargs)
+        timings = get_timings(request)
+        if timings is not None:
+            timings.basename, timings.action = self.basename, self.action
+        return request
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        timings = get_timings(self.request)
+        if timings is not None and (args or 'instance' in kwargs) and 'data' not in kwargs:
+            return TimedSerializer(serializer, timings)
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        timings = get_timings(request)
+        if timings is not None and isinstance(response, Response) and not response.is_rendered:
+            response.accepted_renderer = TimedRenderer(response.accepted_renderer, timings)
+        return response
+
+
+class TimingMiddleware(object):
+    """
+    Record the query count, database time, serialization and rendering time
+    and page cache status of the requests of views with `TimingMixin`. With
+    `settings.API_TIMING` each is logged as a JSON line, and sent as a
+    `Server-Timing` header to staff users (to everyone with
+    `settings.API_SERVER_TIMING_PUBLIC`). With `settings.API_METRICS` they
+    are counted by `api.metrics`. Cache warm-up requests (see `api.warmup`)
+    are neither.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.API_TIMING or settings.API_METRICS) or getattr(request, 'warming_cache', False):
+            return self.get_response(request)
+
+        timings = request.timings = Timings()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        if timings.basename is None:
+            return response
+
+        record = timings.as_dict()
+        if settings.API_METRICS:
+            metrics.record_request(timings, request.method, response.status_code, record['total_ms'] / 1000)
+        if not settings.API_TIMING:
+            return response
+        logger.info(json.dumps({'method': request.method, 'path': request.path, 'status': response.status_code,
+                                **record}, separators=(',', ':')))
+        user = getattr(request, 'user', None)
+        if settings.API_SERVER_TIMING_PUBLIC or getattr(user, 'is_staff', False):
+            response.headers['Server-Timing'] = timings.server_timing(record)
+        return response
@@ -1,9 +1,14 @@
 from rest_framework import serializers
 
+from api.sparse import SparseFieldsSerializerMixin
+from api.v1.catalog.serializers import BriefCatalogServiceSerializer
 from apps.blog.models import BlogPost
 
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = BlogPost
         fields = ['id', 'title', 'text', 'image_url', 'image', 'created_at', 'updated_at']
+        expandable_fields = {
+            'service': (BriefCatalogServiceSerializer, {}),
+        }
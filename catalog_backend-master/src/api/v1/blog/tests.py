@@ -2,6 +2,7 @@ import pytest
 from django.urls import reverse
 from rest_framework import status
 from apps.blog.models import BlogPost
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory
 
 pytestmark = pytest.mark.integration
 
@@ -9,4 +10,17 @@ pytestmark = pytest.mark.integration
 def test_blogpost_list(client):
     url = reverse('v1:blog:posts-list')
     response = client.get(url)
-    assert response.status_code == status.HTTP_200_OK 
\ No newline at end of file
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_blogpost_list_expand_service(client):
+    service = ServiceFactory.create(tags=ServiceTagFactory.create_batch(2))
+    BlogPost.objects.create(title='Post', text='Text', image_url='https://example.com/image.png', service=service)
+
+    response = client.get(reverse('v1:blog:posts-list'), {'fields': 'title,service', 'expand': 'service'})
+
+    [result] = response.json()['results']
+    assert set(result) == {'title', 'service'}
+    assert result['service']['id'] == service.id
+    assert len(result['service']['tags']) == 2
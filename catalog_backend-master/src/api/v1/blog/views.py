@@ -1,12 +1,31 @@
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 
+from api.caching import cache_response
+from api.conditional import conditional_get
+from api.fastpath import CompiledSerializerMixin
+from api.prefetch import PrefetchPlannerMixin
+from api.sparse import SparseFieldsMixin
+from api.streaming import StreamingListMixin
+from api.timing import TimingMixin
+from api.v1.catalog.views import CACHING_PERIOD
 from apps.blog.models import BlogPost
 from .serializers import BlogPostSerializer
 from rest_framework import viewsets
 from rest_framework.response import Response
 
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogPostViewSet(TimingMixin, StreamingListMixin, SparseFieldsMixin, CompiledSerializerMixin,
+                      PrefetchPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostSerializer
+
+    @conditional_get('blog')
+    @method_decorator(cache_response(CACHING_PERIOD, 'blog'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get('blog')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
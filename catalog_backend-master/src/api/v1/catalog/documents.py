@@ -0,0 +1,84 @@
+import re
+
+from django.conf import settings
+
+from api.fastpath import compile_serializer
+from api.prefetch import plan_queryset
+from api.renderers import ORJSONRenderer, RawJSON
+from api.timing import timed
+from apps.services.models import Service, ServiceDocument
+from .serializers import BriefCatalogServiceSerializer, CatalogServiceSerializer
+
+DOCUMENT_SERIALIZERS = {
+    'brief': BriefCatalogServiceSerializer,
+    'detail': CatalogServiceSerializer,
+}
+
+
+def render_documents(services):
+    """
+    Render every form of `DOCUMENT_SERIALIZERS` for `services`, which must be
+    prefetched for `CatalogServiceSerializer` (a superset of the brief form).
+    """
+    renderer = ORJSONRenderer()
+    context = {'request': None}
+    compiled = {name: compile_serializer(serializer(context=context)) for name, serializer in DOCUMENT_SERIALIZERS.items()}
+    documents = []
+    for service in services:
+        rendered = {
+            name: renderer.render(to_representation(service, context)).decode()
+            for name, to_representation in compiled.items()
+        }
+        documents.append(ServiceDocument(service=service, **rendered))
+    return documents
+
+
+def build_documents(service_ids=None, batch_size=500):
+    """
+    Rebuild and store the documents of the services in `service_ids` (all
+    services if `None`). Returns a mapping of service id to `ServiceDocument`.
+    """
+    queryset = plan_queryset(Service.objects.order_by('pk'), CatalogServiceSerializer)
+    if service_ids is not None:
+        queryset = queryset.filter(pk__in=service_ids)
+
+    built = {}
+    last_pk = 0
+    while True:
+        batch = render_documents(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return built
+        ServiceDocument.objects.bulk_create(batch, update_conflicts=True, unique_fields=['service'],
+                                            update_fields=['brief', 'detail', 'updated_at'])
+        built.update((document.service_id, document) for document in batch)
+        last_pk = batch[-1].service_id
+
+
+def absolutize(text, request):
+    """
+    Documents are rendered without a request, so media URLs are only absolute
+    when `MEDIA_URL` is. Otherwise make them absolute for `request`, as
+    `ImageField` does.
+    """
+    if request is None or not settings.MEDIA_URL.startswith('/'):
+        return text
+    # A JSON string starting with MEDIA_URL can only follow one of `:`, `,` or `[`.
+    return re.sub(r'(?<=[:,\[])"' + re.escape(settings.MEDIA_URL),
+                  lambda _: '"' + request.build_absolute_uri(settings.MEDIA_URL), text)
+
+
+def get_documents(services, form, request=None):
+    """
+    Return the `form` documents of `services` as a list of `RawJSON`, keeping
+    the order. Missing documents are built on the fly. Timed as the
+    serialization of `request`.
+    """
+    with timed(request, 'serialize'):
+        ids = [service.pk for service in services]
+        texts = dict(ServiceDocument.objects.filter(service_id__in=ids).values_list('service_id', form))
+
+        missing = [pk for pk in ids if pk not in texts]
+        if missing:
+            texts.update((pk, getattr(document, form)) for pk, document in build_documents(missing).items())
+
+        return [RawJSON(absolutize(texts[pk], request)) for pk in ids if pk in texts]
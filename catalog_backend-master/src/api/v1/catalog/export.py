@@ -0,0 +1,59 @@
+import re
+from datetime import datetime, time
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .documents import absolutize, build_documents
+
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def parse_updated_since(value):
+    """Parse an ISO date or datetime (naive values are in the current timezone); `None` if empty."""
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value!r}")
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_queryset(queryset, updated_since=None):
+    """
+    Restrict `queryset` to services whose row or document (which also changes
+    with their relations) was updated at or after `updated_since`.
+    """
+    if updated_since is not None:
+        queryset = queryset.filter(Q(updated_at__gte=updated_since) | Q(document__updated_at__gte=updated_since))
+    return queryset
+
+
+def export_lines(queryset, request=None, chunk_size=1000):
+    """
+    Yield the detail documents of `queryset` as NDJSON, one chunk of lines of
+    up to `chunk_size` services at a time. Rows are read through a server-side
+    cursor together with their document; missing documents are built per chunk.
+    """
+    rows = queryset.order_by('pk').values_list('pk', 'document__detail').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        missing = [pk for pk, text in chunk if text is None]
+        built = {pk: document.detail for pk, document in build_documents(missing).items()} if missing else {}
+
+        lines = []
+        for pk, text in chunk:
+            text = text if text is not None else built.get(pk)
+            if text is not None:
+                lines.append(absolutize(text, request))
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode()
@@ -0,0 +1,41 @@
+from django.db.models import Count, F, Value, IntegerField, CharField
+
+from apps.services.models import Service
+
+# Facet name -> M2M field of `Service` it counts.
+FACETS = ('tags', 'categories', 'countries')
+
+
+def facet_counts(queryset):
+    """
+    Count the services of `queryset` per tag, category and country, plus the
+    total, in a single `UNION ALL` of grouped queries over the through tables.
+    """
+    service_ids = queryset.order_by().values('pk')
+
+    total = queryset.order_by().values(
+        facet=Value('count'), facet_id=Value(0, output_field=IntegerField()),
+        facet_name=Value('', output_field=CharField()),
+    ).annotate(count=Count('pk'))
+
+    branches = []
+    for facet in FACETS:
+        field = Service._meta.get_field(facet)
+        target = field.m2m_reverse_field_name()
+        branches.append(
+            field.remote_field.through.objects.filter(service_id__in=service_ids).values(
+                facet=Value(facet), facet_id=F(f'{target}_id'), facet_name=F(f'{target}__name'),
+            ).annotate(count=Count('service_id'))
+        )
+
+    result = {facet: [] for facet in FACETS}
+    result['count'] = 0
+    for row in total.union(*branches, all=True):
+        if row['facet'] == 'count':
+            result['count'] = row['count']
+        else:
+            result[row['facet']].append({'id': row['facet_id'], 'name': row['facet_name'], 'count': row['count']})
+
+    for facet in FACETS:
+        result[facet].sort(key=lambda value: (-value['count'], value['name']))
+    return result
@@ -1,18 +1,77 @@
 import django_filters
+from django.db.models import F
+from django_filters.constants import EMPTY_VALUES
 
-from apps.services.models import ServiceTag, Service, ServiceCategory, ServiceRatingReview
+from apps.services.denormalize import ID_ARRAYS
+from apps.services.models import ServiceTag, Service, ServiceCategory, ServiceRatingReview, Country, Certificate, \
+    ServiceRating
+from apps.services.search import search_services
+
+# `?ordering=` fields of the services list.
+ORDERING_FIELDS = ('created_at', 'updated_at', 'name', 'score')
+
+
+class StableOrderingFilter(django_filters.OrderingFilter):
+    """
+    `OrderingFilter` breaking ties by primary key, in the direction of the
+    last field so that an index on `(field, id)` serves both directions.
+    """
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value in EMPTY_VALUES:
+            return qs
+        ordering = qs.query.order_by
+        return qs.order_by(*ordering, '-pk' if ordering[-1].startswith('-') else 'pk')
 
 
 class ServiceFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(field_name="name", lookup_expr="icontains")
+    search = django_filters.CharFilter(method='filter_search')
 
+    # Services having all of the given tags/categories/certificates
     tags = django_filters.ModelMultipleChoiceFilter(
         queryset=ServiceTag.objects.all(),
-        conjoined=True, field_name="tags")
+        field_name="tags", method='filter_all')
 
     categories = django_filters.ModelMultipleChoiceFilter(
         queryset=ServiceCategory.objects.all(),
-        conjoined=True, field_name="categories")
+        field_name="categories", method='filter_all')
+
+    certificates = django_filters.ModelMultipleChoiceFilter(
+        queryset=Certificate.objects.all(),
+        field_name="certificates", method='filter_all')
+
+    # Services having any of the given tags/categories/countries
+    tags_any = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceTag.objects.all(),
+        field_name="tags", method='filter_any')
+
+    categories_any = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceCategory.objects.all(),
+        field_name="categories", method='filter_any')
+
+    countries = django_filters.ModelMultipleChoiceFilter(
+        queryset=Country.objects.all(),
+        field_name="countries", method='filter_any')
+
+    # Each backed by a `(field, id)` index, see `Service.Meta.indexes`.
+    ordering = StableOrderingFilter(fields=ORDERING_FIELDS)
+
+    def filter_search(self, queryset, name, value):
+        return search_services(queryset, value)
+
+    def filter_all(self, queryset, name, value):
+        """`@>` on the denormalized id array."""
+        if not value:
+            return queryset
+        return queryset.filter(**{f'{ID_ARRAYS[name]}__contains': [obj.pk for obj in value]})
+
+    def filter_any(self, queryset, name, value):
+        """`&&` on the denormalized id array."""
+        if not value:
+            return queryset
+        return queryset.filter(**{f'{ID_ARRAYS[name]}__overlap': [obj.pk for obj in value]})
 
     class Meta:
         model = Service
@@ -25,11 +84,31 @@ class ServiceRatingReviewFilter(django_filters.FilterSet):
         fields = ('service_rating__service__id', 'service_rating',)
 
 
+class ServiceRatingSummaryFilter(django_filters.FilterSet):
+    """The parameters of `ServiceRatingReviewFilter`, on the ratings."""
+    service_rating__service__id = django_filters.NumberFilter(field_name='service_id')
+    service_rating = django_filters.NumberFilter(field_name='pk')
+
+    class Meta:
+        model = ServiceRating
+        fields = ()
+
+
 class ServiceTagsReviewFilter(django_filters.FilterSet):
     category = django_filters.ModelChoiceFilter(queryset=ServiceCategory.objects.all(), method='filter_by_category')
 
+    # `relevance` is the number of services of the category having the tag,
+    # or of all services without `category`.
+    ordering = StableOrderingFilter(fields=(('relevance', 'relevance'), ('name', 'name'), ('service_count', 'count')))
+
+    def filter_queryset(self, queryset):
+        if not self.form.cleaned_data.get('category'):
+            queryset = queryset.annotate(relevance=F('service_count'))
+        return super().filter_queryset(queryset)
+
     def filter_by_category(self, queryset, name, value):
-        return queryset.filter(tag_services__categories=value).distinct()
+        """A lookup of the `CategoryTag` rows of the category, see `apps.services.denormalize.sync_category_tags`."""
+        return queryset.filter(category_tags__category=value).annotate(relevance=F('category_tags__service_count'))
 
     class Meta:
         model = ServiceTag
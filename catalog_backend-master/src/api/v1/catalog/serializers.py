@@ -1,19 +1,21 @@
 from rest_framework import serializers
 
+from api.sparse import SparseFieldsSerializerMixin
+
 from apps.services.models import Service, ServiceTag, ServiceScreenshot, Certificate, Country, ServiceCategory, \
     ServiceRating, CertificateOrganisation, ServiceRatingReview, ServiceMention, ServiceFeature
 
 
-class ServiceTagSerializer(serializers.ModelSerializer):
-    count = serializers.IntegerField(source='services.count', read_only=True)
+class ServiceTagSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    count = serializers.IntegerField(source='service_count', read_only=True)
 
     class Meta:
         model = ServiceTag
         fields = ['id', 'name', 'description', 'count']
 
 
-class ServiceCategorySerializer(serializers.ModelSerializer):
-    count = serializers.IntegerField(source='services.count', read_only=True)
+class ServiceCategorySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    count = serializers.IntegerField(source='service_count', read_only=True)
 
     class Meta:
         model = ServiceCategory
@@ -64,7 +66,12 @@ class ServiceRatingSerializer(serializers.ModelSerializer):
         fields = ['id', 'service', 'entity', 'score']
 
 
-class ServiceRatingReviewSerializer(serializers.ModelSerializer):
+class ServiceRatingSummarySerializer(ServiceRatingSerializer):
+    class Meta(ServiceRatingSerializer.Meta):
+        fields = ServiceRatingSerializer.Meta.fields + ['review_count', 'review_mean', 'review_histogram']
+
+
+class ServiceRatingReviewSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     service_rating = ServiceRatingSerializer()
 
     class Meta:
@@ -84,27 +91,31 @@ class ServiceFeatureSerializer(serializers.ModelSerializer):
         fields = ['id', 'icon', 'title', 'description']
 
 
-class BriefCatalogServiceSerializer(serializers.ModelSerializer):
+class BriefCatalogServiceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     tags = BriefServiceTagSerializer(many=True)
     countries = CountrySerializer(many=True)
     categories = CategorySerializer(many=True)
     certificates = CertificateSerializer(many=True)
     screenshots = ScreenshotSerializer(many=True)
-    ratings = ServiceRatingSerializer(many=True)
+    ratings = ServiceRatingSummarySerializer(many=True)
 
     class Meta:
         model = Service
         fields = ['id', 'name', 'bio', 'description', 'link', 'tags', 'categories', 'countries', 'certificates', 'logo',
                   'screenshots', 'ratings', 'created_at', 'updated_at']
+        expandable_fields = {
+            'mentions': (ServiceMentionSerializer, {'many': True}),
+            'features': (ServiceFeatureSerializer, {'many': True}),
+        }
 
 
-class CatalogServiceSerializer(serializers.ModelSerializer):
+class CatalogServiceSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     tags = BriefServiceTagSerializer(many=True)
     countries = CountrySerializer(many=True)
     categories = CategorySerializer(many=True)
     certificates = CertificateSerializer(many=True)
     screenshots = ScreenshotSerializer(many=True)
-    ratings = ServiceRatingSerializer(many=True)
+    ratings = ServiceRatingSummarySerializer(many=True)
     mentions = ServiceMentionSerializer(many=True)
     features = ServiceFeatureSerializer(many=True)
 
@@ -0,0 +1,216 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+import uuid
+from collections import defaultdict, namedtuple
+
+from django.core.cache import cache
+
+from apps.services.models import Service, ServiceTag, ServiceCategory
+
+# Generation of the index, a new one makes every process reload. Within a
+# generation the keys of changed entries are logged under an increasing
+# sequence number, see `SuggestIndex.update`.
+VERSION_CACHE_KEY = 'catalog:suggest:version'
+SEQUENCE_CACHE_KEY = 'catalog:suggest:sequence'
+CHANGE_CACHE_KEY = 'catalog:suggest:change:{version}:{sequence}'
+CHANGE_TIMEOUT = 60 * 60 * 24
+# Processes further behind reload instead of replaying the changes.
+MAX_REPLAY = 500
+
+# Suggestion types, in the order they are ranked on equal scores.
+SUGGEST_MODELS = {
+    'service': Service,
+    'category': ServiceCategory,
+    'tag': ServiceTag,
+}
+TYPE_ORDER = {name: position for position, name in enumerate(SUGGEST_MODELS)}
+
+MIN_SIMILARITY = 0.3
+
+Entry = namedtuple('Entry', ['type', 'id', 'name', 'normalized', 'tokens', 'trigrams', 'rank'])
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c)).strip()
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text)
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SuggestIndex(object):
+    """
+    In-process index of service, category and tag names answering prefix
+    queries with a binary search over sorted tokens, and falling back to
+    trigram similarity for misspellings.
+
+    Writes are logged in the cache, every process (the writer included)
+    replays the changes it has not seen before answering, reading the
+    changed names from the database, and reloads when it is too far behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._sequence = 0
+        self._entries = {}
+        self._tokens = []
+        self._trigrams = defaultdict(set)
+
+    def _add(self, entry):
+        key = (entry.type, entry.id)
+        self._entries[key] = entry
+        for token in entry.tokens:
+            bisect.insort(self._tokens, (token, key))
+        for trigram in entry.trigrams:
+            self._trigrams[trigram].add(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for token in entry.tokens:
+            position = bisect.bisect_left(self._tokens, (token, key))
+            if position < len(self._tokens) and self._tokens[position] == (token, key):
+                del self._tokens[position]
+        for trigram in entry.trigrams:
+            self._trigrams[trigram].discard(key)
+
+    @staticmethod
+    def _entry(type_, pk, name):
+        normalized = normalize(name)
+        return Entry(type_, pk, name, normalized, tuple(set(tokenize(normalized))), frozenset(trigrams(normalized)),
+                     (TYPE_ORDER[type_], len(name), name))
+
+    def load(self):
+        entries = [
+            self._entry(type_, pk, name)
+            for type_, model in SUGGEST_MODELS.items()
+            for pk, name in model.objects.values_list('pk', 'name').iterator()
+        ]
+        with self._lock:
+            self._entries = {(entry.type, entry.id): entry for entry in entries}
+            self._tokens = sorted((token, key) for key, entry in self._entries.items() for token in entry.tokens)
+            self._trigrams = defaultdict(set)
+            for key, entry in self._entries.items():
+                for trigram in entry.trigrams:
+                    self._trigrams[trigram].add(key)
+
+    def _refresh(self, keys):
+        """Read the entries of `keys` (`(type, id)` pairs) from the database again."""
+        ids = defaultdict(set)
+        for type_, pk in keys:
+            ids[type_].add(pk)
+        names = {
+            (type_, pk): name
+            for type_, pks in ids.items()
+            for pk, name in SUGGEST_MODELS[type_].objects.filter(pk__in=pks).values_list('pk', 'name')
+        }
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                self._remove(key)
+                if key in names:
+                    self._add(self._entry(*key, names[key]))
+
+    @staticmethod
+    def _new_version():
+        # Without the log (or part of it), every process reloads.
+        cache.set(SEQUENCE_CACHE_KEY, 0, None)
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    def _ensure_fresh(self):
+        values = cache.get_many([VERSION_CACHE_KEY, SEQUENCE_CACHE_KEY])
+        if len(values) < 2:
+            self._new_version()
+            values = cache.get_many([VERSION_CACHE_KEY, SEQUENCE_CACHE_KEY])
+        version, sequence = values.get(VERSION_CACHE_KEY), values.get(SEQUENCE_CACHE_KEY, 0)
+
+        with self._lock:
+            if version == self._version and sequence == self._sequence:
+                return
+            if version == self._version and self._sequence < sequence <= self._sequence + MAX_REPLAY:
+                keys = [CHANGE_CACHE_KEY.format(version=version, sequence=n)
+                        for n in range(self._sequence + 1, sequence + 1)]
+                changes = cache.get_many(keys)
+                if len(changes) == len(keys):
+                    self._refresh([changes[key] for key in keys])
+                    self._sequence = sequence
+                    return
+            # Changes up to `sequence` were committed before it was read, the database has them.
+            self.load()
+            self._version, self._sequence = version, sequence
+
+    def update(self, type_, pk):
+        """
+        Log the insert, rename or removal of one entry for all processes,
+        which read its current name from the database. Called after commit.
+        """
+        version = cache.get(VERSION_CACHE_KEY)
+        try:
+            sequence = cache.incr(SEQUENCE_CACHE_KEY)
+        except ValueError:
+            sequence = None
+        if version is None or sequence is None:
+            self._new_version()
+            return
+        cache.set(CHANGE_CACHE_KEY.format(version=version, sequence=sequence), (type_, pk), CHANGE_TIMEOUT)
+
+    def _prefix_matches(self, tokens):
+        *leading, last = tokens
+        start = bisect.bisect_left(self._tokens, (last,))
+        end = bisect.bisect_left(self._tokens, (last + '\U0010ffff',), start)
+        entries = [self._entries[key] for key in {key for _, key in self._tokens[start:end]}]
+        if leading:
+            entries = [entry for entry in entries
+                       if all(any(token.startswith(t) for token in entry.tokens) for t in leading)]
+
+        phrase = ' '.join(tokens)
+        return [
+            (3 if entry.normalized.startswith(phrase) else 2 if entry.normalized.startswith(tokens[0]) else 1, entry)
+            for entry in entries
+        ]
+
+    def _similar_matches(self, query, exclude):
+        query_trigrams = trigrams(query)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for key in self._trigrams.get(trigram, ()):
+                shared[key] += 1
+
+        matches = []
+        for key, common in shared.items():
+            if key in exclude:
+                continue
+            entry = self._entries[key]
+            similarity = common / (len(query_trigrams) + len(entry.trigrams) - common)
+            if similarity >= MIN_SIMILARITY:
+                matches.append((similarity, entry))
+        return matches
+
+    def suggest(self, query, limit=10):
+        query = normalize(query)
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        self._ensure_fresh()
+        with self._lock:
+            matches = self._prefix_matches(tokens)
+            if len(matches) < limit:
+                exclude = {(entry.type, entry.id) for _, entry in matches}
+                matches += self._similar_matches(query, exclude)
+
+        best = heapq.nsmallest(limit, matches, key=lambda match: (-match[0], match[1].rank))
+        return [{'id': entry.id, 'name': entry.name, 'type': entry.type} for _, entry in best]
+
+
+index = SuggestIndex()
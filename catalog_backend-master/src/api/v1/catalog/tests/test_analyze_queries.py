@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from apps.services.management.commands.analyze_queries import fingerprint, find_problems
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+
+class TestFindProblems:
+    def test__large_seq_scan__flagged(self):
+        plan = {'Node Type': 'Seq Scan', 'Relation Name': 'services_service', 'Actual Rows': 20,
+                'Actual Loops': 1, 'Rows Removed by Filter': 5000, 'Plan Rows': 20, 'Filter': 'name ~~ ?'}
+
+        assert find_problems(plan) == [{'problem': 'seq_scan', 'node': 'Seq Scan on services_service',
+                                        'rows': 5020, 'filter': 'name ~~ ?'}]
+
+    def test__through_table_scan_and_nested_loop__flagged(self):
+        inner = {'Node Type': 'Seq Scan', 'Relation Name': 'services_service_tags', 'Actual Rows': 1,
+                 'Actual Loops': 2000, 'Plan Rows': 1}
+        outer = {'Node Type': 'Index Scan', 'Relation Name': 'services_service', 'Index Name': 'services_pkey',
+                 'Actual Rows': 2000, 'Actual Loops': 1, 'Plan Rows': 2000}
+        plan = {'Node Type': 'Nested Loop', 'Actual Rows': 2000, 'Actual Loops': 1, 'Plan Rows': 2000,
+                'Plans': [outer, inner]}
+
+        problems = find_problems(plan, through_tables={'services_service_tags'})
+
+        assert [problem['problem'] for problem in problems] == ['nested_loop', 'through_table_seq_scan']
+
+    def test__small_plan__no_problems(self):
+        plan = {'Node Type': 'Seq Scan', 'Relation Name': 'services_servicetag', 'Actual Rows': 10,
+                'Actual Loops': 1, 'Plan Rows': 10}
+
+        assert find_problems(plan) == []
+
+    def test__fingerprint__literals_replaced(self):
+        sql = """SELECT "U0"."id" FROM "t" WHERE "t"."id" IN (1, 2, 3) AND "t"."name" = 'it''s' LIMIT 20"""
+
+        assert fingerprint(sql) == """SELECT "U0"."id" FROM "t" WHERE "t"."id" IN (...) AND "t"."name" = ? LIMIT ?"""
+
+
+@pytest.mark.django_db
+class TestAnalyzeQueries:
+    def test__report__endpoints_and_through_indexes(self, tmp_path):
+        ServiceFactory.create(tags=ServiceTagFactory.create_batch(2))
+        output = tmp_path / 'report.json'
+
+        call_command('analyze_queries', '--url', '/api/v1/catalog/services/?tags={tag}',
+                     '--url', '/api/v1/catalog/tags/', '--output', str(output), '--metrics')
+
+        report = json.loads(output.read_text())
+        endpoint = report['endpoints']['/api/v1/catalog/services/?tags={tag}']
+        assert endpoint['status'] == 200
+        assert all(query['plan'] and 'execution_ms' in query['metrics'] for query in endpoint['queries'])
+        assert any('"services_service"' in query['sql'] for query in endpoint['queries'])
+        assert all(report['through_indexes']['services_service_tags'].values())
+
+    def test__strict__fails_on_problems(self):
+        with pytest.raises(CommandError, match='problems'):
+            call_command('analyze_queries', '--url', '/api/v1/catalog/tags/', '--seq-scan-rows', '0', '--strict')
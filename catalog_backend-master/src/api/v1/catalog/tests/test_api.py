@@ -1,9 +1,19 @@
+import json
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
+from api.pagination import Pagination
+from api.streaming import StreamingListMixin
+from apps.services.models import RatingEntity, Service, ServiceTag
 from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory, \
-    ServiceRatingReviewFactory, ServiceCategoryFactory
+    ServiceRatingReviewFactory, ServiceCategoryFactory, ServiceFeatureFactory, ServiceMentionFactory
 from hainu.tests.factories import UserFactory
 
 pytestmark = pytest.mark.integration
@@ -87,6 +97,54 @@ class TestServiceTagsListAPI:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.json()['results']) == expect
 
+    def test__list_of_tags__ordered_by_relevance_in_category(self, client, url):
+        category = ServiceCategoryFactory()
+        tags = ServiceTagFactory.create_batch(3)
+        ServiceFactory.create(tags=tags, categories=[category])
+        ServiceFactory.create(tags=tags[1:], categories=[category])
+        ServiceFactory.create_batch(3, tags=tags[:1])
+        ServiceFactory.create(tags=tags[2:], categories=[category])
+
+        response = client.get(url, {'category': category.id, 'ordering': '-relevance'})
+
+        assert [tag['id'] for tag in response.json()['results']] == [tags[2].id, tags[1].id, tags[0].id]
+        assert [tag['id'] for tag in client.get(url, {'ordering': '-relevance'}).json()['results']] == \
+            [tags[0].id, tags[2].id, tags[1].id]
+
+
+@pytest.mark.django_db
+class TestServiceRatingReviewSummaryAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:reviews-summary")
+
+    def test__summary__aggregated_per_rating(self, client, url, django_capture_on_commit_callbacks):
+        service = ServiceFactory()
+        ratings = ServiceRatingFactory.create_batch(2, service=service)
+        with django_capture_on_commit_callbacks(execute=True):
+            for rating, scores in zip(ratings, [(5, 4), (1,)]):
+                for score in scores:
+                    ServiceRatingReviewFactory(service_rating=rating, score=score)
+            ServiceRatingReviewFactory.create_batch(3, score=2)
+
+        response = client.get(url, {'service_rating__service__id': service.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        summary = response.json()
+        assert (summary['count'], summary['mean']) == (3, pytest.approx(10 / 3))
+        assert summary['histogram'] == [0, 1, 0, 0, 1, 1]
+        assert [(r['id'], r['review_count'], r['review_mean']) for r in summary['ratings']] == \
+            [(ratings[0].id, 2, 4.5), (ratings[1].id, 1, 1)]
+
+    def test__service__shows_aggregates(self, client, django_capture_on_commit_callbacks):
+        rating = ServiceRatingFactory()
+        with django_capture_on_commit_callbacks(execute=True):
+            ServiceRatingReviewFactory(service_rating=rating, score=4)
+
+        response = client.get(reverse("v1:catalog:services-detail", args=[rating.service_id]))
+
+        assert response.json()['ratings'][0]['review_histogram'] == [0, 0, 0, 0, 1, 0]
+
 
 @pytest.mark.django_db
 class TestServiceRatingReviewListAPI:
@@ -105,3 +163,365 @@ class TestServiceRatingReviewListAPI:
 
         results = response.json()['results']
         assert len(results) == len(srr)
+
+
+@pytest.mark.django_db
+class TestServiceSearchAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-list")
+
+    def test__search__ranked_by_weighted_fields(self, client, url):
+        in_description = ServiceFactory.create(name="Alpha", bio="Clinic", description="Blood tests for longevity")
+        in_name = ServiceFactory.create(name="Longevity Lab", bio="Clinic", description="Checkups")
+        in_bio = ServiceFactory.create(name="Beta", bio="Longevity coaching", description="Coaching")
+        ServiceFactory.create(name="Gamma", bio="Clinic", description="Checkups")
+
+        response = client.get(url, {'search': 'longevity'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [s['id'] for s in response.json()['results']] == [in_name.id, in_bio.id, in_description.id]
+
+    def test__search__combined_with_tags(self, client, url):
+        tag = ServiceTagFactory()
+        tagged = ServiceFactory.create(name="Sleep clinic", bio="", tags=[tag])
+        ServiceFactory.create(name="Sleep tracker", bio="")
+
+        response = client.get(url, {'search': 'sleep', 'tags': tag.id})
+
+        assert [s['id'] for s in response.json()['results']] == [tagged.id]
+
+    def test__search__updated_on_write(self, client, url):
+        service = ServiceFactory.create(name="Old name", bio="")
+        service.name = "Metabolic panel"
+        service.save()
+
+        response = client.get(url, {'search': 'metabolic'})
+
+        assert [s['id'] for s in response.json()['results']] == [service.id]
+
+
+@pytest.mark.django_db
+class TestServiceFacetsAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-facets")
+
+    def test__facets__counts_for_filtered_services(self, client, url, django_assert_num_queries):
+        tags = ServiceTagFactory.create_batch(3)
+        categories = ServiceCategoryFactory.create_batch(2)
+        ServiceFactory.create(tags=tags[:2], categories=categories[:1])
+        ServiceFactory.create(tags=tags[1:], categories=categories)
+        ServiceFactory.create(tags=tags[2:], categories=categories[1:])
+
+        with django_assert_num_queries(3):  # updated_at, tag filter validation, facets
+            response = client.get(url, {'tags': tags[1].id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            'count': 2,
+            'tags': [
+                {'id': tags[1].id, 'name': tags[1].name, 'count': 2},
+                {'id': tags[0].id, 'name': tags[0].name, 'count': 1},
+                {'id': tags[2].id, 'name': tags[2].name, 'count': 1},
+            ],
+            'categories': [
+                {'id': categories[0].id, 'name': categories[0].name, 'count': 2},
+                {'id': categories[1].id, 'name': categories[1].name, 'count': 1},
+            ],
+            'countries': [],
+        }
+
+    def test__facets__no_results(self, client, url):
+        ServiceFactory.create(name="Sleep clinic")
+
+        response = client.get(url, {'search': 'longevity'})
+
+        assert response.json() == {'count': 0, 'tags': [], 'categories': [], 'countries': []}
+
+
+@pytest.mark.django_db
+class TestServiceRelationFiltersAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-list")
+
+    @pytest.fixture
+    def tags(self):
+        return ServiceTagFactory.create_batch(3)
+
+    @pytest.fixture
+    def services(self, tags):
+        return [
+            ServiceFactory.create(tags=tags[:2]),
+            ServiceFactory.create(tags=tags[1:]),
+            ServiceFactory.create(tags=tags[2:]),
+        ]
+
+    def ids(self, response):
+        return sorted(s['id'] for s in response.json()['results'])
+
+    def test__all_tags(self, client, url, tags, services):
+        response = client.get(url, {'tags': [tags[1].id, tags[2].id]})
+
+        assert self.ids(response) == [services[1].id]
+
+    def test__any_tags(self, client, url, tags, services):
+        response = client.get(url, {'tags_any': [tags[0].id, tags[2].id]})
+
+        assert self.ids(response) == [s.id for s in services]
+
+    def test__tags_combined_with_categories(self, client, url, tags, services):
+        category = ServiceCategoryFactory()
+        services[0].categories.add(category)
+
+        response = client.get(url, {'tags': [tags[1].id], 'categories': [category.id]})
+
+        assert self.ids(response) == [services[0].id]
+
+    def test__containment_without_joins(self, client, url, tags, services):
+        category = ServiceCategoryFactory()
+        with CaptureQueriesContext(connection) as context:
+            client.get(url, {'tags': [t.id for t in tags], 'categories_any': [category.id]})
+
+        service_queries = [q['sql'] for q in context.captured_queries if 'FROM "services_service"' in q['sql']]
+        assert service_queries
+        assert all('services_service_tags' not in sql and 'JOIN' not in sql for sql in service_queries)
+
+
+@pytest.mark.django_db
+class TestCursorPaginationAPI:
+    def walk(self, client, url, params):
+        ids, response = [], client.get(url, params)
+        while True:
+            data = response.json()
+            assert 'count' not in data
+            ids += [result['id'] for result in data['results']]
+            if data['links']['next'] is None:
+                return ids, data
+            response = client.get(data['links']['next'])
+
+    def test__services__walked_in_stable_order(self, client):
+        url = reverse("v1:catalog:services-list")
+        services = ServiceFactory.create_batch(7)
+        # Equal timestamps are ordered by id.
+        Service.objects.filter(pk__in=[s.pk for s in services[:4]]).update(created_at=services[0].created_at)
+
+        ids, _ = self.walk(client, url, {'cursor': '', 'page_size': 3})
+
+        expected = list(Service.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        assert ids == expected
+
+    def test__services__previous_page(self, client):
+        url = reverse("v1:catalog:services-list")
+        ServiceFactory.create_batch(5)
+
+        first = client.get(url, {'cursor': '', 'page_size': 2}).json()
+        second = client.get(first['links']['next']).json()
+        back = client.get(second['links']['previous']).json()
+
+        assert first['links']['previous'] is None
+        assert [r['id'] for r in back['results']] == [r['id'] for r in first['results']]
+
+    def test__reviews__walked_by_id(self, client):
+        url = reverse("v1:catalog:reviews-list")
+        rating = ServiceRatingFactory.create(service=ServiceFactory())
+        reviews = ServiceRatingReviewFactory.create_batch(5, service_rating=rating)
+
+        ids, _ = self.walk(client, url, {'cursor': '', 'page_size': 2})
+
+        assert ids == sorted((r.id for r in reviews), reverse=True)
+
+    def test__deep_page__no_count_or_offset(self, client):
+        url = reverse("v1:catalog:reviews-list")
+        rating = ServiceRatingFactory.create(service=ServiceFactory())
+        ServiceRatingReviewFactory.create_batch(6, service_rating=rating)
+        page = client.get(url, {'cursor': '', 'page_size': 2}).json()
+
+        with CaptureQueriesContext(connection) as context:
+            client.get(page['links']['next'])
+
+        assert [q['sql'] for q in context.captured_queries if 'COUNT(' in q['sql'] or 'OFFSET' in q['sql']] == []
+
+    def test__search__no_cursor(self, client):
+        url = reverse("v1:catalog:services-list")
+        ServiceFactory.create(name="yoga yoga yoga")
+        ServiceFactory.create(name="other", bio="yoga")
+
+        response = client.get(url, {'search': 'yoga', 'cursor': ''})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'cursor' in response.json()
+
+    def test__invalid_cursor__not_found(self, client):
+        response = client.get(reverse("v1:catalog:services-list"), {'cursor': 'garbage'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestServiceOrderingAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-list")
+
+    @pytest.fixture
+    def services(self):
+        services = [ServiceFactory(name=name) for name in ('b', 'c', 'a')]
+        for service, score in zip(services, (4.5, 3, 4.5)):
+            ServiceRatingFactory(service=service, entity=RatingEntity.TRUSTPILOT, score=score)
+        return services
+
+    def ids(self, response):
+        return [result['id'] for result in response.json()['results']]
+
+    def test__default__newest_first(self, client, url, services):
+        assert self.ids(client.get(url)) == [services[2].id, services[1].id, services[0].id]
+
+        # Equal timestamps are ordered by id (another URL, the first page is cached).
+        Service.objects.filter(pk=services[0].pk).update(created_at=services[2].created_at)
+        assert self.ids(client.get(url, {'page_size': 3})) == [services[2].id, services[0].id, services[1].id]
+
+    @pytest.mark.parametrize(('ordering', 'expect'), [
+        ('name', [2, 0, 1]),
+        ('-name', [1, 0, 2]),
+        # Equal scores are ordered by id, in the same direction.
+        ('-score', [2, 0, 1]),
+        ('score', [1, 0, 2]),
+        ('created_at', [0, 1, 2]),
+    ])
+    def test__ordering__applied(self, client, url, services, ordering, expect):
+        assert self.ids(client.get(url, {'ordering': ordering})) == [services[i].id for i in expect]
+
+    def test__ordering__walked_by_cursor(self, client, url, services):
+        first = client.get(url, {'ordering': '-score', 'cursor': '', 'page_size': 2})
+        second = client.get(first.json()['links']['next'])
+
+        assert self.ids(first) + self.ids(second) == [services[i].id for i in (2, 0, 1)]
+
+    def test__rating_changed__score_synced(self, client, url, services):
+        services[1].ratings.update(score=5)  # No signals.
+        rating = services[1].ratings.get()
+        rating.save()
+
+        assert self.ids(client.get(url, {'ordering': '-score'}))[0] == services[1].id
+
+    def test__stale_save__score_kept(self, services):
+        stale = services[1]  # Loaded before its rating synced the score.
+        stale.name = 'renamed'
+        stale.save()
+
+        assert Service.objects.get(pk=stale.pk).score == 3
+
+
+@pytest.mark.django_db
+class TestStreamingListAPI:
+    def read(self, response):
+        assert response.streaming
+        return json.loads(b''.join(response.streaming_content))
+
+    def test__services__all_results_streamed(self, client):
+        services = ServiceFactory.create_batch(7)
+
+        data = self.read(client.get(reverse("v1:catalog:services-list"), {'page_size': -1}))
+
+        assert data['count'] == 7
+        assert sorted(r['id'] for r in data['results']) == sorted(s.id for s in services)
+
+    def test__tags__read_in_chunks(self, client, monkeypatch):
+        monkeypatch.setattr(StreamingListMixin, 'stream_chunk_size', 3)
+        tags = ServiceTagFactory.create_batch(7)
+        ServiceFactory.create(tags=tags)
+
+        response = client.get(reverse("v1:catalog:tags-list"), {'page_size': -1})
+        data = self.read(response)
+
+        assert [r['id'] for r in data['results']] == [t.id for t in sorted(tags, key=lambda t: t.name)]
+
+    def test__empty__valid_json(self, client):
+        data = self.read(client.get(reverse("v1:catalog:categories-list"), {'page_size': -1}))
+
+        assert data['count'] == 0
+        assert data['results'] == []
+
+    def test__page_size__capped(self, client):
+        ServiceTagFactory.create_batch(3)
+
+        response = client.get(reverse("v1:catalog:tags-list"), {'page_size': 1000})
+
+        assert not response.streaming
+        assert response.json()['per_page'] == Pagination.max_page_size
+
+    def test__page_size_zero__all_results_streamed(self, client):
+        tags = ServiceTagFactory.create_batch(3)
+
+        data = self.read(client.get(reverse("v1:catalog:tags-list"), {'page_size': 0}))
+
+        assert sorted(r['id'] for r in data['results']) == sorted(t.id for t in tags)
+
+    def test__page_size__negative_rejected(self, client):
+        response = client.get(reverse("v1:catalog:tags-list"), {'page_size': -2})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'page_size' in response.json()
+
+    def test__all_results__rejected_without_streaming(self):
+        request = Request(APIRequestFactory().get('/', {'page_size': -1}))
+
+        with pytest.raises(ValidationError):
+            Pagination().paginate_queryset(ServiceTag.objects.all(), request)
+
+
+@pytest.mark.django_db
+class TestSparseFieldsAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-list")
+
+    @pytest.fixture
+    def service(self):
+        service = ServiceFactory.create(tags=ServiceTagFactory.create_batch(2), features=[ServiceFeatureFactory()])
+        ServiceMentionFactory.create(service=service)
+        return service
+
+    def test__fields__pruned_output_and_columns(self, client, url, service):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, {'fields': 'id,name,tags'})
+
+        assert response.status_code == status.HTTP_200_OK
+        [result] = response.json()['results']
+        assert set(result) == {'id', 'name', 'tags'}
+        assert len(result['tags']) == 2
+        sql = ' '.join(q['sql'] for q in context.captured_queries)
+        assert '"services_service"."description"' not in sql
+        assert 'services_servicescreenshot' not in sql
+
+    def test__fields__fewer_queries(self, client, url, service, django_assert_num_queries):
+        # updated_at, count, services
+        with django_assert_num_queries(3):
+            client.get(url, {'fields': 'id,name,logo'})
+
+    def test__expand__adds_fields(self, client, url, service):
+        [result] = client.get(url, {'expand': 'mentions,features'}).json()['results']
+
+        assert [m['id'] for m in result['mentions']] == [m.id for m in service.mentions.all()]
+        assert len(result['features']) == 1
+        assert 'description' in result
+
+    def test__detail__sparse(self, client, service):
+        response = client.get(reverse("v1:catalog:services-detail", args=[service.id]), {'fields': 'name'})
+
+        assert response.json() == {'name': service.name}
+
+    def test__unknown_field__bad_request(self, client, url):
+        response = client.get(url, {'fields': 'id,password', 'expand': 'owner'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.json()) == {'fields', 'expand'}
+
+    def test__tags__sparse(self, client):
+        ServiceTagFactory.create_batch(2)
+
+        results = client.get(reverse("v1:catalog:tags-list"), {'fields': 'id,name'}).json()['results']
+
+        assert all(set(result) == {'id', 'name'} for result in results)
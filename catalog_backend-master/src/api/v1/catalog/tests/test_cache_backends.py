@@ -0,0 +1,90 @@
+import pickle
+import time
+import uuid
+
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+
+from api.cache_backends import TwoTierCache
+from apps.services.tests.factories import ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+
+def two_tier_cache(**options):
+    return TwoTierCache(uuid.uuid4().hex, {'OPTIONS': {'SHARED': 'shared', **options}})
+
+
+class TestTwoTierCache:
+    def test__local_miss__filled_from_shared(self):
+        cache = two_tier_cache()
+        caches['shared'].set('key', 'value')
+
+        assert cache.get('key') == 'value'
+        assert cache.get('key') == 'value'
+        assert cache.stats()['local'] == {'hits': 1, 'misses': 1, 'evictions': 0, 'evictions_by_group': {},
+                                          'entries': 1, 'size': len(pickle.dumps('value', pickle.HIGHEST_PROTOCOL))}
+        assert cache.stats()['shared'] == {'hits': 1, 'misses': 0}
+
+    def test__size_bound__least_recently_used_evicted(self):
+        value = 'x' * 1000
+        cache = two_tier_cache(LOCAL_MAX_SIZE=2500)
+        cache.set('a', value)
+        cache.set('b', value)
+        cache.get('a')
+        cache.set('c', value)
+
+        stats = cache.stats()['local']
+        assert (stats['entries'], stats['evictions']) == (2, 1)
+        assert stats['evictions_by_group'] == {'b': 1}
+        assert cache.get_many(['a', 'b', 'c']) == {'a': value, 'b': value, 'c': value}
+        # `b` came from the shared tier.
+        assert cache.stats()['shared']['hits'] == 1
+
+    def test__local_timeout__expires_local_tier_first(self, monkeypatch):
+        cache = two_tier_cache(LOCAL_TIMEOUT=10)
+        cache.set('key', 'value', 60)
+        now = time.monotonic()
+        monkeypatch.setattr('api.cache_backends.time.monotonic', lambda: now + 30)
+
+        assert cache.get('key') == 'value'
+        assert cache.stats()['local']['misses'] == 1
+
+    def test__evictions__counted_by_key_group(self):
+        cache = two_tier_cache(LOCAL_MAX_SIZE=2500)
+        for key in ('page:tags-list:1', 'page:tags-list:2', 'page:services-list:1'):
+            cache.set(key, 'x' * 1000)
+
+        assert cache.stats()['local']['evictions_by_group'] == {'page:tags-list': 1}
+
+    def test__key_prefixes__other_keys_read_from_shared(self):
+        cache = two_tier_cache(LOCAL_KEY_PREFIXES=['page.'])
+        cache.set('page.1', 1)
+        cache.set('version', 1)
+        caches['shared'].set('page.1', 2)
+        caches['shared'].set('version', 2)
+
+        assert (cache.get('page.1'), cache.get('version')) == (1, 2)
+
+    def test__delete__both_tiers(self):
+        cache = two_tier_cache()
+        cache.set('key', 'value')
+        cache.delete('key')
+
+        assert cache.get('key') is None
+        assert caches['shared'].get('key') is None
+
+
+@pytest.mark.django_db
+def test__cached_page__served_from_local_tier(client, django_assert_num_queries):
+    ServiceTagFactory.create()
+    url = reverse("v1:catalog:tags-list")
+    client.get(url)
+    hits = caches['default'].stats()['local']['hits']
+
+    with django_assert_num_queries(0):
+        response = client.get(url)
+
+    assert len(response.json()['results']) == 1
+    assert caches['default'].stats()['local']['hits'] == hits + 1
@@ -0,0 +1,195 @@
+import time
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from api import caching
+from api.v1.catalog.views import CACHING_PERIOD
+
+from apps.blog.models import BlogPost
+from apps.services.models import ServiceTag
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory, \
+    ServiceRatingReviewFactory
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.django_db
+class TestResourceNamespaces:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:tags-list")
+
+    def test__tag_renamed__shown_immediately(self, client, url, django_capture_on_commit_callbacks):
+        tag = ServiceTagFactory.create(name="Old")
+        assert client.get(url).json()['results'][0]['name'] == "Old"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.name = "New"
+            tag.save()
+
+        assert client.get(url).json()['results'][0]['name'] == "New"
+
+    def test__relation_changed__count_shown_immediately(self, client, url, django_capture_on_commit_callbacks):
+        tag = ServiceTagFactory.create()
+        service = ServiceFactory.create()
+        assert client.get(url).json()['results'][0]['count'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.tags.add(tag)
+
+        assert client.get(url).json()['results'][0]['count'] == 1
+
+    def test__unrelated_change__stays_cached(self, client, url, django_assert_num_queries,
+                                              django_capture_on_commit_callbacks):
+        ServiceTagFactory.create()
+        rating = ServiceRatingFactory.create()
+        client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ServiceRatingReviewFactory.create(service_rating=rating)
+            BlogPost.objects.create(title='Post', text='Text', image_url='https://example.com/image.png')
+
+        with django_assert_num_queries(0):
+            client.get(url)
+
+    def test__clear__invalidates_without_flushing(self, client, admin_client, url,
+                                                  django_capture_on_commit_callbacks):
+        tag = ServiceTagFactory.create(name="Old")
+        client.get(url)
+        cache.set('unrelated', 1)
+        ServiceTag.objects.filter(pk=tag.pk).update(name="New")  # No signals.
+
+        with django_capture_on_commit_callbacks(execute=True):
+            admin_client.post('/clear/')
+
+        assert client.get(url).json()['results'][0]['name'] == "New"
+        assert cache.get('unrelated') == 1
+
+    def test__clear__staff_post_only(self, client, admin_client, url, django_assert_num_queries):
+        ServiceTagFactory.create()
+        client.get(url)
+
+        assert client.post('/clear/').status_code == 302
+        assert admin_client.get('/clear/').status_code == 405
+
+        with django_assert_num_queries(0):
+            client.get(url)
+
+
+@pytest.mark.django_db
+class TestStampedeProtection:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:tags-list")
+
+    @pytest.fixture
+    def later(self, monkeypatch):
+        def shift(seconds):
+            now = time.time()
+            monkeypatch.setattr(caching.time, 'time', lambda: now + seconds)
+        return shift
+
+    @pytest.fixture(autouse=True)
+    def refresh_inline(self, monkeypatch):
+        monkeypatch.setattr(caching, 'refresh_in_background',
+                            lambda request, key: (caching.refresh(request), caching.release(key)))
+
+    def test__expired__stale_served_and_refreshed(self, client, url, later):
+        tag = ServiceTagFactory.create(name="Old")
+        client.get(url)
+        ServiceTag.objects.filter(pk=tag.pk).update(name="New")  # No signals.
+        later(CACHING_PERIOD + 1)
+
+        assert client.get(url).json()['results'][0]['name'] == "Old"
+        assert client.get(url).json()['results'][0]['name'] == "New"
+
+    def test__hard_expired__rebuilt(self, client, url, later):
+        tag = ServiceTagFactory.create(name="Old")
+        client.get(url)
+        ServiceTag.objects.filter(pk=tag.pk).update(name="New")
+        later(settings.API_CACHE_HARD_TIMEOUT + 1)
+
+        assert client.get(url).json()['results'][0]['name'] == "New"
+
+    def test__missing__waits_for_the_rebuild_in_progress(self, client, url, monkeypatch,
+                                                         django_assert_num_queries):
+        ServiceTagFactory.create()
+        keys = []
+        page_key = caching.page_key
+        monkeypatch.setattr(caching, 'page_key', lambda *args: keys.append(page_key(*args)) or keys[-1])
+        expected = client.get(url).content
+        entry = cache.get(keys[0])
+        cache.delete(keys[0])
+
+        # Another worker holds the lock, and stores the page while this request waits.
+        monkeypatch.setattr(caching, 'acquire', lambda key: False)
+        monkeypatch.setattr(caching, 'is_locked', lambda key: True)
+        monkeypatch.setattr(caching.time, 'sleep', lambda seconds: cache.set(keys[0], entry))
+
+        with django_assert_num_queries(0):
+            response = client.get(url)
+
+        assert response.content == expected
+
+    def test__browsable_api__not_cached(self, client, url):
+        ServiceTagFactory.create()
+
+        client.get(url, HTTP_ACCEPT='text/html')
+
+        assert client.get(url)['Content-Type'] == 'application/json'
+
+
+@pytest.mark.django_db
+class TestCanonicalKeys:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-list")
+
+    @pytest.fixture
+    def tags(self):
+        tags = ServiceTagFactory.create_batch(2)
+        ServiceFactory.create(tags=tags)
+        return tags
+
+    def test__reordered_and_tracking_params__same_page(self, client, url, tags, django_assert_num_queries):
+        first, second = tags
+        client.get(url, {'tags': [second.id, first.id], 'utm_source': 'newsletter', 'fbclid': 'abc'})
+
+        with django_assert_num_queries(0):
+            response = client.get(url, {'tags': [first.id, second.id]})
+
+        assert len(response.json()['results']) == 1
+
+    def test__links__canonical(self, client, url, tags):
+        ServiceFactory.create_batch(2, tags=tags)
+
+        response = client.get(url, {'page_size': 1, 'utm_source': 'newsletter', 'tags': tags[0].id})
+
+        assert response.json()['links']['next'] == f'http://testserver{url}?page=2&page_size=1&tags={tags[0].id}'
+
+    def test__single_valued_param__last_value_kept(self, client, url, tags):
+        ServiceFactory.create()
+
+        assert len(client.get(url, {'page_size': [20, 1]}).json()['results']) == 1
+        assert len(client.get(url, {'page_size': [1, 20]}).json()['results']) == 2
+
+    def test__stats__per_endpoint(self, client, url, tags):
+        before = caching.cache_stats().get('services-list', {'hits': 0, 'misses': 0})
+
+        client.get(url)
+        client.get(url, {'utm_campaign': 'spring'})
+        client.get(reverse("v1:catalog:tags-list"))
+
+        stats = caching.cache_stats()
+        assert stats['services-list']['misses'] == before['misses'] + 1
+        assert stats['services-list']['hits'] == before['hits'] + 1
+        assert stats['tags-list']['misses'] >= 1
+
+    def test__stats_view__staff_only(self, client, admin_client, url, tags):
+        admin_client.get(url)
+
+        assert client.get('/cache/stats/').status_code == 302
+        assert 'services-list' in admin_client.get('/cache/stats/').json()['endpoints']
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import gzip
+
+import pytest
+from django.urls import reverse
+
+from api import compression
+from api.compression import negotiate
+from api.renderers import JSONRenderer, ORJSONRenderer, RawJSON
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+
+class TestORJSONRenderer:
+    @pytest.mark.parametrize('data', [
+        {'results': [RawJSON('{"id":1,"name":"a"}'), RawJSON('{"id":2}')], 'count': 2},
+        {'name': 'Zürich   ✓', 'score': 4.5, 'price': decimal.Decimal('1.10'), 1: None},
+        [{'created_at': datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)}, True, None],
+    ])
+    def test__output__same_as_json_renderer(self, data):
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test__indent__falls_back(self):
+        context = {'indent': 4}
+
+        assert ORJSONRenderer().render({'a': [1]}, renderer_context=context) == \
+            JSONRenderer().render({'a': [1]}, renderer_context=context)
+
+
+@pytest.mark.parametrize(('header', 'expected'), [
+    ('gzip, deflate, br', 'br' if compression.brotli else 'gzip'),
+    ('gzip;q=1.0, br;q=0', 'gzip'),
+    ('identity', None),
+    ('*', 'br' if compression.brotli else 'gzip'),
+    ('', None),
+])
+def test__negotiate(header, expected):
+    assert negotiate(header) == expected
+
+
+@pytest.mark.django_db
+class TestCompressedResponses:
+    @pytest.fixture
+    def url(self):
+        ServiceFactory.create_batch(5, tags=ServiceTagFactory.create_batch(3))
+        return reverse("v1:catalog:services-list")
+
+    def test__gzip__same_body(self, client, url):
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        plain = client.get(url)
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert 'Content-Encoding' not in plain
+        assert gzip.decompress(response.content) == plain.content
+
+    @pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+    def test__brotli__preferred(self, client, url):
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        assert response['Content-Encoding'] == 'br'
+        assert compression.brotli.decompress(response.content) == client.get(url).content
+
+    def test__cached__compressed_once_per_fill(self, client, url, monkeypatch):
+        calls = []
+        compress = compression.compress
+        monkeypatch.setattr(compression, 'compress', lambda *args: calls.append(args) or compress(*args))
+
+        first = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        second = client.get(url, HTTP_ACCEPT_ENCODING='deflate, gzip')
+
+        assert len(calls) == 1
+        assert second.content == first.content
+        assert second['Content-Encoding'] == 'gzip'
+
+    def test__uncached_detail__compressed(self, client, url):
+        service = ServiceFactory.create(description='x' * 1000)
+
+        response = client.get(reverse("v1:catalog:services-detail", args=[service.id]), HTTP_ACCEPT_ENCODING='gzip')
+
+        assert response['Content-Encoding'] == 'gzip'
@@ -0,0 +1,74 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from apps.blog.models import BlogPost
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    @pytest.fixture
+    def service(self):
+        return ServiceFactory.create(tags=ServiceTagFactory.create_batch(2))
+
+    @pytest.mark.parametrize('name', ['v1:catalog:services-list', 'v1:catalog:tags-list',
+                                      'v1:catalog:categories-list', 'v1:catalog:reviews-list',
+                                      'v1:blog:posts-list'])
+    def test__unchanged__not_modified(self, client, service, name):
+        response = client.get(reverse(name))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'].startswith('W/"')
+        assert client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag']).status_code == \
+            status.HTTP_304_NOT_MODIFIED
+        assert client.get(reverse(name), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code == \
+            status.HTTP_304_NOT_MODIFIED
+
+    def test__not_modified__skips_the_view(self, client, service, django_assert_num_queries):
+        url = reverse('v1:catalog:services-detail', args=[service.id])
+        etag = client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+    def test__relation_changed__modified(self, client, service, django_capture_on_commit_callbacks):
+        url = reverse('v1:catalog:services-list')
+        etag = client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.tags.remove(service.tags.first())
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize('name', ['v1:catalog:services-list', 'v1:catalog:reviews-list'])
+    def test__child_changed__modified(self, client, service, name, django_capture_on_commit_callbacks):
+        etag = client.get(reverse(name))['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ServiceRatingFactory.create(service=service)
+
+        assert client.get(reverse(name), HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test__tag_deleted__modified(self, client, service, django_capture_on_commit_callbacks):
+        url = reverse('v1:catalog:tags-list')
+        etag = client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.tags.first().delete()
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    def test__blog_post_saved__modified(self, client, django_capture_on_commit_callbacks):
+        url = reverse('v1:blog:posts-list')
+        etag = client.get(url)['ETag']
+
+        with django_capture_on_commit_callbacks(execute=True):
+            BlogPost.objects.create(title='Post', text='Text', image_url='https://example.com/image.png')
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from api.v1.catalog.documents import build_documents
+from api.v1.catalog.serializers import BriefCatalogServiceSerializer, CatalogServiceSerializer
+from apps.services.models import ServiceDocument, Service
+from apps.services.signals import PendingChanges
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory, \
+    ServiceScreenshotFactory, CertificateFactory
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.django_db
+class TestServiceDocuments:
+    @pytest.fixture
+    def service(self):
+        service = ServiceFactory.create(tags=ServiceTagFactory.create_batch(2), certificates=[CertificateFactory()],
+                                        logo='images/logo.png')
+        ServiceScreenshotFactory.create(service=service, image='screenshots/one.png')
+        ServiceRatingFactory.create(service=service)
+        return service
+
+    def test__documents__match_serializers(self, client, service):
+        request = APIRequestFactory().get('/')
+        build_documents()
+
+        list_response = client.get(reverse('v1:catalog:services-list'))
+        detail_response = client.get(reverse('v1:catalog:services-detail', args=[service.id]))
+
+        assert list_response.json()['results'] == [BriefCatalogServiceSerializer(
+            service, context={'request': request}).data]
+        assert detail_response.json() == CatalogServiceSerializer(service, context={'request': request}).data
+        assert detail_response.json()['logo'] == 'http://testserver/media/images/logo.png'
+
+    def test__missing_documents__built_on_read(self, client, service):
+        ServiceDocument.objects.all().delete()
+
+        response = client.get(reverse('v1:catalog:services-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['results']) == 1
+        assert ServiceDocument.objects.filter(service=service).exists()
+
+    def test__tag_renamed__documents_rebuilt(self, client, service, django_capture_on_commit_callbacks):
+        build_documents()
+        tag = service.tags.first()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.name = 'Renamed'
+            tag.save()
+
+        document = json.loads(ServiceDocument.objects.get(service=service).brief)
+        assert 'Renamed' in [t['name'] for t in document['tags']]
+
+    def test__tags_changed__documents_rebuilt(self, service, django_capture_on_commit_callbacks):
+        build_documents()
+        tag = ServiceTagFactory()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.tag_services.add(service)
+
+        document = json.loads(ServiceDocument.objects.get(service=service).detail)
+        assert tag.id in [t['id'] for t in document['tags']]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.delete()
+
+        document = json.loads(ServiceDocument.objects.get(service=service).detail)
+        assert tag.id not in [t['id'] for t in document['tags']]
+
+    def test__changes_in_transaction__rebuilt_once(self, service, monkeypatch, django_capture_on_commit_callbacks):
+        builds = []
+        monkeypatch.setattr('api.v1.catalog.documents.build_documents', builds.append)
+        other = ServiceFactory()
+
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            service.name = 'Renamed'
+            service.save()
+            service.tags.add(ServiceTagFactory())
+            ServiceScreenshotFactory.create(service=service)
+            other.tags.set(service.tags.all())
+
+        assert len([callback for callback in callbacks if isinstance(callback, PendingChanges)]) == 1
+        assert builds == [{service.id, other.id}]
+
+    def test__service_deleted__document_deleted(self, service, django_capture_on_commit_callbacks):
+        build_documents()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Service.objects.filter(pk=service.pk).delete()
+
+        assert not ServiceDocument.objects.exists()
+
+    def test__rebuild_command__builds_all(self, service):
+        ServiceFactory.create_batch(3)
+
+        call_command('rebuild_service_documents')
+
+        assert ServiceDocument.objects.count() == 4
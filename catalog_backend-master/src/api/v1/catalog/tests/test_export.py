@@ -0,0 +1,71 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from api.v1.catalog.documents import build_documents
+from apps.services.models import Service, ServiceDocument
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+
+def read_lines(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+@pytest.mark.django_db
+class TestServiceExportAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:services-export")
+
+    def test__export__one_detail_document_per_line(self, client, url):
+        services = ServiceFactory.create_batch(3, tags=ServiceTagFactory.create_batch(2))
+
+        response = client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = read_lines(b''.join(response.streaming_content))
+        assert [line['id'] for line in lines] == [s.id for s in services]
+        assert lines[0] == client.get(reverse("v1:catalog:services-detail", args=[services[0].id])).json()
+
+    def test__export__gzipped(self, client, url):
+        ServiceFactory.create_batch(2)
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert len(read_lines(gzip.decompress(b''.join(response.streaming_content)))) == 2
+
+    def test__export__updated_since(self, client, url):
+        old, changed = ServiceFactory.create_batch(2)
+        build_documents()
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Service.objects.filter(pk__in=[old.pk, changed.pk]).update(updated_at=an_hour_ago - timedelta(days=1))
+        ServiceDocument.objects.filter(service=old).update(updated_at=an_hour_ago - timedelta(days=1))
+
+        response = client.get(url, {'updated_since': an_hour_ago.isoformat()})
+
+        assert [line['id'] for line in read_lines(b''.join(response.streaming_content))] == [changed.id]
+
+    def test__export__invalid_updated_since(self, client, url):
+        response = client.get(url, {'updated_since': 'yesterday'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test__export_services__command(tmp_path):
+    services = ServiceFactory.create_batch(3)
+    output = tmp_path / 'services.ndjson.gz'
+
+    call_command('export_services', output=str(output), gzip=True)
+
+    assert [line['id'] for line in read_lines(gzip.decompress(output.read_bytes()))] == [s.id for s in services]
@@ -0,0 +1,96 @@
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from api import fastpath
+from api.fastpath import CompiledSerializer
+from api.prefetch import plan_queryset
+from api.renderers import JSONRenderer
+from api.v1.blog.serializers import BlogPostSerializer
+from api.v1.catalog.serializers import BriefCatalogServiceSerializer, CatalogServiceSerializer, ServiceTagSerializer
+from apps.blog.models import BlogPost
+from apps.services.models import Service, ServiceTag
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory, \
+    ServiceScreenshotFactory, CertificateFactory, ServiceMentionFactory, ServiceFeatureFactory, CountryFactory
+
+pytestmark = pytest.mark.integration
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db
+class TestCompiledSerializers:
+    @pytest.fixture
+    def services(self):
+        full = ServiceFactory.create(tags=ServiceTagFactory.create_batch(2), certificates=[CertificateFactory()],
+                                     countries=[CountryFactory()], features=[ServiceFeatureFactory()],
+                                     logo='images/logo.png')
+        ServiceScreenshotFactory.create(service=full, image='screenshots/one.png')
+        ServiceScreenshotFactory.create(service=full, image=None)
+        ServiceRatingFactory.create(service=full)
+        ServiceMentionFactory.create(service=full)
+        bare = ServiceFactory.create()
+        BlogPost.objects.create(title='Post', text='<p>Text</p>', image_url='https://example.com/a.png', service=full)
+        BlogPost.objects.create(title='Other', text='', image_url='https://example.com/b.png', image='posts/b.png')
+        return [full, bare]
+
+    @pytest.mark.parametrize('request_', [None, APIRequestFactory().get('/')])
+    @pytest.mark.parametrize(('serializer_class', 'queryset'), [
+        (BriefCatalogServiceSerializer, Service.objects.order_by('pk')),
+        (CatalogServiceSerializer, Service.objects.order_by('pk')),
+        (ServiceTagSerializer, ServiceTag.objects.order_by('pk')),
+        (BlogPostSerializer, BlogPost.objects.order_by('pk')),
+    ])
+    def test__output__byte_identical(self, services, serializer_class, queryset, request_):
+        context = {'request': request_}
+        instances = list(plan_queryset(queryset, serializer_class))
+
+        expected = render(serializer_class(instances, many=True, context=context).data)
+        compiled = render(CompiledSerializer(serializer_class(instances, many=True, context=context)).data)
+        single = render(CompiledSerializer(serializer_class(instances[0], context=context)).data)
+
+        assert compiled == expected
+        assert single == render(serializer_class(instances[0], context=context).data)
+
+    def test__expanded_blog_service__byte_identical(self, services):
+        context = {'request': None, 'fields': None, 'expand': ['service']}
+        posts = list(BlogPost.objects.order_by('pk'))
+
+        expected = render(BlogPostSerializer(posts, many=True, context=context).data)
+
+        assert render(CompiledSerializer(BlogPostSerializer(posts, many=True, context=context)).data) == expected
+
+    def test__compiled__reused_across_requests(self, services, monkeypatch):
+        compiled = []
+        compile_ = fastpath._compile
+        monkeypatch.setattr(fastpath, '_compile',
+                            lambda serializer: compiled.append(serializer) or compile_(serializer))
+        fastpath._compile_shape.cache_clear()
+        posts = list(BlogPost.objects.order_by('pk'))
+
+        def serialize(**context):
+            request = APIRequestFactory().get('/')
+            serializer = BlogPostSerializer(posts, many=True, context={'request': request, **context})
+            return CompiledSerializer(serializer).data
+
+        serialize()
+        serialize()
+        assert [type(serializer) for serializer in compiled] == [BlogPostSerializer]
+        assert 'request' not in compiled[0].context
+
+        serialize(fields=['id', 'service'], expand=['service'])
+        count = len(compiled)
+        serialize(fields=['id', 'service'], expand=['service'])
+        assert count > 1 and len(compiled) == count
+        assert not any('request' in serializer.context for serializer in compiled)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', ['screenshots', 'ratings', 'tags'])
+def test__prefetch_cache_name__matches_prefetch(name):
+    ServiceFactory.create()
+
+    service = Service.objects.prefetch_related(name).get()
+
+    assert fastpath._prefetch_cache_name(Service._meta.get_field(name)) in service._prefetched_objects_cache
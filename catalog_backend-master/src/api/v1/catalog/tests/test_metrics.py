@@ -0,0 +1,130 @@
+import json
+
+import pytest
+from django.urls import reverse
+
+from api import metrics
+from apps.services.tests.factories import ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+TAGS_REQUESTS = 'api_requests_total{basename="tags",action="list",method="GET",status="200"}'
+
+
+def sample(text, name):
+    """The value of the `name` sample (with its labels) of a Prometheus text page, 0 when missing."""
+    for line in text.splitlines():
+        if line.startswith(f'{name} '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:tags-list")
+
+    @pytest.fixture(autouse=True)
+    def metrics_dir(self, settings, tmp_path, monkeypatch):
+        settings.API_METRICS = True
+        settings.METRICS_DIR = str(tmp_path)
+        monkeypatch.setattr(metrics.registry, 'serving', True)
+        return tmp_path
+
+    def scrape(self, client, **headers):
+        response = client.get('/metrics/', **headers)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        return response.content.decode()
+
+    def test__requests__counted_by_basename(self, client, admin_client, url):
+        ServiceTagFactory.create()
+        before = self.scrape(admin_client)
+
+        client.get(url)
+        client.get(url)
+
+        after = self.scrape(admin_client)
+        assert sample(after, TAGS_REQUESTS) == sample(before, TAGS_REQUESTS) + 2
+        for result in ('miss', 'hit'):
+            name = f'api_page_cache_total{{basename="tags",result="{result}"}}'
+            assert sample(after, name) == sample(before, name) + 1
+        assert sample(after, 'api_request_duration_seconds_count{basename="tags"}') == \
+            sample(after, 'api_request_duration_seconds_bucket{basename="tags",le="+Inf"}') >= 2
+        assert '# TYPE api_request_duration_seconds histogram' in after
+
+    def test__disabled__not_counted(self, client, admin_client, settings, url):
+        settings.API_METRICS = False
+        before = sample(self.scrape(admin_client), TAGS_REQUESTS)
+
+        client.get(url)
+
+        assert sample(self.scrape(admin_client), TAGS_REQUESTS) == before
+
+    def test__workers__added_up_from_files(self, admin_client, metrics_dir):
+        before = sample(self.scrape(admin_client), TAGS_REQUESTS)
+        other = {
+            'counters': [['api_requests_total', [['basename', 'tags'], ['action', 'list'], ['method', 'GET'],
+                                                 ['status', '200']], 5]],
+            'histograms': [],
+        }
+        (metrics_dir / '1-worker.json').write_text(json.dumps(other))
+
+        text = self.scrape(admin_client)
+
+        assert sample(text, TAGS_REQUESTS) == before + 5
+        assert len(list(metrics_dir.glob('*.json'))) == 2
+
+    def test__server_started__files_cleared(self, metrics_dir):
+        (metrics_dir / '1-worker.json').write_text('{}')
+
+        metrics.clear()
+
+        assert not list(metrics_dir.iterdir())
+
+    def test__not_serving__no_file_written(self, admin_client, metrics_dir, monkeypatch):
+        monkeypatch.setattr(metrics.registry, 'serving', False)
+
+        self.scrape(admin_client)
+
+        assert not list(metrics_dir.iterdir())
+
+    def test__worker_exited__added_to_exited_file(self, admin_client, metrics_dir):
+        before = sample(self.scrape(admin_client), TAGS_REQUESTS)
+        labels = [['basename', 'tags'], ['action', 'list'], ['method', 'GET'], ['status', '200']]
+        for pid, value in ((1, 5), (2, 3)):
+            (metrics_dir / f'{pid}.json').write_text(json.dumps({
+                'counters': [['api_requests_total', labels, value]],
+                'histograms': [['api_request_duration_seconds', [['basename', 'tags']], [1] + [0] * 11 + [0.001]]],
+            }))
+
+        metrics.retire(1)
+        metrics.retire(2)
+
+        text = self.scrape(admin_client)
+        assert sample(text, TAGS_REQUESTS) == before + 8
+        assert not (metrics_dir / '1.json').exists() and not (metrics_dir / '2.json').exists()
+        assert (metrics_dir / metrics.EXITED_FILE).exists()
+
+    def test__forked__starts_from_zero(self, monkeypatch):
+        metrics.registry.inc('api_db_queries_total', (('basename', 'tags'),))
+        monkeypatch.setattr(metrics.os, 'getpid', lambda: -1)
+
+        counters, histograms = metrics.registry.collect()
+
+        assert not counters and not histograms
+
+    def test__token__required_when_set(self, client, admin_client, settings):
+        settings.METRICS_TOKEN = 'secret'
+
+        assert client.get('/metrics/').status_code == 401
+        assert admin_client.get('/metrics/').status_code == 401
+        assert client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret').status_code == 200
+
+    def test__no_token__staff_only(self, client, admin_client):
+        assert client.get('/metrics/').status_code == 302
+        self.scrape(admin_client)
+
+    def test__labels__escaped(self):
+        assert metrics.format_labels((('path', 'a"b\\c'),)) == '{path="a\\"b\\\\c"}'
@@ -0,0 +1,90 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.v1.catalog.documents import build_documents
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceRatingFactory, \
+    ServiceRatingReviewFactory, ServiceCategoryFactory, CountryFactory, CertificateFactory, ServiceFeatureFactory, \
+    ServiceScreenshotFactory, ServiceMentionFactory
+
+pytestmark = pytest.mark.integration
+
+
+def create_services(count):
+    tags = ServiceTagFactory.create_batch(3)
+    categories = ServiceCategoryFactory.create_batch(2)
+    countries = CountryFactory.create_batch(2)
+    features = ServiceFeatureFactory.create_batch(2)
+    services = []
+    for _ in range(count):
+        service = ServiceFactory.create(tags=tags, categories=categories, countries=countries,
+                                        certificates=CertificateFactory.create_batch(2), features=features)
+        ServiceScreenshotFactory.create_batch(2, service=service)
+        ServiceMentionFactory.create_batch(2, service=service)
+        ServiceRatingReviewFactory.create_batch(2, service_rating=ServiceRatingFactory(service=service))
+        services.append(service)
+    return services
+
+
+@pytest.mark.django_db
+class TestCatalogQueryCounts:
+    # updated_at (once per change, see api.conditional), count, services, documents
+    SERVICES_LIST_QUERIES = 4
+    # updated_at, service, document
+    SERVICES_DETAIL_QUERIES = 3
+    # services, tags, categories, countries, certificates (+ organisations), screenshots, ratings, mentions,
+    # features, upsert, next batch
+    DOCUMENTS_BUILD_QUERIES = 11
+    # count, reviews (+ ratings)
+    REVIEWS_LIST_QUERIES = 2
+    # updated_at, count, tags (with their service_count)
+    TAGS_LIST_QUERIES = 3
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test__services_list__constant_queries(self, client, django_assert_num_queries, count):
+        create_services(count)
+        build_documents()
+
+        with django_assert_num_queries(self.SERVICES_LIST_QUERIES):
+            response = client.get(reverse('v1:catalog:services-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['results']) == count
+
+    def test__services_detail__constant_queries(self, client, django_assert_num_queries):
+        service = create_services(1)[0]
+        build_documents()
+
+        with django_assert_num_queries(self.SERVICES_DETAIL_QUERIES):
+            response = client.get(reverse('v1:catalog:services-detail', args=[service.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['certificates']) == 2
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test__documents_build__constant_queries(self, django_assert_num_queries, count):
+        create_services(count)
+
+        with django_assert_num_queries(self.DOCUMENTS_BUILD_QUERIES):
+            built = build_documents()
+
+        assert len(built) == count
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test__reviews_list__constant_queries(self, client, django_assert_num_queries, count):
+        create_services(count)
+
+        with django_assert_num_queries(self.REVIEWS_LIST_QUERIES):
+            response = client.get(reverse('v1:catalog:reviews-list'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['results']) == count * 2
+
+    @pytest.mark.parametrize('count', [1, 10])
+    def test__tags_list__constant_queries(self, client, django_assert_num_queries, count):
+        create_services(count)
+
+        with django_assert_num_queries(self.TAGS_LIST_QUERIES):
+            response = client.get(reverse('v1:catalog:tags-list'), {'page_size': 100})
+
+        assert [tag['count'] for tag in response.json()['results']] == [count] * 3
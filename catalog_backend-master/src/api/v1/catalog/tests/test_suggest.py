@@ -0,0 +1,104 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.v1.catalog.suggest import SuggestIndex
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceCategoryFactory
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.django_db
+class TestSuggestAPI:
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:suggest-list")
+
+    def test__suggest__prefix_across_types(self, client, url):
+        service = ServiceFactory.create(name="Longevity Lab")
+        category = ServiceCategoryFactory.create(name="Longevity clinics")
+        tag = ServiceTagFactory.create(name="Biological longevity")
+        ServiceFactory.create(name="Sleep tracker")
+
+        response = client.get(url, {'q': 'longev'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['results'] == [
+            {'id': service.id, 'name': "Longevity Lab", 'type': 'service'},
+            {'id': category.id, 'name': "Longevity clinics", 'type': 'category'},
+            {'id': tag.id, 'name': "Biological longevity", 'type': 'tag'},
+        ]
+
+    def test__suggest__multiple_words_and_accents(self, client, url):
+        service = ServiceFactory.create(name="Clínica Vitál")
+        ServiceFactory.create(name="Clinical trials")
+
+        response = client.get(url, {'q': 'clinica vi'})
+
+        assert response.json()['results'][0]['id'] == service.id
+
+    def test__suggest__misspelling(self, client, url):
+        service = ServiceFactory.create(name="Epigenetics")
+
+        response = client.get(url, {'q': 'epigentics'})
+
+        assert [r['id'] for r in response.json()['results']] == [service.id]
+
+    def test__suggest__incremental_updates(self, client, url, django_capture_on_commit_callbacks):
+        assert client.get(url, {'q': 'microbiome'}).json()['results'] == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service = ServiceFactory.create(name="Microbiome test")
+        assert [r['id'] for r in client.get(url, {'q': 'microbiome'}).json()['results']] == [service.id]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            service.delete()
+        assert client.get(url, {'q': 'microbiome'}).json()['results'] == []
+
+    def test__suggest__limit(self, client, url):
+        ServiceFactory.create_batch(5, name="Same name")
+
+        response = client.get(url, {'q': 'same', 'limit': 3})
+
+        assert len(response.json()['results']) == 3
+
+    def test__suggest__empty_query(self, client, url):
+        response = client.get(url)
+
+        assert response.json()['results'] == []
+
+
+@pytest.mark.django_db
+def test__suggest_index__ranking():
+    phrase = ServiceFactory.create(name="Ketone meter pro")
+    first_word = ServiceFactory.create(name="Ketone and meter")
+    other_words = ServiceFactory.create(name="Meter for ketone")
+    similar = ServiceFactory.create(name="Ketones")
+    index = SuggestIndex()
+
+    assert [r['id'] for r in index.suggest('ketone meter', limit=3)] == [phrase.id, first_word.id, other_words.id]
+    assert [r['id'] for r in index.suggest('ketonse')] == [similar.id]
+
+
+@pytest.mark.django_db
+def test__suggest_index__interleaved_updates_of_two_processes(monkeypatch):
+    first, second = SuggestIndex(), SuggestIndex()
+    first.suggest('warm up')
+    second.suggest('warm up')
+    loads = []
+    monkeypatch.setattr(SuggestIndex, 'load', lambda self: loads.append(self))
+
+    # Each process logs its own change, the other one's comes next.
+    kept = ServiceFactory.create(name="Ketone meter")
+    first.update('service', kept.id)
+    removed = ServiceFactory.create(name="Ketone strips")
+    second.update('service', removed.id)
+    kept.name = "Ketone monitor"
+    kept.save()
+    second.update('service', kept.id)
+    removed.delete()
+    first.update('service', removed.id)
+
+    for index in (first, second):
+        assert index.suggest('ketone') == [{'id': kept.id, 'name': "Ketone monitor", 'type': 'service'}]
+    assert loads == []
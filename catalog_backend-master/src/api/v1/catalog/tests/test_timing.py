@@ -0,0 +1,71 @@
+import json
+import logging
+
+import pytest
+from django.urls import reverse
+
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+    @pytest.fixture(autouse=True)
+    def timing(self, settings, caplog):
+        # `api.timing` does not propagate to the root logger `caplog` listens on.
+        settings.API_TIMING = True
+        logger = logging.getLogger('api.timing')
+        logger.addHandler(caplog.handler)
+        yield
+        logger.removeHandler(caplog.handler)
+
+    @pytest.fixture
+    def url(self):
+        return reverse("v1:catalog:tags-list")
+
+    def test__staff__header_sent(self, admin_client, url):
+        ServiceTagFactory.create()
+
+        response = admin_client.get(url)
+
+        metrics = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        assert metrics == ['db', 'serialize', 'render', 'cache', 'total']
+        assert 'cache;desc="miss"' in response['Server-Timing']
+
+    def test__anonymous__header_only_when_public(self, client, settings, url):
+        ServiceTagFactory.create()
+
+        assert 'Server-Timing' not in client.get(url)
+
+        settings.API_SERVER_TIMING_PUBLIC = True
+        assert 'cache;desc="hit"' in client.get(url)['Server-Timing']
+
+    def test__log_line__structured(self, client, url, caplog):
+        ServiceFactory.create(tags=[ServiceTagFactory.create()])
+
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            client.get(reverse("v1:catalog:services-list"), {'fields': 'id,name'})
+
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['endpoint'] == 'services-list'
+        assert record['status'] == 200
+        assert record['cache'] == 'miss'
+        assert record['queries'] > 0
+        assert record['serialize_ms'] >= 0 and record['render_ms'] >= 0
+
+    def test__disabled__nothing_recorded(self, admin_client, settings, url, caplog):
+        settings.API_TIMING = False
+
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            response = admin_client.get(url)
+
+        assert 'Server-Timing' not in response
+        assert not caplog.records
+
+    def test__other_views__not_recorded(self, admin_client, caplog):
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            response = admin_client.get('/cache/stats/')
+
+        assert 'Server-Timing' not in response
+        assert not caplog.records
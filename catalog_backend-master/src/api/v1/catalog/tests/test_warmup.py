@@ -0,0 +1,79 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from api import caching, metrics, warmup
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceCategoryFactory
+
+pytestmark = pytest.mark.integration
+
+TAGS_URL = '/api/v1/catalog/tags/?page_size=100&category='
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWarmCache:
+    @pytest.fixture(autouse=True)
+    def warmup_settings(self, settings):
+        settings.API_CACHE_WARMUP_HOST = 'testserver'
+        settings.API_CACHE_WARMUP_SECURE = False
+        settings.API_CACHE_WARMUP_ENCODINGS = ['identity']
+
+    def test__command__pages_cached(self, client, django_assert_num_queries):
+        ServiceTagFactory.create()
+        out = StringIO()
+
+        call_command('warm_cache', stdout=out)
+
+        assert '200 ' in out.getvalue()
+        assert TAGS_URL in out.getvalue()
+        with django_assert_num_queries(0):
+            response = client.get(TAGS_URL)
+        assert len(response.json()['results']) == 1
+
+    def test__warmup_requests__not_counted_as_visitors(self, settings, monkeypatch):
+        settings.API_METRICS = True
+        recorded = []
+        monkeypatch.setattr(metrics, 'record_request', lambda *args: recorded.append(args))
+        ServiceTagFactory.create()
+        before = caching.cache_stats().get('tags-list')
+
+        call_command('warm_cache', '--resource', 'tags', stdout=StringIO())
+
+        assert recorded == []
+        assert caching.cache_stats().get('tags-list') == before
+
+    def test__no_host__refused(self, settings):
+        settings.API_CACHE_WARMUP_HOST = ''
+        settings.ALLOWED_HOSTS = ['*']
+
+        with pytest.raises(CommandError, match='API_CACHE_WARMUP_HOST'):
+            call_command('warm_cache', stdout=StringIO())
+
+    def test__url_placeholders__expanded(self):
+        categories = ServiceCategoryFactory.create_batch(3)
+        ServiceFactory.create(categories=categories)
+        out = StringIO()
+
+        call_command('warm_cache', '--url', '/api/v1/catalog/services/?categories={category}', '--limit', '2',
+                     stdout=out)
+
+        assert {line.split()[-1] for line in out.getvalue().splitlines()[:-1]} == \
+            {f'/api/v1/catalog/services/?categories={category.id}' for category in categories[:2]}
+
+    def test__invalidated__warmed_again(self, client, settings, monkeypatch, django_assert_num_queries):
+        settings.API_CACHE_WARMUP_ON_INVALIDATE = True
+        monkeypatch.setattr(warmup, 'WARMUP_DELAY', 0)
+        tag = ServiceTagFactory.create(name="Old")
+        client.get(TAGS_URL)
+
+        tag.name = "New"
+        tag.save()
+        worker = warmup._worker
+        if worker is not None:
+            worker.join()
+
+        with django_assert_num_queries(0):
+            response = client.get(TAGS_URL)
+        assert response.json()['results'][0]['name'] == "New"
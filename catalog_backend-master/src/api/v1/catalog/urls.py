@@ -1,7 +1,8 @@
 from rest_framework import routers
 
 from apps.services.models import ServiceRatingReview
-from .views import CatalogServicesViewSet, ServiceTagsViewSet, ServiceCategoriesViewSet, ServiceRatingReviewViewSet
+from .views import CatalogServicesViewSet, ServiceTagsViewSet, ServiceCategoriesViewSet, ServiceRatingReviewViewSet, \
+    SuggestViewSet
 
 app_name = "catalog"
 
@@ -10,6 +11,7 @@ router.register(r'services', CatalogServicesViewSet, basename='services')
 router.register(r'tags', ServiceTagsViewSet, basename='tags')
 router.register(r'categories', ServiceCategoriesViewSet, basename='categories')
 router.register(r'reviews', ServiceRatingReviewViewSet, basename='reviews')
+router.register(r'suggest', SuggestViewSet, basename='suggest')
 
 urlpatterns = []
 urlpatterns += router.urls
@@ -1,11 +1,30 @@
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from rest_framework import viewsets
-
-from apps.services.models import Service, ServiceTag, ServiceCategory, ServiceRatingReview
-from .filters import ServiceFilter, ServiceRatingReviewFilter, ServiceTagsReviewFilter
+from django.utils.text import compress_sequence
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from api.caching import cache_response
+from api.conditional import conditional_get
+from api.fastpath import CompiledSerializerMixin
+from api.prefetch import PrefetchPlannerMixin
+from api.sparse import SparseFieldsMixin
+from api.streaming import StreamingListMixin
+from api.timing import TimingMixin
+from apps.services.denormalize import STARS
+from apps.services.models import Service, ServiceTag, ServiceCategory, ServiceRatingReview, ServiceRating
+from .documents import get_documents
+from .export import export_lines, export_queryset, parse_updated_since, re_accepts_gzip
+from .facets import facet_counts
+from .filters import ORDERING_FIELDS, ServiceFilter, ServiceRatingReviewFilter, ServiceTagsReviewFilter, \
+    ServiceRatingSummaryFilter
+from .suggest import index
 from .serializers import CatalogServiceSerializer, ServiceTagSerializer, ServiceCategorySerializer, \
-    ServiceRatingReviewSerializer, BriefCatalogServiceSerializer
+    ServiceRatingReviewSerializer, BriefCatalogServiceSerializer, ServiceRatingSummarySerializer
 
 CACHING_PERIOD = 60 * 60 * 2
 
@@ -36,9 +55,11 @@ class GetSerializerClassMixin(object):
             return super().get_serializer_class()
 
 
-class CatalogServicesViewSet(GetSerializerClassMixin, viewsets.ReadOnlyModelViewSet):
-    queryset = Service.objects.all().prefetch_related('countries', 'tags', 'categories', 'certificates', 'features',
-                                                      'mentions')
+class CatalogServicesViewSet(TimingMixin, StreamingListMixin, SparseFieldsMixin, CompiledSerializerMixin,
+                             PrefetchPlannerMixin, GetSerializerClassMixin, viewsets.ReadOnlyModelViewSet):
+    # Newest first unless `?ordering=` (or `?search=`, by relevance) says otherwise.
+    default_ordering = ('-created_at', '-id')
+    queryset = Service.objects.order_by(*default_ordering)
     serializer_class = CatalogServiceSerializer
     filterset_class = ServiceFilter
     serializer_action_classes = {
@@ -46,35 +67,172 @@ class CatalogServicesViewSet(GetSerializerClassMixin, viewsets.ReadOnlyModelView
         'retrieve': CatalogServiceSerializer,
     }
 
-    @method_decorator(cache_page(CACHING_PERIOD))
+    @property
+    def cursor_ordering(self):
+        """
+        Keyset order of `?cursor=` pagination: the fields of `?ordering=` then
+        the id, each backed by an index (see `Service.Meta.indexes`). `None`
+        for `?search=`, whose relevance order has no keyset.
+        """
+        if self.request.query_params.get('search'):
+            return None
+        terms = [term.strip() for term in self.request.query_params.get('ordering', '').split(',')]
+        ordering = tuple(term for term in terms if term.lstrip('-') in ORDERING_FIELDS)
+        if not ordering:
+            return self.default_ordering
+        return ordering + ('-id' if ordering[-1].startswith('-') else 'id',)
+
+    def get_document_queryset(self):
+        """
+        List and retrieve only need primary keys (and the cursor position), the
+        representations are read from the pre-rendered `ServiceDocument` rows.
+        """
+        columns = {field.lstrip('-') for field in self.cursor_ordering or ()}
+        return self.filter_queryset(Service.objects.only('pk', *columns).order_by(*self.default_ordering))
+
+    @conditional_get('services')
+    @method_decorator(cache_response(CACHING_PERIOD, 'services'))
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        if self.is_sparse():
+            # Other shapes than the stored documents are serialized live.
+            return super().list(request, *args, **kwargs)
 
+        queryset = self.get_document_queryset()
+        if self.wants_stream(request):
+            return self.stream(queryset, lambda services: get_documents(services, 'brief', request))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(get_documents(page, 'brief', request))
+
+        return Response(get_documents(queryset, 'brief', request))
+
+    @conditional_get('services')
+    def retrieve(self, request, *args, **kwargs):
+        if self.is_sparse():
+            return super().retrieve(request, *args, **kwargs)
+
+        instance = get_object_or_404(self.get_document_queryset(), pk=self.kwargs['pk'])
+        self.check_object_permissions(request, instance)
+        return Response(get_documents([instance], 'detail', request)[0])
+
+    @action(detail=False)
+    @conditional_get('services')
+    @method_decorator(cache_response(CACHING_PERIOD, 'services'))
+    def facets(self, request, *args, **kwargs):
+        """
+        Per-tag, per-category and per-country service counts for the services
+        matching the same filters as the list.
+        """
+        return Response(facet_counts(self.filter_queryset(Service.objects.all())))
 
-class ServiceRatingReviewViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False)
+    def export(self, request, *args, **kwargs):
+        """
+        The detail documents of all services matching the list filters as
+        NDJSON, optionally only those changed since `updated_since`. Streamed,
+        and gzipped when the client accepts it.
+        """
+        try:
+            updated_since = parse_updated_since(request.query_params.get('updated_since'))
+        except ValueError:
+            raise ValidationError({'updated_since': ["Enter a valid date or datetime."]})
+
+        queryset = export_queryset(self.filter_queryset(Service.objects.all()), updated_since)
+        content = export_lines(queryset, request)
+        gzipped = re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        response = StreamingHttpResponse(compress_sequence(content) if gzipped else content,
+                                         content_type='application/x-ndjson')
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class ServiceRatingReviewViewSet(TimingMixin, StreamingListMixin, SparseFieldsMixin, CompiledSerializerMixin,
+                                 PrefetchPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ServiceRatingReview.objects.all()
     serializer_class = ServiceRatingReviewSerializer
     filterset_class = ServiceRatingReviewFilter
+    cursor_ordering = ('-id',)
 
-    @method_decorator(cache_page(CACHING_PERIOD))
+    @conditional_get('reviews')
+    @method_decorator(cache_response(CACHING_PERIOD, 'reviews'))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @conditional_get('reviews')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-class ServiceTagsViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False)
+    @conditional_get('reviews')
+    @method_decorator(cache_response(CACHING_PERIOD, 'reviews'))
+    def summary(self, request, *args, **kwargs):
+        """
+        Review count, mean score and 0-5 star histogram of the ratings
+        matching the same filters as the list, in total and per rating, from
+        the aggregates stored on the ratings.
+        """
+        filterset = ServiceRatingSummaryFilter(request.query_params, queryset=ServiceRating.objects.order_by('pk'))
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        ratings = list(filterset.qs)
+
+        count = sum(rating.review_count for rating in ratings)
+        total = sum(rating.review_mean * rating.review_count for rating in ratings if rating.review_count)
+        return Response({
+            'count': count,
+            'mean': total / count if count else None,
+            'histogram': [sum(rating.review_histogram[star] for rating in ratings) for star in STARS],
+            'ratings': ServiceRatingSummarySerializer(ratings, many=True).data,
+        })
+
+
+class ServiceTagsViewSet(TimingMixin, StreamingListMixin, SparseFieldsMixin, CompiledSerializerMixin,
+                         PrefetchPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ServiceTag.objects.all().order_by('name')
     serializer_class = ServiceTagSerializer
     filterset_class = ServiceTagsReviewFilter
 
-    @method_decorator(cache_page(CACHING_PERIOD))
+    @conditional_get('tags')
+    @method_decorator(cache_response(CACHING_PERIOD, 'tags'))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @conditional_get('tags')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
-class ServiceCategoriesViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceCategoriesViewSet(TimingMixin, StreamingListMixin, SparseFieldsMixin, CompiledSerializerMixin,
+                               PrefetchPlannerMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ServiceCategory.objects.all().order_by('name')
     serializer_class = ServiceCategorySerializer
 
-    @method_decorator(cache_page(CACHING_PERIOD))
+    @conditional_get('categories')
+    @method_decorator(cache_response(CACHING_PERIOD, 'categories'))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
+
+    @conditional_get('categories')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class SuggestViewSet(TimingMixin, viewsets.ViewSet):
+    """
+    Typeahead suggestions for the search box: ids, names and types of
+    matching services, categories and tags, served from an in-process index.
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 10
+    max_limit = 25
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limit = min(int(request.query_params['limit']), self.max_limit)
+        except (KeyError, ValueError):
+            limit = self.default_limit
+
+        return Response({'results': index.suggest(request.query_params.get('q', ''), max(limit, 1))})
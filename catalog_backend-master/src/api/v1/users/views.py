@@ -1,10 +1,11 @@
 from rest_framework import viewsets, mixins
 
+from api.timing import TimingMixin
 from apps.services.models import EmailSubscription
 from .serializers import EmailSubscriptionSerializer
 from rest_framework import permissions
 
-class EmailSubscriptionViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
+class EmailSubscriptionViewSet(TimingMixin, viewsets.GenericViewSet, mixins.CreateModelMixin):
     queryset = EmailSubscription.objects.all()
     serializer_class = EmailSubscriptionSerializer
     permission_classes = [permissions.AllowAny]
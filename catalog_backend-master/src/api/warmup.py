@@ -0,0 +1,167 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from string import Formatter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.test import RequestFactory
+
+from apps.services.models import ServiceTag, ServiceCategory, ServiceRating
+
+logger = logging.getLogger(__name__)
+
+# Values of the placeholders of `settings.API_CACHE_WARMUP_URLS`.
+PLACEHOLDERS = {
+    'tag': lambda: ServiceTag.objects.order_by('pk').values_list('pk', flat=True),
+    'category': lambda: ServiceCategory.objects.order_by('pk').values_list('pk', flat=True),
+    # Services without ratings have an empty review page, cheap to build.
+    'service': lambda: ServiceRating.objects.order_by('service_id').values_list('service_id', flat=True).distinct(),
+}
+
+WORKERS = 4
+
+# Invalidations within this many seconds are warmed together.
+WARMUP_DELAY = 1
+
+
+def expand(templates, limit=None):
+    """The URLs of `templates`, one per combination of their placeholder values (at most `limit` each)."""
+    values = {}
+    for template in templates:
+        names = [name for _, name, _, _ in Formatter().parse(template) if name]
+        for name in names:
+            if name not in values:
+                values[name] = list(PLACEHOLDERS[name]()[:limit])
+        for combination in itertools.product(*(values[name] for name in names)):
+            yield template.format(**dict(zip(names, combination)))
+
+
+def get_urls(resources=None, templates=None, limit=None):
+    """The URLs to warm: `templates`, or the configured ones of `resources` (all when none are given)."""
+    if templates is None:
+        configured = settings.API_CACHE_WARMUP_URLS
+        templates = [template for resource in resources or configured for template in configured.get(resource, ())]
+    return list(dict.fromkeys(expand(templates, limit)))
+
+
+def get_host():
+    """
+    `settings.API_CACHE_WARMUP_HOST`, or the first allowed host: cached pages
+    are per absolute URL. `None` when any host is allowed and none is set,
+    as pages warmed for a made up host are never requested.
+    """
+    if settings.API_CACHE_WARMUP_HOST:
+        return settings.API_CACHE_WARMUP_HOST
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0] if hosts else None
+
+
+def get_handler():
+    """
+    The middleware and view stack of the project, called without the
+    `request_started` and `request_finished` signals of a server (or of the
+    test client, which reconnects the receivers of those for every request).
+    """
+    handler = BaseHandler()
+    handler.load_middleware()
+    return handler
+
+
+def fetch(handler, url, encoding, host, secure):
+    """
+    Request `url` like the frontend does, return `(status, milliseconds, bytes)`.
+    Marked as `warming_cache`, the request is not timed or counted as a visitor's.
+    """
+    request = RequestFactory().get(url, secure=secure, HTTP_HOST=host, HTTP_ACCEPT_ENCODING=encoding)
+    request.warming_cache = True
+    start = time.perf_counter()
+    response = handler.get_response(request)
+    return response.status_code, (time.perf_counter() - start) * 1000, len(response.content)
+
+
+def warm(urls, encodings=None, host=None, secure=None, workers=WORKERS):
+    """
+    Request `urls` once per `Accept-Encoding` of `encodings` through the
+    whole middleware and view stack (so the pages are cached as for
+    visitors) with `workers` threads. Yield
+    `(url, encoding, status, milliseconds, bytes)` as the requests finish.
+    """
+    encodings = encodings or settings.API_CACHE_WARMUP_ENCODINGS
+    host = host or get_host()
+    if host is None:
+        raise ImproperlyConfigured('Set API_CACHE_WARMUP_HOST (or concrete ALLOWED_HOSTS) to warm the page cache')
+    secure = settings.API_CACHE_WARMUP_SECURE if secure is None else secure
+    handler = get_handler()
+    pending = queue.SimpleQueue()
+    for request in itertools.product(urls, encodings):
+        pending.put(request)
+    done = queue.SimpleQueue()
+
+    def work():
+        try:
+            while True:
+                try:
+                    url, encoding = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    done.put((url, encoding) + fetch(handler, url, encoding, host, secure))
+                except Exception as error:
+                    done.put(error)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for _ in range(len(urls) * len(encodings)):
+        result = done.get()
+        if isinstance(result, Exception):
+            raise result
+        yield result
+    for thread in threads:
+        thread.join()
+
+
+# Resources invalidated since the last warm-up, see `warm_after_invalidation`.
+_pending = set()
+_lock = threading.Lock()
+_worker = None
+
+
+def warm_after_invalidation(resources):
+    """Warm the pages of `resources` in a background thread, coalescing invalidations in quick succession."""
+    global _worker
+    if get_host() is None:
+        logger.warning('Cache warm-up skipped, set API_CACHE_WARMUP_HOST (or concrete ALLOWED_HOSTS)')
+        return
+    with _lock:
+        _pending.update(resources)
+        if _worker is None:
+            _worker = threading.Thread(target=_warm_pending, daemon=True)
+            _worker.start()
+
+
+def _warm_pending():
+    global _worker
+    while True:
+        time.sleep(WARMUP_DELAY)
+        with _lock:
+            resources = set(_pending)
+            _pending.clear()
+            if not resources:
+                _worker = None
+                return
+        try:
+            for url, encoding, status, milliseconds, size in warm(get_urls(resources)):
+                if status != 200:
+                    logger.warning('Cache warm-up of %s got %s', url, status)
+        except Exception:
+            logger.exception('Cache warm-up of %s failed', ', '.join(sorted(resources)))
+        finally:
+            connections.close_all()
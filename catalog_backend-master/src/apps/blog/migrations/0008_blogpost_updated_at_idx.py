@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blogpost_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['updated_at'], name='blog_posts_updated_at_idx'),
+        ),
+    ]
@@ -14,5 +14,10 @@ class BlogPost(models.Model):
     service = models.ForeignKey('services.Service', on_delete=models.CASCADE, related_name='blog_posts', null=True,
                                 blank=True, default=None)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='blog_posts_updated_at_idx'),
+        ]
+
     def __str__(self):
         return self.title
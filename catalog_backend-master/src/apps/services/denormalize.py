@@ -0,0 +1,170 @@
+from collections import defaultdict
+
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.services.models import Service, ServiceRating, ServiceRatingReview, CategoryTag, RatingEntity
+
+# M2M field of `Service` -> denormalized id array column.
+ID_ARRAYS = {
+    'tags': 'tag_ids',
+    'categories': 'category_ids',
+    'countries': 'country_ids',
+    'certificates': 'certificate_ids',
+}
+
+# M2M fields of `Service` whose targets have a `service_count` column.
+SERVICE_COUNTS = ('tags', 'categories', 'countries', 'features')
+
+
+def sync_id_arrays(service_ids, relations=tuple(ID_ARRAYS)):
+    """
+    Copy the current M2M rows of `relations` into the id array columns of the
+    services in `service_ids`. Returns the written arrays as
+    `{relation: {service_id: ids}}`.
+    """
+    service_ids = list(service_ids)
+    synced = {}
+    if not service_ids:
+        return synced
+
+    for relation in relations:
+        field = Service._meta.get_field(relation)
+        target = field.m2m_reverse_name()
+        ids = defaultdict(list)
+        rows = field.remote_field.through.objects \
+            .filter(service_id__in=service_ids) \
+            .order_by(target) \
+            .values_list('service_id', target)
+        for service_id, target_id in rows:
+            ids[service_id].append(target_id)
+
+        column = ID_ARRAYS[relation]
+        services = [Service(pk=pk, **{column: ids[pk]}) for pk in service_ids]
+        Service.objects.bulk_update(services, [column], batch_size=1000)
+        synced[relation] = {pk: ids[pk] for pk in service_ids}
+    return synced
+
+
+def get_related_ids(service_ids, relations=SERVICE_COUNTS):
+    """Return `{relation: ids}` of the rows of `relations` linked to the services in `service_ids`."""
+    related = {}
+    for relation in relations:
+        field = Service._meta.get_field(relation)
+        related[relation] = set(field.remote_field.through.objects
+                                .filter(service_id__in=list(service_ids))
+                                .values_list(field.m2m_reverse_name(), flat=True))
+    return related
+
+
+def sync_service_counts(relations=SERVICE_COUNTS, ids=None):
+    """
+    Recount the `service_count` column of the targets of `relations` (only
+    those in `ids`, `{relation: ids}`, when given) from the M2M rows, with
+    one `UPDATE` per relation.
+    """
+    for relation in relations:
+        field = Service._meta.get_field(relation)
+        target = field.m2m_reverse_field_name()
+        counts = field.remote_field.through.objects \
+            .filter(**{target: OuterRef('pk')}) \
+            .order_by() \
+            .values(target) \
+            .annotate(count=Count('pk')) \
+            .values('count')
+        targets = field.related_model.objects.all()
+        if ids is not None:
+            if not ids.get(relation):
+                continue
+            targets = targets.filter(pk__in=list(ids[relation]))
+        targets.update(service_count=Coalesce(Subquery(counts), 0))
+
+
+def get_category_ids(service_ids):
+    """Ids of the categories of the services in `service_ids`."""
+    return set(Service.categories.through.objects
+               .filter(service_id__in=list(service_ids))
+               .values_list('servicecategory_id', flat=True))
+
+
+def sync_category_tags(category_ids=None):
+    """
+    Rebuild the `CategoryTag` rows of the categories in `category_ids` (all
+    when `None`) from the M2M rows: one per tag of their services, with the
+    number of those services.
+    """
+    categories = Service.categories.through.objects.filter(service__tags__isnull=False)
+    existing = CategoryTag.objects.all()
+    if category_ids is not None:
+        category_ids = list(category_ids)
+        if not category_ids:
+            return
+        categories = categories.filter(servicecategory_id__in=category_ids)
+        existing = existing.filter(category_id__in=category_ids)
+
+    rows = categories \
+        .order_by() \
+        .values_list('servicecategory_id', 'service__tags') \
+        .annotate(count=Count('service_id'))
+    pairs = {(category_id, tag_id): count for category_id, tag_id, count in rows}
+    stale = [pk for pk, category_id, tag_id in existing.values_list('pk', 'category_id', 'tag_id')
+             if (category_id, tag_id) not in pairs]
+    if stale:
+        CategoryTag.objects.filter(pk__in=stale).delete()
+    CategoryTag.objects.bulk_create(
+        [CategoryTag(category_id=category_id, tag_id=tag_id, service_count=count)
+         for (category_id, tag_id), count in pairs.items()],
+        batch_size=1000, update_conflicts=True, unique_fields=['category', 'tag'], update_fields=['service_count'],
+    )
+
+
+# Stars of the review histogram, each counting the scores within half a star.
+STARS = range(6)
+
+
+def sync_review_aggregates(rating_ids=None):
+    """
+    Recompute the review count, mean and histogram of the ratings in
+    `rating_ids` (all when `None`) with one grouped query and a bulk update.
+    """
+    ratings = ServiceRating.objects.all()
+    if rating_ids is not None:
+        rating_ids = list(rating_ids)
+        if not rating_ids:
+            return
+        ratings = ratings.filter(pk__in=rating_ids)
+
+    buckets = {f'star_{star}': Count('pk', filter=Q(score__gte=star - 0.5, score__lt=star + 0.5) if star < 5
+                                     else Q(score__gte=star - 0.5))
+               for star in STARS}
+    reviews = ServiceRatingReview.objects
+    if rating_ids is not None:
+        reviews = reviews.filter(service_rating_id__in=rating_ids)
+    rows = {row['service_rating_id']: row for row in reviews
+            .order_by()
+            .values('service_rating_id')
+            .annotate(count=Count('pk'), mean=Avg('score'), **buckets)}
+
+    updated = []
+    for rating in ratings.only('pk'):
+        row = rows.get(rating.pk)
+        rating.review_count = row['count'] if row else 0
+        rating.review_mean = row['mean'] if row else None
+        rating.review_histogram = [row[f'star_{star}'] if row else 0 for star in STARS]
+        updated.append(rating)
+    ServiceRating.objects.bulk_update(updated, ['review_count', 'review_mean', 'review_histogram'], batch_size=1000)
+
+
+def sync_service_scores(service_ids=None):
+    """
+    Copy the Trustpilot rating score of the services in `service_ids` (all
+    when `None`) to their `score` column, 0 for services without one.
+    """
+    ratings = ServiceRating.objects \
+        .filter(service=OuterRef('pk'), entity=RatingEntity.TRUSTPILOT) \
+        .order_by('-pk') \
+        .values('score')[:1]
+    services = Service.objects.all()
+    if service_ids is not None:
+        services = services.filter(pk__in=list(service_ids))
+    services.update(score=Coalesce(Subquery(ratings), 0.0))
@@ -0,0 +1,13 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+
+class IdArrayField(ArrayField):
+    """Array of ids (`bigint[]`), empty by default and not edited in forms."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('base_field', models.BigIntegerField())
+        kwargs.setdefault('default', list)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        super().__init__(**kwargs)
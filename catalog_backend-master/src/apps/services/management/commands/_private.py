@@ -0,0 +1,18 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back when it ends, for generated data."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
@@ -0,0 +1,269 @@
+import json
+import random
+import re
+from string import Formatter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.warmup import fetch, get_handler, get_host
+from apps.services.denormalize import sync_id_arrays, sync_service_counts, sync_category_tags
+from apps.services.management.commands._private import rolled_back
+from apps.services.models import Service, ServiceTag, ServiceCategory, Country, ServiceRating
+
+# Requests of the frontend and the filters, orderings and pagination modes
+# behind them. Placeholders are filled from the data, see `PLACEHOLDERS`.
+CASES = (
+    '/api/v1/catalog/services/?page=1&page_size=20',
+    '/api/v1/catalog/services/?page=50&page_size=20',
+    '/api/v1/catalog/services/?cursor=&page_size=20',
+    '/api/v1/catalog/services/?tags={tag}&page_size=20',
+    '/api/v1/catalog/services/?tags={tag}&tags={other_tag}&page_size=20',
+    '/api/v1/catalog/services/?tags_any={tag}&tags_any={other_tag}&page_size=20',
+    '/api/v1/catalog/services/?categories={category}&page_size=20',
+    '/api/v1/catalog/services/?categories_any={category}&countries={country}&page_size=20',
+    '/api/v1/catalog/services/?search={word}&page_size=20',
+    '/api/v1/catalog/services/?name={word}&page_size=20',
+    '/api/v1/catalog/services/?ordering=name&page_size=20',
+    '/api/v1/catalog/services/?ordering=-score&cursor=&page_size=20',
+    '/api/v1/catalog/services/?fields=id,name,tags,categories,countries,ratings&page_size=20',
+    '/api/v1/catalog/services/facets/?tags={tag}',
+    '/api/v1/catalog/services/{service}/',
+    '/api/v1/catalog/tags/?page_size=100',
+    '/api/v1/catalog/tags/?page_size=100&category={category}',
+    '/api/v1/catalog/tags/?page_size=100&ordering=name',
+    '/api/v1/catalog/categories/?page_size=100',
+    '/api/v1/catalog/reviews/?service_rating__service__id={service}',
+    '/api/v1/catalog/reviews/?service_rating__service__id={service}&cursor=',
+    '/api/v1/catalog/reviews/summary/?service_rating__service__id={service}',
+    '/api/v1/blog/posts/?page_size=20',
+    '/api/v1/blog/posts/?page_size=20&expand=service',
+)
+
+# The most used (or the first) rows, so that the filters select something.
+PLACEHOLDERS = {
+    'tag': lambda: ServiceTag.objects.order_by('-service_count', 'pk').values_list('pk', flat=True)[:1],
+    'other_tag': lambda: ServiceTag.objects.order_by('-service_count', 'pk').values_list('pk', flat=True)[1:2],
+    'category': lambda: ServiceCategory.objects.order_by('-service_count', 'pk').values_list('pk', flat=True)[:1],
+    'country': lambda: Country.objects.order_by('-service_count', 'pk').values_list('pk', flat=True)[:1],
+    # The service with the most reviews, else the first one.
+    'service': lambda: [*ServiceRating.objects.order_by('-review_count', 'pk').values_list('service_id', flat=True)[:1],
+                        *Service.objects.order_by('pk').values_list('pk', flat=True)[:1]][:1],
+    'word': lambda: [name.split()[0] for name in Service.objects.order_by('pk').values_list('name', flat=True)[:1]],
+}
+
+# Stand-ins for the placeholders without rows, the queries still run.
+MISSING = {'word': 'service'}
+
+SEQ_SCAN_ROWS = 1000
+NESTED_LOOPS = 1000
+MISESTIMATE = 100
+
+
+def fingerprint(sql):
+    """`sql` with its literals replaced by `?` and `IN` lists collapsed, the same for every run."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'(?<![\w"])-?\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'\(\?(?:, \?)+\)', '(...)', sql)
+
+
+def walk(plan, depth=0):
+    yield plan, depth
+    for child in plan.get('Plans', ()):
+        yield from walk(child, depth + 1)
+
+
+def describe(node):
+    """One line of a plan node: its type, relation and index."""
+    text = node['Node Type']
+    if node.get('Relation Name'):
+        text += f" on {node['Relation Name']}"
+    if node.get('Index Name'):
+        text += f" using {node['Index Name']}"
+    return text
+
+
+def find_problems(plan, through_tables=(), seq_scan_rows=SEQ_SCAN_ROWS, nested_loops=NESTED_LOOPS):
+    """
+    The problems of an `EXPLAIN (ANALYZE, FORMAT JSON)` plan: sequential
+    scans reading at least `seq_scan_rows` rows (told apart on M2M through
+    tables, whose joins should use their indexes), nested loops running their
+    inner side at least `nested_loops` times, and nodes returning
+    `MISESTIMATE` times more rows than estimated (the cause of most bad
+    joins, overestimates are the rule below a `LIMIT`).
+    """
+    problems = []
+    for node, _ in walk(plan):
+        loops = node.get('Actual Loops', 1)
+        rows = node.get('Actual Rows', 0) * loops
+        if node['Node Type'] == 'Seq Scan':
+            read = rows + node.get('Rows Removed by Filter', 0) * loops
+            if read >= seq_scan_rows:
+                through = node['Relation Name'] in through_tables
+                problems.append({'problem': 'through_table_seq_scan' if through else 'seq_scan',
+                                 'node': describe(node), 'rows': read, 'filter': node.get('Filter')})
+        elif node['Node Type'] == 'Nested Loop':
+            inner = node['Plans'][1]
+            if inner.get('Actual Loops', 0) >= nested_loops:
+                problems.append({'problem': 'nested_loop', 'node': describe(inner), 'loops': inner['Actual Loops']})
+        estimated = node.get('Plan Rows', 0) * loops
+        if rows >= seq_scan_rows and rows >= MISESTIMATE * max(estimated, 1):
+            problems.append({'problem': 'misestimate', 'node': describe(node), 'estimated': estimated, 'rows': rows})
+    return problems
+
+
+def get_through_indexes():
+    """`{table: {column: [index names]}}` of the M2M through tables, the indexes starting with each foreign key."""
+    tables = {}
+    with connection.cursor() as cursor:
+        for model in apps.get_models(include_auto_created=True):
+            if not model._meta.auto_created:
+                continue
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+            tables[model._meta.db_table] = {
+                field.column: sorted(name for name, constraint in constraints.items()
+                                     if (constraint['index'] or constraint['unique'])
+                                     and constraint['columns'][:1] == [field.column])
+                for field in model._meta.local_fields if field.is_relation
+            }
+    return dict(sorted(tables.items()))
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN (ANALYZE, BUFFERS) the SQL of the API endpoints and report sequential scans, " \
+           "nested loop blowups and unindexed M2M through tables as JSON (in a rolled back transaction)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", dest="urls",
+                            help="URL to analyze instead of the built-in cases (with placeholders like {tag})")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+        parser.add_argument("--metrics", action="store_true",
+                            help="Include timings and buffers, which differ between runs")
+        parser.add_argument("--services", type=int, default=0,
+                            help="Analyze generated services (with tags and categories) instead of the data")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--seq-scan-rows", type=int, default=SEQ_SCAN_ROWS)
+        parser.add_argument("--nested-loops", type=int, default=NESTED_LOOPS)
+        parser.add_argument("--strict", action="store_true", help="Fail when any problem is found")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("EXPLAIN (ANALYZE, BUFFERS) is PostgreSQL only")
+
+        self.options = options
+        # Documents built by the requests are rolled back with the generated data.
+        with rolled_back():
+            if options["services"]:
+                self.generate(options["services"], random.Random(options["seed"]))
+            report = self.analyze(options["urls"] or CASES)
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        problems = sum(len(query['problems']) for endpoint in report['endpoints'].values()
+                       for query in endpoint['queries'])
+        missing = [f'{table}.{column}' for table, columns in report['through_indexes'].items()
+                   for column, indexes in columns.items() if not indexes]
+        summary = f"{len(report['endpoints'])} endpoints, {problems} problems, " \
+                  f"{len(missing)} unindexed through table columns{': ' if missing else ''}{', '.join(missing)}"
+        if options["strict"] and (problems or missing):
+            raise CommandError(summary)
+        self.stderr.write(self.style.SUCCESS(f'Successfully analyzed queries: {summary}'))
+
+    def generate(self, count, rng):
+        tags = ServiceTag.objects.bulk_create(ServiceTag(name=f'tag {i}') for i in range(max(count // 300, 10)))
+        categories = ServiceCategory.objects.bulk_create(
+            ServiceCategory(name=f'category {i}') for i in range(max(count // 1500, 5))
+        )
+        countries = Country.objects.bulk_create(Country(name=f'country {i}') for i in range(20))
+        services = Service.objects.bulk_create(
+            (Service(name=f'service {i}', description='', bio='', link='https://example.com') for i in range(count)),
+            batch_size=5000,
+        )
+        through_tags, through_categories = Service.tags.through, Service.categories.through
+        through_countries = Service.countries.through
+        through_tags.objects.bulk_create(
+            (through_tags(service_id=service.pk, servicetag_id=tag.pk)
+             for service in services for tag in rng.sample(tags, 5)),
+            batch_size=10000,
+        )
+        through_categories.objects.bulk_create(
+            (through_categories(service_id=service.pk, servicecategory_id=category.pk)
+             for service in services for category in rng.sample(categories, 2)),
+            batch_size=10000,
+        )
+        through_countries.objects.bulk_create(
+            (through_countries(service_id=service.pk, country_id=rng.choice(countries).pk) for service in services),
+            batch_size=10000,
+        )
+
+        service_ids = [service.pk for service in services]
+        for start in range(0, len(service_ids), 10000):
+            sync_id_arrays(service_ids[start:start + 10000], ['tags', 'categories', 'countries'])
+        sync_service_counts(['tags', 'categories', 'countries'])
+        sync_category_tags()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def get_urls(self, templates):
+        values = {}
+        for template in templates:
+            for _, name, _, _ in Formatter().parse(template):
+                if name and name not in values:
+                    if name not in PLACEHOLDERS:
+                        raise CommandError(f"Unknown placeholder {{{name}}} in {template}")
+                    found = list(PLACEHOLDERS[name]())
+                    values[name] = found[0] if found else MISSING.get(name, 0)
+        return {template: template.format(**values) for template in templates}
+
+    def analyze(self, templates):
+        through_indexes = get_through_indexes()
+        through_tables = set(through_indexes)
+        endpoints = {}
+        handler = get_handler()
+        # Nothing is cached, any allowed host does.
+        host, secure = get_host() or 'localhost', settings.API_CACHE_WARMUP_SECURE
+        # Pages straight from the views: nothing is served from (or stored in) the cache.
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(CACHES={'default': dummy, 'shared': dummy}):
+            for template, url in self.get_urls(templates).items():
+                # The first request builds what is built once (documents), the second one is measured.
+                fetch(handler, url, 'identity', host, secure)
+                with CaptureQueriesContext(connection) as captured:
+                    status, _, _ = fetch(handler, url, 'identity', host, secure)
+                endpoints[template] = {
+                    'url': url,
+                    'status': status,
+                    'queries': [self.explain(query['sql'], through_tables) for query in captured.captured_queries
+                                if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))],
+                }
+        return {'endpoints': endpoints, 'through_indexes': through_indexes}
+
+    def explain(self, sql, through_tables):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+            result = cursor.fetchone()[0]
+        result = json.loads(result) if isinstance(result, str) else result
+        plan = result[0]['Plan']
+        query = {
+            'sql': fingerprint(sql),
+            'plan': ['  ' * depth + describe(node) for node, depth in walk(plan)],
+            'problems': find_problems(plan, through_tables, self.options["seq_scan_rows"],
+                                      self.options["nested_loops"]),
+        }
+        if self.options["metrics"]:
+            query['metrics'] = {
+                'planning_ms': result[0].get('Planning Time'),
+                'execution_ms': result[0].get('Execution Time'),
+                'shared_hit_blocks': plan.get('Shared Hit Blocks'),
+                'shared_read_blocks': plan.get('Shared Read Blocks'),
+            }
+        return query
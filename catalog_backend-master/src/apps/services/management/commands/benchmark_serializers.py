@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fastpath import CompiledSerializer
+from api.prefetch import plan_queryset
+from api.renderers import JSONRenderer
+from api.v1.catalog.serializers import BriefCatalogServiceSerializer, CatalogServiceSerializer
+from apps.services.management.commands._private import rolled_back
+from apps.services.models import Service, ServiceTag, ServiceCategory, Country, ServiceScreenshot, ServiceRating, \
+    RatingEntity
+
+
+class Command(BaseCommand):
+    help = "Compare DRF and compiled serializers on generated services (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["services"] < 1 or options["repeat"] < 1:
+            raise CommandError("--services and --repeat must be at least 1")
+
+        with rolled_back():
+            self.generate(options["services"])
+            for serializer_class in (BriefCatalogServiceSerializer, CatalogServiceSerializer):
+                self.run(serializer_class, options["repeat"])
+
+        self.stdout.write(self.style.SUCCESS('Successfully benchmarked serializers'))
+
+    def run(self, serializer_class, repeat):
+        services = list(plan_queryset(Service.objects.order_by('pk'), serializer_class))
+        drf = self.measure(lambda: serializer_class(services, many=True, context={'request': None}).data, repeat)
+        compiled = self.measure(
+            lambda: CompiledSerializer(serializer_class(services, many=True, context={'request': None})).data,
+            repeat,
+        )
+        per_thousand = 1000 / len(services)
+        self.stdout.write(f'{serializer_class.__name__}: DRF {drf * per_thousand:.1f} ms, '
+                          f'compiled {compiled * per_thousand:.1f} ms per 1,000 services '
+                          f'({drf / compiled:.1f}x)')
+
+    @staticmethod
+    def generate(count):
+        tags = ServiceTag.objects.bulk_create(ServiceTag(name=f'tag {i}') for i in range(20))
+        categories = ServiceCategory.objects.bulk_create(ServiceCategory(name=f'category {i}') for i in range(10))
+        countries = Country.objects.bulk_create(Country(name=f'country {i}') for i in range(10))
+        services = Service.objects.bulk_create(
+            Service(name=f'service {i}', description='description', bio='bio', link='https://example.com',
+                    logo='images/logo.png')
+            for i in range(count)
+        )
+        for i, service in enumerate(services):
+            service.tags.add(*tags[i % 15:i % 15 + 4])
+            service.categories.add(categories[i % 10])
+            service.countries.add(countries[i % 10])
+        ServiceScreenshot.objects.bulk_create(
+            ServiceScreenshot(service=service, image='screenshots/one.png') for service in services
+        )
+        ServiceRating.objects.bulk_create(
+            ServiceRating(service=service, entity=RatingEntity.TRUSTPILOT, score=4.5) for service in services
+        )
+
+    @staticmethod
+    def measure(serialize, repeat):
+        """Best milliseconds to serialize and render the list."""
+        renderer = JSONRenderer()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer.render(serialize())
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.services.denormalize import ID_ARRAYS, sync_id_arrays
+from apps.services.management.commands._private import rolled_back
+from apps.services.models import Service, ServiceTag, ServiceCategory
+
+
+class Command(BaseCommand):
+    help = "Compare M2M join filters with id array containment on generated services (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=100_000)
+        parser.add_argument("--tags", type=int, default=300)
+        parser.add_argument("--categories", type=int, default=60)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("id arrays are PostgreSQL only")
+
+        self.random = random.Random(options["seed"])
+        with rolled_back():
+            tags, categories = self.generate(options)
+            self.run(tags, categories, options["repeat"])
+
+        self.stdout.write(self.style.SUCCESS('Successfully benchmarked service filters'))
+
+    def generate(self, options):
+        tags = ServiceTag.objects.bulk_create(ServiceTag(name=f'tag {i}') for i in range(options["tags"]))
+        categories = ServiceCategory.objects.bulk_create(
+            ServiceCategory(name=f'category {i}') for i in range(options["categories"])
+        )
+        services = Service.objects.bulk_create(
+            (Service(name=f'service {i}', description='', bio='', link='https://example.com')
+             for i in range(options["services"])),
+            batch_size=5000,
+        )
+
+        through_tags, through_categories = Service.tags.through, Service.categories.through
+        through_tags.objects.bulk_create(
+            (through_tags(service_id=service.pk, servicetag_id=tag.pk)
+             for service in services for tag in self.random.sample(tags, 5)),
+            batch_size=10000,
+        )
+        through_categories.objects.bulk_create(
+            (through_categories(service_id=service.pk, servicecategory_id=category.pk)
+             for service in services for category in self.random.sample(categories, 2)),
+            batch_size=10000,
+        )
+
+        service_ids = [service.pk for service in services]
+        for start in range(0, len(service_ids), 10000):
+            sync_id_arrays(service_ids[start:start + 10000], ['tags', 'categories'])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE services_service, services_service_tags, services_service_categories')
+
+        self.stdout.write(f'Generated {len(services)} services')
+        return tags, categories
+
+    def run(self, tags, categories, repeat):
+        tag_ids = [tag.pk for tag in self.random.sample(tags, 2)]
+        category_ids = [category.pk for category in self.random.sample(categories, 3)]
+
+        joined_all = Service.objects.all()
+        for tag_id in tag_ids:
+            joined_all = joined_all.filter(tags=tag_id)
+        cases = {
+            'all tags': (joined_all, Service.objects.filter(**{f"{ID_ARRAYS['tags']}__contains": tag_ids})),
+            'any category': (
+                Service.objects.filter(categories__in=category_ids).distinct(),
+                Service.objects.filter(**{f"{ID_ARRAYS['categories']}__overlap": category_ids}),
+            ),
+        }
+
+        for name, (joined, contained) in cases.items():
+            join_ms, array_ms = self.measure(joined, repeat), self.measure(contained, repeat)
+            self.stdout.write(f'{name}: joins {join_ms:.1f} ms, id arrays {array_ms:.1f} ms '
+                              f'({join_ms / array_ms:.1f}x)')
+
+    @staticmethod
+    def measure(queryset, repeat):
+        """Median milliseconds to count and fetch the first page, as the list endpoint does."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset.count()
+            list(queryset.order_by('pk').values_list('pk', flat=True)[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.v1.catalog.suggest import SuggestIndex
+from apps.services.management.commands._private import rolled_back
+from apps.services.models import Service
+
+
+class Command(BaseCommand):
+    help = "Measure typeahead latency of the suggest index on generated services (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=3000)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--max-p99", type=float, help="Fail when the p99 latency exceeds this many milliseconds")
+
+    def handle(self, *args, **options):
+        if options["services"] < 1 or options["repeat"] < 1:
+            raise CommandError("--services and --repeat must be at least 1")
+
+        with rolled_back():
+            self.generate(options["services"])
+            timings = self.measure(options["repeat"])
+
+        p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+        self.stdout.write(f'{len(timings)} queries: p50 {p50:.2f} ms, p99 {p99:.2f} ms')
+        if options["max_p99"] is not None and p99 > options["max_p99"]:
+            raise CommandError(f"p99 latency {p99:.2f} ms exceeds {options['max_p99']} ms")
+
+        self.stdout.write(self.style.SUCCESS('Successfully benchmarked suggestions'))
+
+    @staticmethod
+    def generate(count):
+        words = ['alpha', 'beta', 'gamma']
+        Service.objects.bulk_create(
+            (Service(name=f'Service {words[i % 3]} {i}', description='', bio='', link='https://example.com')
+             for i in range(count)),
+            batch_size=5000,
+        )
+
+    @staticmethod
+    def measure(repeat):
+        """Sorted milliseconds of prefix, multi-word, misspelled and unmatched queries."""
+        index = SuggestIndex()
+        index.suggest('warm up')
+        timings = []
+        for query in ['al', 'alpha', 'beta 1', 'serv', 'gama', 'zzz'] * repeat:
+            start = time.perf_counter()
+            index.suggest(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_sequence
+
+from api.v1.catalog.export import export_lines, export_queryset, parse_updated_since
+from apps.services.models import Service
+
+
+class Command(BaseCommand):
+    help = "Export the catalog services as NDJSON, one detail document per line"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", help="Write to this file instead of stdout")
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output")
+        parser.add_argument("--updated-since", help="Only services changed at or after this ISO date/datetime")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            updated_since = parse_updated_since(options["updated_since"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        queryset = export_queryset(Service.objects.all(), updated_since)
+        exported = 0
+
+        def counted(chunks):
+            nonlocal exported
+            for chunk in chunks:
+                exported += chunk.count(b"\n")
+                yield chunk
+
+        content = counted(export_lines(queryset, chunk_size=options["chunk_size"]))
+        if options["gzip"]:
+            content = compress_sequence(content)
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        started = time.perf_counter()
+        try:
+            for chunk in content:
+                output.write(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+            else:
+                output.flush()
+        elapsed = time.perf_counter() - started
+
+        # The data may go to stdout, so report on stderr.
+        self.stderr.write(
+            f'Successfully exported {exported} services in {elapsed:.2f}s ({exported / max(elapsed, 1e-9):.0f}/s)',
+            style_func=self.style.SUCCESS,
+        )
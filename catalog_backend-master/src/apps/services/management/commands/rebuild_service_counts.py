@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.services.denormalize import SERVICE_COUNTS, sync_service_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the service_count columns of tags, categories, countries and features"
+
+    def add_arguments(self, parser):
+        parser.add_argument("relations", nargs="*", help=f"Only recount these of {', '.join(SERVICE_COUNTS)}")
+
+    def handle(self, *args, **options):
+        relations = options["relations"] or SERVICE_COUNTS
+        unknown = set(relations) - set(SERVICE_COUNTS)
+        if unknown:
+            raise CommandError(f'Unknown relations: {", ".join(sorted(unknown))}')
+        with transaction.atomic():
+            sync_service_counts(relations)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully recounted the services of {", ".join(relations)}')
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.v1.catalog.documents import build_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-rendered JSON documents served by the catalog services API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("service_ids", nargs="*", type=int, help="Only rebuild these services")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        built = build_documents(options["service_ids"] or None, batch_size=options["batch_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {len(built)} service documents')
+        )
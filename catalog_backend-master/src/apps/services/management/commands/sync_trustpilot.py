@@ -1,6 +1,7 @@
 import httpx
 from bs4 import BeautifulSoup
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 from apps.services.models import Service, ServiceRating, RatingEntity
 
@@ -28,29 +29,35 @@ class Command(BaseCommand):
             if resp.status_code == 404:
                 continue
 
-            rating, _ = ServiceRating.objects.get_or_create(service=s, entity=RatingEntity.TRUSTPILOT)
+            # One transaction per service: the API never sees the reviews half replaced, and the
+            # cached reviews and services pages are invalidated once, on commit.
+            with transaction.atomic():
+                rating, _ = ServiceRating.objects.get_or_create(service=s, entity=RatingEntity.TRUSTPILOT)
 
-            soup = BeautifulSoup(resp.text, 'html.parser')
+                soup = BeautifulSoup(resp.text, 'html.parser')
 
-            score = float(soup.find("p", {"data-rating-typography": True}).text)
-            rating.score = score
+                score = float(soup.find("p", {"data-rating-typography": True}).text)
+                rating.score = score
+                self.stdout.write(f'{s.name}: {score}')
 
-            print(rating)
+                rating.reviews.all().delete()
+                for review in soup.find_all('article'):
+                    try:
+                        username = review.find("a", {"name": "consumer-profile"}).span.text
+                        title = review.find("h2", {"data-service-review-title-typography": True}).text
+                        text = review.find("p", {"data-service-review-text-typography": True}).text
+                        review_score = float(review.section.find("img")['src'].replace(
+                            'https://cdn.trustpilot.net/brand-assets/4.1.0/stars/stars-', '').replace('.svg', ''))
+                        # A savepoint, so that a review failing to save is skipped without the others.
+                        with transaction.atomic():
+                            rating.reviews.create(service_rating=s, title=title, username=username, text=text,
+                                                  score=review_score)
+                    except Exception:
+                        # Markup of something else than a review, or a review that does not fit.
+                        continue
 
-            rating.reviews.all().delete()
-            for review in soup.find_all('article'):
-                try:
-                    username = review.find("a", {"name": "consumer-profile"}).span.text
-                    title = review.find("h2", {"data-service-review-title-typography": True}).text
-                    text = review.find("p", {"data-service-review-text-typography": True}).text
-                    review_score = float(review.section.find("img")['src'].replace(
-                        'https://cdn.trustpilot.net/brand-assets/4.1.0/stars/stars-', '').replace('.svg', ''))
-                    rating.reviews.create(service_rating=s, title=title, username=username, text=text,
-                                          score=review_score)
-                except Exception as e:
-                    ...
-
-            rating.save()
+                # The review aggregates are recomputed once, on commit.
+                rating.save(update_fields=['score'])
         services_count = services.count()
 
         self.stdout.write(
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.warmup import WORKERS, get_host, get_urls, warm
+
+
+class Command(BaseCommand):
+    help = "Fill the API page cache with the pages requested by the frontend (settings.API_CACHE_WARMUP_URLS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resource", action="append", dest="resources",
+                            help="Warm the configured URLs of this resource only (repeatable)")
+        parser.add_argument("--url", action="append", dest="templates",
+                            help="Warm this URL instead of the configured ones, with placeholders (repeatable)")
+        parser.add_argument("--limit", type=int, help="Values per placeholder, e.g. the first N tags")
+        parser.add_argument("--encoding", action="append", dest="encodings",
+                            help="Accept-Encoding to warm the pages for (repeatable)")
+        parser.add_argument("--host", help="Host the pages are requested for")
+        parser.add_argument("--insecure", action="store_true", help="Request the pages over http")
+        parser.add_argument("--workers", type=int, default=WORKERS)
+
+    def handle(self, *args, **options):
+        unknown = set(options["resources"] or ()) - set(settings.API_CACHE_WARMUP_URLS)
+        if unknown:
+            raise CommandError(f'Unknown resources: {", ".join(sorted(unknown))}')
+
+        urls = get_urls(options["resources"], options["templates"], options["limit"])
+        host = options["host"] or get_host()
+        if host is None:
+            raise CommandError("Pages are cached per host: pass --host, or set API_CACHE_WARMUP_HOST "
+                               "(or concrete ALLOWED_HOSTS)")
+        secure = False if options["insecure"] else None
+        start = time.perf_counter()
+        failed = 0
+        results = warm(urls, options["encodings"], host, secure, options["workers"])
+        for url, encoding, status, milliseconds, size in results:
+            failed += status != 200
+            line = f'{status} {milliseconds:8.1f} ms {size / 1024:8.1f} KB  {encoding:<18} {url}'
+            self.stdout.write(line if status == 200 else self.style.ERROR(line))
+
+        elapsed = time.perf_counter() - start
+        summary = f'Warmed {len(urls)} URLs for {host} in {elapsed:.1f} s'
+        if failed:
+            raise CommandError(f'{summary}, {failed} requests failed')
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0029_categorygroup_servicecategory_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceDocument',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='services.service')),
+                ('brief', models.TextField()),
+                ('detail', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:39
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    Service.objects.using(schema_editor.connection.alias).update(search_vector=(
+        SearchVector('name', weight='A', config='english')
+        + SearchVector('bio', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0030_servicedocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='services_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
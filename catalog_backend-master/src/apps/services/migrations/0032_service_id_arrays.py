@@ -0,0 +1,71 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:45
+
+from collections import defaultdict
+
+import apps.services.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def fill_id_arrays(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Service = apps.get_model('services', 'Service')
+    for relation, column in (('tags', 'tag_ids'), ('categories', 'category_ids'), ('countries', 'country_ids'),
+                             ('certificates', 'certificate_ids')):
+        field = Service._meta.get_field(relation)
+        target = field.m2m_reverse_name()
+        ids = defaultdict(list)
+        rows = field.remote_field.through.objects.using(db_alias).order_by(target).values_list('service_id', target)
+        for service_id, target_id in rows:
+            ids[service_id].append(target_id)
+        # Services without rows keep the empty default.
+        Service.objects.using(db_alias).bulk_update(
+            [Service(pk=pk, **{column: target_ids}) for pk, target_ids in ids.items()], [column], batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0031_service_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='category_ids',
+            field=apps.services.fields.IdArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='certificate_ids',
+            field=apps.services.fields.IdArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='country_ids',
+            field=apps.services.fields.IdArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='tag_ids',
+            field=apps.services.fields.IdArrayField(base_field=models.BigIntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='services_tag_ids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['category_ids'], name='services_category_ids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['country_ids'], name='services_country_ids_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['certificate_ids'], name='services_certificate_ids_idx'),
+        ),
+        migrations.RunPython(fill_id_arrays, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0032_service_id_arrays'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-created_at', '-id'], name='services_created_at_id_idx'),
+        ),
+    ]
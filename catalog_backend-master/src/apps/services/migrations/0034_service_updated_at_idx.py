@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0033_service_created_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-updated_at', '-id'], name='services_updated_at_id_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_service_counts(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    for relation in ('tags', 'categories', 'countries', 'features'):
+        field = Service._meta.get_field(relation)
+        target = field.m2m_reverse_field_name()
+        counts = field.remote_field.through.objects \
+            .filter(**{target: OuterRef('pk')}) \
+            .order_by() \
+            .values(target) \
+            .annotate(count=Count('pk')) \
+            .values('count')
+        field.related_model.objects.using(schema_editor.connection.alias) \
+            .update(service_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0034_service_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='country',
+            name='service_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicecategory',
+            name='service_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicefeature',
+            name='service_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicetag',
+            name='service_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_service_counts, migrations.RunPython.noop),
+    ]
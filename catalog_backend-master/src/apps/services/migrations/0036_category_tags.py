@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:36
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_category_tags(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Service = apps.get_model('services', 'Service')
+    CategoryTag = apps.get_model('services', 'CategoryTag')
+    rows = Service.categories.through.objects.using(db_alias) \
+        .filter(service__tags__isnull=False) \
+        .order_by() \
+        .values_list('servicecategory_id', 'service__tags') \
+        .annotate(count=Count('service_id'))
+    CategoryTag.objects.using(db_alias).bulk_create(
+        [CategoryTag(category_id=category_id, tag_id=tag_id, service_count=count)
+         for category_id, tag_id, count in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0035_service_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_tags', to='services.servicecategory')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_tags', to='services.servicetag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', '-service_count', 'tag'], name='category_tags_relevance_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='categorytag',
+            constraint=models.UniqueConstraint(fields=('category', 'tag'), name='category_tags_category_tag_uniq'),
+        ),
+        migrations.RunPython(fill_category_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:39
+
+import apps.services.models
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q
+import django.db.models.deletion
+
+
+def fill_review_aggregates(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    ServiceRating = apps.get_model('services', 'ServiceRating')
+    ServiceRatingReview = apps.get_model('services', 'ServiceRatingReview')
+    # Stars 0 to 5, each counting the scores within half a star.
+    buckets = {f'star_{star}': Count('pk', filter=Q(score__gte=star - 0.5, score__lt=star + 0.5) if star < 5
+                                     else Q(score__gte=star - 0.5))
+               for star in range(6)}
+    rows = ServiceRatingReview.objects.using(db_alias) \
+        .order_by() \
+        .values('service_rating_id') \
+        .annotate(count=Count('pk'), mean=Avg('score'), **buckets)
+
+    # Ratings without reviews keep the defaults.
+    ServiceRating.objects.using(db_alias).bulk_update(
+        [ServiceRating(pk=row['service_rating_id'], review_count=row['count'], review_mean=row['mean'],
+                       review_histogram=[row[f'star_{star}'] for star in range(6)])
+         for row in rows],
+        ['review_count', 'review_mean', 'review_histogram'], batch_size=1000,
+    )
+    # The service documents show the aggregates, they are built again on read.
+    apps.get_model('services', 'ServiceDocument').objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0036_category_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerating',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicerating',
+            name='review_histogram',
+            field=models.JSONField(default=apps.services.models.empty_histogram, editable=False),
+        ),
+        migrations.AddField(
+            model_name='servicerating',
+            name='review_mean',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='serviceratingreview',
+            index=models.Index(fields=['service_rating', '-id'], name='reviews_service_rating_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='serviceratingreview',
+            name='service_rating',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='services.servicerating'),
+        ),
+        migrations.RunPython(fill_review_aggregates, migrations.RunPython.noop),
+    ]
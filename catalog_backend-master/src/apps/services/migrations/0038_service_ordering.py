@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:42
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_scores(apps, schema_editor):
+    Service = apps.get_model('services', 'Service')
+    ServiceRating = apps.get_model('services', 'ServiceRating')
+    ratings = ServiceRating.objects \
+        .filter(service=OuterRef('pk'), entity='trustpilot') \
+        .order_by('-pk') \
+        .values('score')[:1]
+    Service.objects.using(schema_editor.connection.alias).update(score=Coalesce(Subquery(ratings), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0037_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['name', 'id'], name='services_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-score', '-id'], name='services_score_id_idx'),
+        ),
+    ]
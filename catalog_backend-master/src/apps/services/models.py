@@ -1,14 +1,37 @@
 from datetime import datetime
 from enum import Enum
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from apps.services.fields import IdArrayField
+
+
+class DenormalizedFieldsMixin(object):
+    """
+    Leave `denormalized_fields` out of full saves of existing rows: they are
+    written by the sync helpers of `apps.services.denormalize` only, and a
+    stale instance would put back the values it was loaded with.
+    """
+    denormalized_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in self.denormalized_fields
+                             and field.attname not in deferred]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class ServiceFeature(models.Model):
     icon = models.CharField(max_length=200)
     title = models.CharField(max_length=20)
     description = models.CharField(max_length=50)
+    # Denormalized number of services, see `apps.services.denormalize.sync_service_counts`.
+    service_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def services(self):
@@ -21,6 +44,8 @@ class ServiceFeature(models.Model):
 class ServiceTag(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    # Denormalized number of services, see `apps.services.denormalize.sync_service_counts`.
+    service_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def services(self):
@@ -43,6 +68,8 @@ class ServiceCategory(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     image = models.ImageField(upload_to='categories/', null=True, default=None, blank=True)
+    # Denormalized number of services, see `apps.services.denormalize.sync_service_counts`.
+    service_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def services(self):
@@ -54,6 +81,8 @@ class ServiceCategory(models.Model):
 
 class Country(models.Model):
     name = models.CharField(max_length=100)
+    # Denormalized number of services, see `apps.services.denormalize.sync_service_counts`.
+    service_count = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def services(self):
@@ -100,20 +129,40 @@ class RatingEntity(models.TextChoices):
 
 
 class ServiceRatingReview(models.Model):
-    service_rating = models.ForeignKey("ServiceRating", on_delete=models.CASCADE, related_name="reviews")
+    # Indexed with the id below, the order of the review listing.
+    service_rating = models.ForeignKey("ServiceRating", on_delete=models.CASCADE, related_name="reviews",
+                                       db_index=False)
     title = models.CharField(max_length=200)
     username = models.CharField(max_length=200)
     text = models.TextField()
     score = models.FloatField(default=0, validators=[MaxValueValidator(5), MinValueValidator(0)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['service_rating', '-id'], name='reviews_service_rating_id_idx'),
+        ]
+
 
-class ServiceRating(models.Model):
+def empty_histogram():
+    return [0] * 6
+
+
+class ServiceRating(DenormalizedFieldsMixin, models.Model):
     service = models.ForeignKey("Service", on_delete=models.CASCADE, related_name="ratings")
     entity = models.CharField(max_length=50, choices=RatingEntity.choices)
     score = models.FloatField(default=0, validators=[MaxValueValidator(5), MinValueValidator(0)])
 
+    # Aggregates of the reviews, kept in sync by apps.services.signals (see
+    # apps.services.denormalize.sync_review_aggregates). `review_histogram`
+    # counts the reviews by score rounded to 0-5 stars.
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    review_mean = models.FloatField(null=True, editable=False)
+    review_histogram = models.JSONField(default=empty_histogram, editable=False)
+
+    denormalized_fields = ('review_count', 'review_mean', 'review_histogram')
 
-class Service(models.Model):
+
+class Service(DenormalizedFieldsMixin, models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     bio = models.TextField()
@@ -131,6 +180,36 @@ class Service(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Trustpilot score of the ratings (0 without one), kept in sync by apps.services.signals for `?ordering=score`.
+    score = models.FloatField(default=0, editable=False)
+
+    # Weighted full-text document of name, bio and description, see apps.services.search.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Denormalized ids of the M2M relations, kept in sync by apps.services.signals
+    # so filters become single containment predicates instead of joins.
+    tag_ids = IdArrayField()
+    category_ids = IdArrayField()
+    country_ids = IdArrayField()
+    certificate_ids = IdArrayField()
+
+    denormalized_fields = ('score', 'tag_ids', 'category_ids', 'country_ids', 'certificate_ids')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='services_search_vector_idx'),
+            GinIndex(fields=['tag_ids'], name='services_tag_ids_idx'),
+            GinIndex(fields=['category_ids'], name='services_category_ids_idx'),
+            GinIndex(fields=['country_ids'], name='services_country_ids_idx'),
+            GinIndex(fields=['certificate_ids'], name='services_certificate_ids_idx'),
+            # `?ordering=` of the list (either direction) and its keyset pages.
+            models.Index(fields=['-created_at', '-id'], name='services_created_at_id_idx'),
+            # Also the latest `updated_at` of conditional GETs, see api.conditional.
+            models.Index(fields=['-updated_at', '-id'], name='services_updated_at_id_idx'),
+            models.Index(fields=['name', 'id'], name='services_name_id_idx'),
+            models.Index(fields=['-score', '-id'], name='services_score_id_idx'),
+        ]
+
     def do(self):
         if self.prime_tag is not None:
             cat, _ = ServiceCategory.objects.get_or_create(name=self.prime_tag.name, description=self.prime_tag.description)
@@ -143,8 +222,41 @@ class Service(models.Model):
         return self.name
 
 
+class CategoryTag(models.Model):
+    """
+    Tags of the services of a category, with the number of services having
+    both, kept in sync by apps.services.signals (see
+    apps.services.denormalize.sync_category_tags).
+    """
+    category = models.ForeignKey(ServiceCategory, on_delete=models.CASCADE, related_name='category_tags')
+    tag = models.ForeignKey(ServiceTag, on_delete=models.CASCADE, related_name='category_tags')
+    service_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'tag'], name='category_tags_category_tag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['category', '-service_count', 'tag'], name='category_tags_relevance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id}-{self.tag_id}: {self.service_count}"
+
+
 class EmailSubscription(models.Model):
     mail = models.EmailField()
 
     def __str__(self):
         return self.mail
+
+
+class ServiceDocument(models.Model):
+    """Pre-rendered JSON representations of a service served by the catalog API."""
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    brief = models.TextField()
+    detail = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Document of service #{self.service_id}"
@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+
+SEARCH_CONFIG = 'english'
+
+# Weighted document searched by the catalog: name (A), bio (B), description (C).
+SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('bio', weight='B', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+)
+SEARCH_FIELDS = ('name', 'bio', 'description')
+
+
+def update_search_vector(queryset):
+    """Recompute `search_vector` of the services in `queryset`."""
+    queryset.update(search_vector=SEARCH_VECTOR)
+
+
+def search_services(queryset, value):
+    """
+    Restrict `queryset` to services matching the full-text query `value` and
+    order them by relevance (annotated as `rank`).
+    """
+    query = SearchQuery(value, search_type='websearch', config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query) \
+        .annotate(rank=SearchRank(F('search_vector'), query)) \
+        .order_by('-rank', 'pk')
@@ -0,0 +1,288 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.services.denormalize import ID_ARRAYS, SERVICE_COUNTS, get_category_ids, get_related_ids, \
+    sync_category_tags, sync_id_arrays, sync_review_aggregates, sync_service_counts, sync_service_scores
+from apps.services.models import Service, ServiceTag, ServiceCategory, Country, ServiceFeature, Certificate, \
+    CertificateOrganisation, ServiceScreenshot, ServiceRating, ServiceMention, ServiceRatingReview
+from apps.services.search import SEARCH_FIELDS, update_search_vector
+from apps.services.versions import bump_versions, versions_changed
+
+# Models embedded in the service documents, with the lookup from `Service` to them.
+DOCUMENT_RELATIONS = {
+    ServiceTag: 'tags',
+    ServiceCategory: 'categories',
+    Country: 'countries',
+    ServiceFeature: 'features',
+    Certificate: 'certificates',
+    CertificateOrganisation: 'certificates__organisation_entity',
+}
+
+M2M_FIELDS = ('tags', 'categories', 'countries', 'features', 'certificates')
+M2M_THROUGH = {getattr(Service, field_name).through: field_name for field_name in M2M_FIELDS}
+
+
+def rebuild_documents(service_ids):
+    # The documents are rendered by the catalog API serializers.
+    from api.v1.catalog.documents import build_documents
+
+    if service_ids:
+        build_documents(service_ids)
+
+
+class PendingChanges(object):
+    """
+    The `on_commit` callback of a transaction, recomputing the review
+    aggregates of the ratings and rebuilding the documents of the services
+    changed in it at once, see `schedule_changes`.
+    """
+
+    def __init__(self):
+        self.service_ids = set()
+        self.rating_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        if self.rating_ids:
+            sync_review_aggregates(self.rating_ids)
+            # The aggregates are part of the service documents and cached pages.
+            self.service_ids.update(ServiceRating.objects.filter(pk__in=self.rating_ids)
+                                    .values_list('service_id', flat=True))
+            bump_versions([ServiceRating])
+        rebuild_documents(self.service_ids)
+
+
+def schedule_changes(service_ids=(), rating_ids=()):
+    """
+    Add to the `PendingChanges` of the current transaction, registering it
+    as an `on_commit` callback on first use.
+    """
+    connection = transaction.get_connection()
+    changes = getattr(connection, 'pending_changes', None)
+    # Django drops the callbacks of rolled back transactions and savepoints.
+    registered = changes is not None and not changes.done and \
+        any(entry[1] is changes for entry in connection.run_on_commit)
+    if not registered:
+        changes = connection.pending_changes = PendingChanges()
+    changes.service_ids.update(service_ids)
+    changes.rating_ids.update(rating_ids)
+    if not registered:
+        # Outside of a transaction this runs right away, so after adding the ids.
+        transaction.on_commit(changes)
+
+
+def schedule_documents(service_ids):
+    """
+    Rebuild the documents of `service_ids` once the current transaction
+    commits. Services changed repeatedly in a transaction are rebuilt once.
+    """
+    service_ids = set(service_ids)
+    if service_ids:
+        schedule_changes(service_ids=service_ids)
+
+
+def update_suggestions(type_, pk):
+    from api.v1.catalog.suggest import index
+
+    transaction.on_commit(partial(index.update, type_, pk))
+
+
+def related_service_ids(instance):
+    lookup = DOCUMENT_RELATIONS[type(instance)]
+    return list(Service.objects.filter(**{lookup: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+        update_search_vector(Service.objects.filter(pk=instance.pk))
+    schedule_documents([instance.pk])
+    update_suggestions('service', instance.pk)
+
+
+def service_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_service_ids = related_service_ids(instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        service_ids = [instance.pk]
+    elif action == 'post_clear':
+        service_ids = instance._cleared_service_ids
+    else:
+        service_ids = pk_set
+
+    relation = M2M_THROUGH[sender]
+    if relation in ID_ARRAYS:
+        synced = sync_id_arrays(service_ids, [relation])
+        if not reverse:
+            # Keep the instance current so a later full `save()` does not write the old array back.
+            setattr(instance, ID_ARRAYS[relation], synced[relation][instance.pk])
+    schedule_documents(service_ids)
+
+
+for through, field_name in M2M_THROUGH.items():
+    m2m_changed.connect(service_relations_changed, sender=through, dispatch_uid=f'service_{field_name}_changed')
+
+
+def service_counts_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    relation = M2M_THROUGH[sender]
+    if not reverse and action == 'pre_clear':
+        instance._cleared_related_ids = get_related_ids([instance.pk], [relation])[relation]
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        ids = {instance.pk}
+    elif action == 'post_clear':
+        ids = instance._cleared_related_ids
+    else:
+        ids = pk_set
+    sync_service_counts([relation], {relation: ids})
+
+
+for field_name in SERVICE_COUNTS:
+    m2m_changed.connect(service_counts_changed, sender=getattr(Service, field_name).through,
+                        dispatch_uid=f'service_{field_name}_counts_changed')
+
+
+def category_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    relation = M2M_THROUGH[sender]
+    if action == 'pre_clear':
+        # The categories whose tags change, before the rows are gone.
+        if relation == 'categories' and not reverse:
+            instance._cleared_category_ids = get_category_ids([instance.pk])
+        elif relation == 'tags' and reverse:
+            instance._cleared_category_ids = get_category_ids(related_service_ids(instance))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if action == 'post_clear' and (relation == 'categories') != reverse:
+        category_ids = instance._cleared_category_ids
+    elif relation == 'categories':
+        category_ids = {instance.pk} if reverse else pk_set
+    else:
+        category_ids = get_category_ids(pk_set if reverse else [instance.pk])
+    sync_category_tags(category_ids)
+
+
+for field_name in ('tags', 'categories'):
+    m2m_changed.connect(category_tags_changed, sender=getattr(Service, field_name).through,
+                        dispatch_uid=f'service_{field_name}_category_tags_changed')
+
+
+@receiver(pre_delete, sender=Service)
+def service_deleting(sender, instance, **kwargs):
+    # The M2M rows go with the cascade, without `m2m_changed`.
+    instance._related_ids = get_related_ids([instance.pk])
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    sync_service_counts(ids=instance._related_ids)
+    sync_category_tags(instance._related_ids['categories'])
+
+
+@receiver(post_save, sender=ServiceScreenshot)
+@receiver(post_save, sender=ServiceRating)
+@receiver(post_save, sender=ServiceMention)
+@receiver(post_delete, sender=ServiceScreenshot)
+@receiver(post_delete, sender=ServiceRating)
+@receiver(post_delete, sender=ServiceMention)
+def service_child_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_documents([instance.service_id])
+
+
+def related_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_documents(related_service_ids(instance))
+
+
+def related_deleting(sender, instance, **kwargs):
+    # Through rows are removed by the cascade without `m2m_changed`, so collect
+    # the affected services before they disappear.
+    instance._service_ids = related_service_ids(instance)
+    schedule_documents(instance._service_ids)
+
+
+def related_deleted(sender, instance, **kwargs):
+    relation = DOCUMENT_RELATIONS[sender]
+    if relation in ID_ARRAYS:
+        sync_id_arrays(instance._service_ids, [relation])
+
+
+for model in DOCUMENT_RELATIONS:
+    post_save.connect(related_saved, sender=model, dispatch_uid=f'{model.__name__}_saved')
+    pre_delete.connect(related_deleting, sender=model, dispatch_uid=f'{model.__name__}_deleting')
+    post_delete.connect(related_deleted, sender=model, dispatch_uid=f'{model.__name__}_deleted')
+
+
+SUGGEST_TYPES = {
+    Service: 'service',
+    ServiceCategory: 'category',
+    ServiceTag: 'tag',
+}
+
+
+@receiver(post_save, sender=ServiceTag)
+@receiver(post_save, sender=ServiceCategory)
+def suggestion_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_suggestions(SUGGEST_TYPES[sender], instance.pk)
+
+
+@receiver(post_delete, sender=Service)
+@receiver(post_delete, sender=ServiceTag)
+@receiver(post_delete, sender=ServiceCategory)
+def suggestion_deleted(sender, instance, **kwargs):
+    update_suggestions(SUGGEST_TYPES[sender], instance.pk)
+
+
+@receiver(post_save, sender=ServiceRating)
+@receiver(post_delete, sender=ServiceRating)
+def rating_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_service_scores([instance.service_id])
+
+
+@receiver(post_save, sender=ServiceRatingReview)
+@receiver(post_delete, sender=ServiceRatingReview)
+def review_changed(sender, instance, raw=False, **kwargs):
+    # Once per transaction, `sync_trustpilot` replaces all the reviews of a rating.
+    if not raw:
+        schedule_changes(rating_ids=[instance.service_rating_id])
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def model_changed(sender, **kwargs):
+    bump_versions([sender])
+
+
+@receiver(m2m_changed)
+def relation_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_versions([sender])
+
+
+@receiver(versions_changed)
+def warm_invalidated_pages(sender, models, **kwargs):
+    if not settings.API_CACHE_WARMUP_ON_INVALIDATE:
+        return
+    from api.caching import RESOURCES
+    from api.warmup import warm_after_invalidation
+
+    warm_after_invalidation(resource for resource, resource_models in RESOURCES.items()
+                            if set(resource_models) & set(models))
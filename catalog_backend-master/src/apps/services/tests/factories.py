@@ -2,7 +2,8 @@ import factory
 from django.contrib.auth.models import User
 from factory.django import DjangoModelFactory
 
-from apps.services.models import Service, ServiceTag, ServiceRatingReview, ServiceRating, RatingEntity, ServiceCategory
+from apps.services.models import Service, ServiceTag, ServiceRatingReview, ServiceRating, RatingEntity, ServiceCategory, \
+    Country, CertificateOrganisation, Certificate, ServiceScreenshot, ServiceMention, ServiceFeature
 
 USER_PASSWORD = "super_secure_password1"
 
@@ -46,6 +47,27 @@ class ServiceFactory(DjangoModelFactory):
         for tag in extracted:
             self.tags.add(tag)
 
+    @factory.post_generation
+    def countries(self, create, extracted, **kwargs):
+        if not create or not extracted:
+            return
+
+        self.countries.add(*extracted)
+
+    @factory.post_generation
+    def certificates(self, create, extracted, **kwargs):
+        if not create or not extracted:
+            return
+
+        self.certificates.add(*extracted)
+
+    @factory.post_generation
+    def features(self, create, extracted, **kwargs):
+        if not create or not extracted:
+            return
+
+        self.features.add(*extracted)
+
 
 class ServiceCategoryFactory(DjangoModelFactory):
     class Meta:
@@ -80,3 +102,52 @@ class ServiceRatingReviewFactory(DjangoModelFactory):
     username = factory.Sequence(lambda n: f"username #{n}")
     text = factory.Sequence(lambda n: f"Text #{n}")
     score = 5
+
+
+class CountryFactory(DjangoModelFactory):
+    class Meta:
+        model = Country
+
+    name = factory.Sequence(lambda n: f"Country #{n}")
+
+
+class CertificateOrganisationFactory(DjangoModelFactory):
+    class Meta:
+        model = CertificateOrganisation
+
+    name = factory.Sequence(lambda n: f"Organisation #{n}")
+
+
+class CertificateFactory(DjangoModelFactory):
+    class Meta:
+        model = Certificate
+
+    organisation_entity = factory.SubFactory(CertificateOrganisationFactory)
+    specification = factory.Sequence(lambda n: f"ISO {n}")
+
+
+class ServiceFeatureFactory(DjangoModelFactory):
+    class Meta:
+        model = ServiceFeature
+
+    icon = "star"
+    title = factory.Sequence(lambda n: f"Feature #{n}")
+    description = factory.Sequence(lambda n: f"Description #{n}")
+
+
+class ServiceScreenshotFactory(DjangoModelFactory):
+    class Meta:
+        model = ServiceScreenshot
+
+    service = factory.SubFactory(ServiceFactory)
+    alt_text = factory.Sequence(lambda n: f"Screenshot #{n}")
+
+
+class ServiceMentionFactory(DjangoModelFactory):
+    class Meta:
+        model = ServiceMention
+
+    service = factory.SubFactory(ServiceFactory)
+    name = factory.Sequence(lambda n: f"Mention #{n}")
+    text = factory.Sequence(lambda n: f"Text #{n}")
+    link = factory.Sequence(lambda n: f"https://mention{n}.com")
@@ -0,0 +1,231 @@
+import pytest
+from django.core.management import call_command
+
+from apps.services import signals
+from apps.services.denormalize import sync_category_tags, sync_review_aggregates
+from apps.services.models import Service, ServiceTag, ServiceCategory, Country, ServiceFeature, CategoryTag, \
+    ServiceRating
+from apps.services.tests.factories import ServiceFactory, ServiceTagFactory, ServiceCategoryFactory, CountryFactory, \
+    CertificateFactory, ServiceFeatureFactory, ServiceRatingFactory, ServiceRatingReviewFactory
+
+pytestmark = pytest.mark.integration
+
+
+def refreshed(service):
+    return Service.objects.get(pk=service.pk)
+
+
+@pytest.mark.django_db
+class TestIdArrays:
+    def test__m2m_changes__synced(self):
+        tags = ServiceTagFactory.create_batch(3)
+        service = ServiceFactory.create(tags=tags[:2], categories=[ServiceCategoryFactory()])
+        assert sorted(refreshed(service).tag_ids) == sorted(t.id for t in tags[:2])
+
+        service.tags.remove(tags[0])
+        service.tags.add(tags[2])
+        assert sorted(refreshed(service).tag_ids) == sorted(t.id for t in tags[1:])
+
+        service.tags.clear()
+        assert refreshed(service).tag_ids == []
+        assert len(refreshed(service).category_ids) == 1
+
+    def test__stale_save__arrays_kept(self):
+        tags = ServiceTagFactory.create_batch(2)
+        service = ServiceFactory.create(tags=tags[:1])
+        stale = refreshed(service)
+
+        service.tags.add(tags[1])
+        stale.name = 'renamed'
+        stale.save()
+
+        assert refreshed(service).name == 'renamed'
+        assert sorted(refreshed(service).tag_ids) == sorted(t.id for t in tags)
+        assert Service.objects.filter(tag_ids__contains=[tags[1].id]).exists()
+
+    def test__reverse_m2m_changes__synced(self):
+        country = CountryFactory()
+        services = ServiceFactory.create_batch(2)
+
+        country.service_set.add(*services)
+        assert [refreshed(s).country_ids for s in services] == [[country.id], [country.id]]
+
+        country.service_set.clear()
+        assert [refreshed(s).country_ids for s in services] == [[], []]
+
+    def test__related_deleted__synced(self):
+        certificates = CertificateFactory.create_batch(2)
+        service = ServiceFactory.create(certificates=certificates)
+
+        certificates[0].organisation_entity.delete()
+
+        assert refreshed(service).certificate_ids == [certificates[1].id]
+
+
+def service_counts(objects):
+    return [type(obj).objects.get(pk=obj.pk).service_count for obj in objects]
+
+
+@pytest.mark.django_db
+class TestServiceCounts:
+    def test__m2m_changes__counted(self):
+        tags = ServiceTagFactory.create_batch(3)
+        service = ServiceFactory.create(tags=tags[:2])
+        ServiceFactory.create(tags=tags[1:2])
+        assert service_counts(tags) == [1, 2, 0]
+
+        service.tags.remove(tags[0], tags[2])
+        service.tags.add(tags[2])
+        assert service_counts(tags) == [0, 2, 1]
+
+        service.tags.clear()
+        assert service_counts(tags) == [0, 1, 0]
+
+    def test__reverse_m2m_changes__counted(self):
+        country = CountryFactory()
+        services = ServiceFactory.create_batch(2)
+
+        country.service_set.add(*services)
+        assert service_counts([country]) == [2]
+
+        country.service_set.clear()
+        assert service_counts([country]) == [0]
+
+    def test__service_deleted__counted(self):
+        category = ServiceCategoryFactory()
+        feature = ServiceFeatureFactory()
+        services = ServiceFactory.create_batch(3, categories=[category], features=[feature])
+
+        services[0].delete()
+        Service.objects.filter(pk=services[1].pk).delete()
+
+        assert service_counts([category, feature]) == [1, 1]
+
+    def test__rebuild_command__recounted(self):
+        tag = ServiceTagFactory()
+        country = CountryFactory()
+        ServiceFactory.create_batch(2, tags=[tag])
+        for model in (ServiceTag, ServiceCategory, Country, ServiceFeature):
+            model.objects.update(service_count=7)
+
+        call_command('rebuild_service_counts')
+
+        assert service_counts([tag, country]) == [2, 0]
+
+
+def category_tags():
+    return dict(((row.category_id, row.tag_id), row.service_count) for row in CategoryTag.objects.all())
+
+
+@pytest.mark.django_db
+class TestCategoryTags:
+    def test__m2m_changes__synced(self):
+        categories = ServiceCategoryFactory.create_batch(2)
+        tags = ServiceTagFactory.create_batch(2)
+        service = ServiceFactory.create(tags=tags, categories=categories[:1])
+        ServiceFactory.create(tags=tags[:1], categories=categories[:1])
+        c0, c1 = (category.id for category in categories)
+        t0, t1 = (tag.id for tag in tags)
+        assert category_tags() == {(c0, t0): 2, (c0, t1): 1}
+
+        service.categories.add(categories[1])
+        service.tags.remove(tags[0])
+        assert category_tags() == {(c0, t0): 1, (c0, t1): 1, (c1, t1): 1}
+
+        service.tags.clear()
+        assert category_tags() == {(c0, t0): 1}
+
+        categories[0].category_services.clear()
+        assert category_tags() == {}
+
+    def test__reverse_tag_changes__synced(self):
+        category = ServiceCategoryFactory()
+        tag = ServiceTagFactory()
+        services = ServiceFactory.create_batch(2, categories=[category])
+
+        tag.tag_services.add(*services)
+        assert category_tags() == {(category.id, tag.id): 2}
+
+        tag.tag_services.clear()
+        assert category_tags() == {}
+
+    def test__service_deleted__synced(self):
+        category = ServiceCategoryFactory()
+        tag = ServiceTagFactory()
+        services = ServiceFactory.create_batch(2, tags=[tag], categories=[category])
+
+        services[0].delete()
+
+        assert category_tags() == {(category.id, tag.id): 1}
+
+    def test__rebuild__matches_relations(self):
+        category = ServiceCategoryFactory()
+        tag = ServiceTagFactory()
+        ServiceFactory.create_batch(2, tags=[tag], categories=[category])
+        CategoryTag.objects.all().delete()
+        CategoryTag.objects.create(category=category, tag=ServiceTagFactory(), service_count=5)
+
+        sync_category_tags()
+
+        assert category_tags() == {(category.id, tag.id): 2}
+
+
+def review_aggregates(rating):
+    rating = ServiceRating.objects.get(pk=rating.pk)
+    return rating.review_count, rating.review_mean, rating.review_histogram
+
+
+@pytest.mark.django_db
+class TestReviewAggregates:
+    def test__reviews_changed__aggregated(self, django_capture_on_commit_callbacks):
+        rating = ServiceRatingFactory()
+        with django_capture_on_commit_callbacks(execute=True):
+            reviews = [ServiceRatingReviewFactory(service_rating=rating, score=score) for score in (5, 4.6, 3, 0.2)]
+        assert review_aggregates(rating) == (4, pytest.approx(3.2), [1, 0, 0, 1, 0, 2])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            reviews[0].score = 1
+            reviews[0].save()
+            reviews[3].delete()
+        assert review_aggregates(rating) == (3, pytest.approx(2.8667, abs=1e-3), [0, 1, 0, 1, 0, 1])
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rating.reviews.all().delete()
+        assert review_aggregates(rating) == (0, None, [0] * 6)
+
+    def test__stale_save__aggregates_kept(self, django_capture_on_commit_callbacks):
+        rating = ServiceRatingFactory(score=3)
+        stale = ServiceRating.objects.get(pk=rating.pk)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ServiceRatingReviewFactory(service_rating=rating, score=5)
+        with django_capture_on_commit_callbacks(execute=True):
+            stale.score = 4
+            stale.save()
+
+        assert ServiceRating.objects.get(pk=rating.pk).score == 4
+        assert review_aggregates(rating) == (1, 5, [0, 0, 0, 0, 0, 1])
+
+    def test__reviews_replaced__aggregated_once(self, monkeypatch, django_capture_on_commit_callbacks):
+        rating = ServiceRatingFactory()
+        ServiceRatingReviewFactory.create_batch(3, service_rating=rating)
+        aggregated, rebuilt = [], []
+        monkeypatch.setattr(signals, 'sync_review_aggregates', aggregated.append)
+        monkeypatch.setattr(signals, 'rebuild_documents', rebuilt.append)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rating.reviews.all().delete()
+            ServiceRatingReviewFactory.create_batch(4, service_rating=rating)
+
+        assert aggregated == [{rating.id}]
+        assert rebuilt == [{rating.service_id}]
+
+    def test__rebuild__matches_reviews(self):
+        ratings = ServiceRatingFactory.create_batch(2)
+        ServiceRatingReviewFactory.create_batch(2, service_rating=ratings[0], score=2)
+        ServiceRating.objects.update(review_count=9, review_mean=1, review_histogram=[9] * 6)
+
+        sync_review_aggregates()
+
+        assert review_aggregates(ratings[0]) == (2, 2, [0, 0, 2, 0, 0, 0])
+        assert review_aggregates(ratings[1]) == (0, None, [0] * 6)
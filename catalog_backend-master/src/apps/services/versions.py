@@ -0,0 +1,79 @@
+import time
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Max
+from django.dispatch import Signal
+
+# Models of these apps get a change version, see `bump_versions`.
+VERSIONED_APPS = ('services', 'blog')
+
+VERSION_CACHE_KEY = 'change-version:{}'
+UPDATED_AT_CACHE_KEY = 'change-updated-at:{}'
+
+# Sent with `models` once new change versions of them are published.
+versions_changed = Signal()
+
+
+def new_version():
+    """A `(timestamp, token)` pair: when the model last changed, and a unique token of that change."""
+    return time.time(), uuid.uuid4().hex
+
+
+def get_versions(models):
+    """
+    Return `{model: (timestamp, token)}` of the current change versions of
+    `models`. A missing version (first use, cache flushed) starts as a new
+    change, so validators derived from it never match older responses.
+    """
+    keys = {VERSION_CACHE_KEY.format(model._meta.label_lower): model for model in models}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, new_version(), None)
+        versions.update(cache.get_many(missing))
+    return {model: versions.get(key) or new_version() for key, model in keys.items()}
+
+
+def _has_updated_at(model):
+    try:
+        model._meta.get_field('updated_at')
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def get_last_updated(versions):
+    """
+    Return `{model: max updated_at}` for the models of `versions` (as returned
+    by `get_versions`) that have an `updated_at` field. The aggregate is
+    cached with the change version it was read at, so it runs once per change.
+    """
+    keys = {UPDATED_AT_CACHE_KEY.format(model._meta.label_lower): model for model in versions
+            if _has_updated_at(model)}
+    cached = cache.get_many(keys)
+    last_updated = {}
+    for key, model in keys.items():
+        token = versions[model][1]
+        if key in cached and cached[key][0] == token:
+            last_updated[model] = cached[key][1]
+        else:
+            last_updated[model] = model._default_manager.aggregate(last=Max('updated_at'))['last']
+            cache.set(key, (token, last_updated[model]), None)
+    return last_updated
+
+
+def bump_versions(models):
+    """Publish a new change version of `models` once the current transaction commits."""
+    models = [model for model in models if model._meta.app_label in VERSIONED_APPS]
+    if models:
+        transaction.on_commit(partial(_set_versions, models))
+
+
+def _set_versions(models):
+    cache.set_many({VERSION_CACHE_KEY.format(model._meta.label_lower): new_version() for model in models}, None)
+    versions_changed.send(sender=None, models=models)
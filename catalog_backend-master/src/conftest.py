@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+import pytest
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def django_capture_on_commit_callbacks(django_capture_on_commit_callbacks):
+    """
+    The changes batched per transaction by `apps.services.signals.schedule_changes`
+    are batched per captured block, as if the block was a transaction of its own.
+    """
+    @contextmanager
+    def capture(*, using=DEFAULT_DB_ALIAS, execute=False):
+        connections[using].pending_changes = None
+        with django_capture_on_commit_callbacks(using=using, execute=execute) as callbacks:
+            yield callbacks
+
+    return capture
@@ -0,0 +1,27 @@
+# Loaded by gunicorn from the directory it is started in.
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hainu.settings')
+
+
+def on_starting(server):
+    # The metrics of the workers of a previous server do not add up with the new ones.
+    from api.metrics import clear
+    clear()
+
+
+def post_worker_init(worker):
+    # Only workers share their metrics, not management commands or shells.
+    from api.metrics import start
+    start()
+
+
+def worker_exit(server, worker):
+    from api.metrics import stop
+    stop()
+
+
+def child_exit(server, worker):
+    # Recycled workers leave their totals behind, not their files.
+    from api.metrics import retire
+    retire(worker.pid)
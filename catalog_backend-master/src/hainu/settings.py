@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.compression.CompressionMiddleware',
+    'api.timing.TimingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -93,6 +96,90 @@ DATABASES = {
     }
 }
 
+# API pages are cached in a bounded LRU per worker, in front of a cache shared
+# by all workers: Redis when REDIS_URL is set, a local stand-in otherwise.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_SIZE': int(os.environ.get('CACHE_LOCAL_MAX_SIZE', 32 * 1024 * 1024)),
+            'LOCAL_TIMEOUT': int(os.environ.get('CACHE_LOCAL_TIMEOUT', 60 * 5)),
+            # Cached pages, their keys change with the resource versions (see api.caching).
+            'LOCAL_KEY_PREFIXES': ['page:'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+# Cached API pages are served stale (while one request rebuilds them) at most
+# this long after they were built, see api.caching.cache_response.
+API_CACHE_HARD_TIMEOUT = int(os.environ.get('API_CACHE_HARD_TIMEOUT', 60 * 60 * 24))
+
+# Pages requested by the frontend, filled by `manage.py warm_cache` (and after
+# every invalidation when API_CACHE_WARMUP_ON_INVALIDATE is set), by resource
+# of api.caching. `{tag}`, `{category}` and `{service}` take every id in use.
+API_CACHE_WARMUP_URLS = {
+    'services': [
+        '/api/v1/catalog/services/?page=1&page_size=20',
+        '/api/v1/catalog/services/?tags={tag}&page=1&page_size=20',
+        '/api/v1/catalog/services/?page=1&categories={category}&page_size=20',
+    ],
+    'tags': [
+        '/api/v1/catalog/tags/?page_size=100&category=',
+        '/api/v1/catalog/tags/?page_size=100&category={category}',
+    ],
+    'categories': ['/api/v1/catalog/categories/'],
+    'reviews': ['/api/v1/catalog/reviews/?service_rating__service__id={service}'],
+    'blog': ['/api/v1/blog/posts/'],
+}
+# Pages are cached per absolute URL and encoding, warm them as browsers request them.
+# Warm-up needs API_CACHE_WARMUP_HOST while ALLOWED_HOSTS allows any host.
+API_CACHE_WARMUP_HOST = os.environ.get('API_CACHE_WARMUP_HOST', '')
+API_CACHE_WARMUP_SECURE = os.environ.get('API_CACHE_WARMUP_SECURE', 'True') == 'True'
+API_CACHE_WARMUP_ENCODINGS = ['gzip, deflate, br']
+API_CACHE_WARMUP_ON_INVALIDATE = os.environ.get('API_CACHE_WARMUP_ON_INVALIDATE', 'False') == 'True'
+
+# Query count, database, serialization and rendering time and page cache
+# status of API requests, logged by `api.timing` as one JSON line each and
+# sent as a `Server-Timing` header to staff (or everyone, when public).
+# Opt-in, as it logs a line per request.
+API_TIMING = os.environ.get('API_TIMING', 'False') == 'True'
+API_SERVER_TIMING_PUBLIC = os.environ.get('API_SERVER_TIMING_PUBLIC', 'False') == 'True'
+
+# Request, latency, database and page cache metrics of the API by router
+# basename, served at /metrics/ by `api.metrics`. Gunicorn workers share them
+# through a file each in METRICS_DIR, managed by the hooks in gunicorn.conf.py;
+# with an empty METRICS_DIR, and in other processes, each keeps its own.
+# /metrics/ asks for `Authorization: Bearer <METRICS_TOKEN>`, or a staff login
+# without a token. Opt-in, as it wraps the queries of every request.
+API_METRICS = os.environ.get('API_METRICS', 'False') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'hainu-metrics'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('API_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -137,6 +224,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'],
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.Pagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'PAGE_SIZE': 25
 }
 
@@ -1,6 +1,11 @@
+import hmac
+import os
+
 from django.contrib import admin
-from django.http import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, JsonResponse
 from django.urls import path, include
+from django.views.decorators.http import require_POST
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -8,12 +13,49 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 
+@require_POST
+@staff_member_required
 def cache_clear_view(request):
-    from django.core.cache import cache
-    cache.clear()
+    # Invalidates every cached page, and warms them up again when configured.
+    # Edits invalidate the cached pages they affect already, see api.caching.
+    from api.caching import invalidate
+    invalidate()
     return HttpResponse('Cache cleared')
 
 
+@staff_member_required
+def cache_stats_view(request):
+    # Counters of the worker serving the request, to size the page cache.
+    from django.core.cache import cache
+    from api.caching import cache_stats
+    return JsonResponse({
+        'pid': os.getpid(),
+        'endpoints': cache_stats(),
+        'cache': cache.stats() if hasattr(cache, 'stats') else None,
+    })
+
+
+def metrics_response():
+    # Of all workers, see api.metrics.
+    from api.metrics import render
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def staff_metrics_view(request):
+    return metrics_response()
+
+
+def metrics_view(request):
+    # Prometheus scrapes with the token, staff only without one.
+    token = settings.METRICS_TOKEN
+    if not token:
+        return staff_metrics_view(request)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401)
+    return metrics_response()
+
+
 schema_view = get_schema_view(
    openapi.Info(
       title="Hainu API",
@@ -27,6 +69,8 @@ schema_view = get_schema_view(
 
 urlpatterns = [
     path('clear/', cache_clear_view),
+    path('cache/stats/', cache_stats_view),
+    path('metrics/', metrics_view),
     path('admin/', admin.site.urls),
     path('api-auth/', include('rest_framework.urls')),
     path('api/v1/', include('api.v1.urls', namespace='v1')),